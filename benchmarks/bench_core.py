@@ -0,0 +1,195 @@
+"""
+Benchmark the core helpers and model builders on synthetic stores.
+
+Generates a store for every size (see synthetic_store.py) and times
+building the tree model, resolving entry paths, reading .gpg-id files
+one by one and into a RecipientMap, parsing, indexing and matching a
+keyring of a tenth of the size, formatting entries for the content panel
+and the fuzzy filter. Prints a JSON object with the timings in
+milliseconds. Given the results of an earlier run, the medians are
+compared and the script fails when one of them got slower than the
+threshold.
+
+Usage: python benchmarks/bench_core.py [--sizes 1000,10000,100000]
+    [--repeat N] [--output FILE] [--compare FILE] [--threshold RATIO]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+import passpy
+from PyQt6.QtCore import QCoreApplication
+
+from bench_utils import compare_results, measure, write_results
+from synthetic_store import entry_contents, generate_store
+from fuzzy_filter import FuzzyFilter
+from gpg_utils import KeyIndex, key_matches_id, parse_gpg_colons, read_gpg_ids
+from recipient_map import RecipientMap
+from store_model import create_tree_model
+from utilities import format_key_html
+
+SIZES = [1000, 10000, 100000]
+QUERY = "web-entry12"
+
+
+def synthetic_keyring(count):
+    """
+    :param count: The number of keys.
+    :return: Output like gpg --list-keys --with-colons for count keys.
+    """
+    lines = ["tru::1:1700000000:0:3:1:5"]
+    for number in range(count):
+        fingerprint = f"{number:040X}"
+        lines.extend(
+            [
+                f"pub:u:255:22:{fingerprint[-16:]}:1700000000:::u:::scESC:::::ed25519:::0:",
+                f"fpr:::::::::{fingerprint}:",
+                f"uid:u::::1700000000::{fingerprint[:40]}::"
+                f"User {number} <user{number}@example.invalid>::::::::::0:",
+                f"sub:u:255:18:{fingerprint[-17:-1]}:1700000000::::::e:::::cv25519::",
+                f"fpr:::::::::{fingerprint[1:]}0:",
+            ]
+        )
+    return "\n".join(lines) + "\n"
+
+
+def git_revision():
+    """
+    :return: The commit the benchmarks ran on, or ''.
+    """
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return result.stdout.strip()
+
+
+def bench_model(store_dir, size, repeat, results):
+    """
+    Time building the tree model, resolving paths and the fuzzy filter.
+    """
+    store = passpy.Store(store_dir=store_dir)
+
+    def build():
+        model = create_tree_model(store)
+        model.fetch_all()
+        return model
+
+    results[f"create_tree_model[{size}]"] = measure(build, repeat)
+    model = build()
+    store_index = model.store_index
+    entries = list(store_index.entries())
+    results[f"full_path[{size}]"] = measure(
+        lambda: [store_index.full_path(entry) for entry in entries], repeat
+    )
+
+    def new_filter():
+        fuzzy_filter = FuzzyFilter()
+        fuzzy_filter.set_model(build())
+        fuzzy_filter.text = QUERY
+        return fuzzy_filter
+
+    results[f"fuzzy_filter_build[{size}]"] = measure(
+        lambda fuzzy_filter: fuzzy_filter.apply(), repeat, setup=new_filter
+    )
+
+    def type_query(fuzzy_filter):
+        for length in range(1, len(QUERY) + 1):
+            fuzzy_filter.text = QUERY[:length]
+            fuzzy_filter.apply()
+
+    def built_filter():
+        fuzzy_filter = new_filter()
+        fuzzy_filter.build()
+        return fuzzy_filter
+
+    results[f"fuzzy_filter_typing[{size}]"] = measure(
+        type_query, repeat, setup=built_filter
+    )
+
+
+def bench_size(size, repeat, results):
+    """
+    Run all benchmarks on a store with size entries.
+    """
+    with tempfile.TemporaryDirectory() as store_dir:
+        fanout = max(2, round(size ** (1 / 3)))
+        paths = generate_store(store_dir, size, depth=2, fanout=fanout, gpg_id_every=7)
+        bench_model(store_dir, size, repeat, results)
+        folders = sorted({os.path.dirname(path) for path in paths})
+        results[f"read_gpg_ids[{size}]"] = measure(
+            lambda: [read_gpg_ids(store_dir, folder) for folder in folders], repeat
+        )
+        results[f"recipient_map_scan[{size}]"] = measure(
+            lambda: RecipientMap(store_dir).scan(), repeat
+        )
+
+    keyring = synthetic_keyring(max(1, size // 10))
+    results[f"parse_gpg_colons[{size // 10} keys]"] = measure(
+        lambda: parse_gpg_colons(keyring), repeat
+    )
+    keys = parse_gpg_colons(keyring)
+    gpg_ids = [f"user{number}@example.invalid" for number in range(0, len(keys), 97)]
+    results[f"key_matches_id[{size // 10} keys]"] = measure(
+        lambda: [
+            [key for key in keys if key_matches_id(key, gpg_id)] for gpg_id in gpg_ids
+        ],
+        repeat,
+    )
+    results[f"key_index_build[{size // 10} keys]"] = measure(
+        lambda: KeyIndex(keys), repeat
+    )
+    key_index = KeyIndex(keys)
+    results[f"key_index_lookup[{size // 10} keys]"] = measure(
+        lambda: [key_index.lookup(gpg_id) for gpg_id in gpg_ids], repeat
+    )
+    contents = [entry_contents(number) for number in range(size)]
+    results[f"format_key_html[{size}]"] = measure(
+        lambda: [format_key_html(key_data, True) for key_data in contents], repeat
+    )
+
+
+def main():
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in SIZES),
+        help="comma separated numbers of entries",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    args = parser.parse_args()
+
+    _app = QCoreApplication(sys.argv[:1])
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "benchmarks": {},
+    }
+    for size in (int(size) for size in args.sizes.split(",")):
+        bench_size(size, args.repeat, results["benchmarks"])
+    write_results(results, args.output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as compare_file:
+            previous = json.load(compare_file)
+        if compare_results(previous, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare the per-decrypt latency of the crypto backends in gpg_utils.
+
+Creates a throwaway GNUPGHOME with a passphrase-less key, encrypts a
+password file for it and decrypts that file repeatedly with every
+available backend. Prints a JSON object with the timings in milliseconds.
+
+Usage: python benchmarks/bench_decrypt.py [--runs N] [--output FILE]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from bench_utils import write_results
+from synthetic_store import GPG_OPTS, KEY_ID, throwaway_gnupghome
+from gpg_utils import CRYPTO_BACKENDS, get_crypto_backend
+
+
+def time_backend(backend, path, runs):
+    """
+    Decrypt path runs times with backend.
+
+    :return: Dict with the timings in milliseconds.
+    """
+    backend.decrypt(path)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.decrypt(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": runs,
+        "mean_ms": statistics.mean(timings),
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+    }
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = {"backends": {}}
+    with throwaway_gnupghome() as gpg_bin, tempfile.TemporaryDirectory() as store:
+        results["gpg"] = gpg_bin
+        path = os.path.join(store, "entry.gpg")
+        subprocess_backend = get_crypto_backend("subprocess", gpg_bin, GPG_OPTS)
+        with open(path, "wb") as key_file:
+            key_file.write(
+                subprocess_backend.encrypt("hunter2\nlogin: bench\n", [KEY_ID])
+            )
+        for name in CRYPTO_BACKENDS:
+            backend = get_crypto_backend(name, gpg_bin, GPG_OPTS)
+            if backend.name != name:
+                results["backends"][name] = None
+                continue
+            results["backends"][name] = time_backend(backend, path, args.runs)
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Measure how long the fuzzy filter takes to update per keystroke.
+
+Indexes a synthetic store of password paths and types queries one
+character at a time, then deletes them again. Prints a JSON object with
+the index build time, the per-keystroke timings and the time to pick the
+best match, in milliseconds.
+
+Usage: python benchmarks/bench_filter.py [--entries N] [--output FILE]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from bench_utils import write_results
+from fuzzy_filter import FuzzyIndex
+
+QUERIES = ["github", "mail/work", "bnk", "srv12", "e", "xyzzy"]
+WORDS = [
+    "web",
+    "mail",
+    "bank",
+    "work",
+    "home",
+    "servers",
+    "github",
+    "gitlab",
+    "imap",
+    "smtp",
+    "shop",
+    "social",
+    "cloud",
+    "vpn",
+    "wifi",
+    "router",
+]
+
+
+def synthetic_paths(count, seed=0):
+    """
+    :param count: The number of paths.
+    :param seed: Seed for the random generator.
+    :return: List of password paths one to four folders deep.
+    """
+    generator = random.Random(seed)
+    paths = []
+    for number in range(count):
+        folders = generator.choices(WORDS, k=generator.randint(1, 4))
+        name = f"{generator.choice(WORDS)}-srv{number}"
+        paths.append("/".join(folders + [name]))
+    return paths
+
+
+def summary(timings):
+    """
+    :param timings: List of timings in milliseconds.
+    :return: Dict with statistics of the timings.
+    """
+    timings = sorted(timings)
+    return {
+        "keystrokes": len(timings),
+        "median_ms": statistics.median(timings),
+        "p95_ms": timings[int(len(timings) * 0.95)],
+        "max_ms": timings[-1],
+    }
+
+
+def timed_search(index, text):
+    """
+    :return: The time index.search(text) took in milliseconds.
+    """
+    start = time.perf_counter()
+    index.search(text)
+    return (time.perf_counter() - start) * 1000
+
+
+def type_query(index, query, typing, deleting):
+    """
+    Type query one character at a time and delete it again.
+
+    :param index: The FuzzyIndex to search.
+    :param query: The query to type.
+    :param typing: List the timings of typed characters are added to.
+    :param deleting: List the timings of deleted characters are added to.
+    :return: Dict with the results for query.
+    """
+    index.search("")
+    timings = [
+        timed_search(index, query[:length]) for length in range(1, len(query) + 1)
+    ]
+    matches = len(index.search(query))
+    start = time.perf_counter()
+    index.ranked()
+    rank_ms = (time.perf_counter() - start) * 1000
+    typing.extend(timings)
+    deleting.extend(
+        timed_search(index, query[:length]) for length in range(len(query) - 1, 0, -1)
+    )
+    return {"matches": matches, "keystroke_ms": timings, "best_match_ms": rank_ms}
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    index = FuzzyIndex()
+    start = time.perf_counter()
+    for entry, path in enumerate(synthetic_paths(args.entries), 1):
+        index.add(entry, path)
+    results = {
+        "entries": args.entries,
+        "build_ms": (time.perf_counter() - start) * 1000,
+        "queries": {},
+    }
+    typing = []
+    deleting = []
+    for query in QUERIES:
+        results["queries"][query] = type_query(index, query, typing, deleting)
+    results["typing"] = summary(typing)
+    results["deleting"] = summary(deleting)
+
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+import json
+import statistics
+import sys
+import time
+
+
+def write_results(results, output=None):
+    """
+    Print the results as JSON and write them to a file as well.
+
+    :param results: Dict with the results.
+    :param output: Path of the file to write, None to only print.
+    """
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as output_file:
+            output_file.write(text + "\n")
+    print(text)
+
+
+def measure(func, repeat=5, setup=None):
+    """
+    Time a function a couple of times.
+
+    :param func: The function to time, called with the result of setup.
+    :param repeat: The number of runs.
+    :param setup: Function preparing a run, not timed, or None.
+    :return: Dict with the timings in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        if setup:
+            func(argument)
+        else:
+            func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": repeat,
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+    }
+
+
+def compare_results(old, new, threshold):
+    """
+    Print how the timings of two benchmark runs compare.
+
+    :param old: Results of the earlier run, as written by write_results.
+    :param new: Results of this run.
+    :param threshold: Ratio of the medians above which a benchmark counts
+        as a regression.
+    :return: List of the names of the benchmarks that regressed.
+    """
+    regressions = []
+    for name, result in new["benchmarks"].items():
+        previous = old.get("benchmarks", {}).get(name)
+        if not previous:
+            continue
+        ratio = result["median_ms"] / max(previous["median_ms"], 1e-6)
+        marker = ""
+        if ratio > threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(
+            f"{name:<40} {previous['median_ms']:10.2f} -> "
+            f"{result['median_ms']:10.2f} ms  x{ratio:.2f}{marker}",
+            file=sys.stderr,
+        )
+    return regressions
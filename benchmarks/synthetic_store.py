@@ -0,0 +1,185 @@
+"""
+Generate synthetic password stores for the benchmarks.
+
+Entries are spread over a tree of folders with a configurable depth and
+fan-out. Folders can get their own .gpg-id file, like stores that are
+shared with different people. Entries are placeholder files, unless
+encrypted entries are asked for. Those are encrypted once for a
+passphrase-less key in a new GNUPGHOME next to the store and copied, so
+even large stores are generated fast.
+
+Usage: python benchmarks/synthetic_store.py DIR [--entries N] [--depth N]
+    [--fanout N] [--gpg-id-every N] [--encrypt]
+"""
+
+import argparse
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable-next=wrong-import-position
+from gpg_utils import encrypt_data, which_gpg
+
+KEY_ID = "bench@example.invalid"
+GPG_OPTS = ["--quiet", "--yes", "--compress-algo=none", "--no-encrypt-to"]
+NAMES = ["web", "mail", "bank", "work", "home", "servers", "shop", "social"]
+
+
+def create_key(gpg_bin):
+    """
+    Generate a passphrase-less key in the current GNUPGHOME.
+
+    :param gpg_bin: The gpg binary to use.
+    """
+    subprocess.run(
+        [
+            gpg_bin,
+            "--batch",
+            "--pinentry-mode",
+            "loopback",
+            "--passphrase",
+            "",
+            "--quick-generate-key",
+            KEY_ID,
+            "default",
+            "default",
+            "never",
+        ],
+        capture_output=True,
+        check=True,
+    )
+
+
+def create_gnupghome(home):
+    """
+    Create a GNUPGHOME with a passphrase-less key for KEY_ID and use it.
+
+    :param home: The directory to create.
+    :return: The gpg binary.
+    """
+    gpg_bin = which_gpg()
+    os.makedirs(home, mode=0o700, exist_ok=True)
+    os.chmod(home, 0o700)
+    os.environ["GNUPGHOME"] = home
+    create_key(gpg_bin)
+    return gpg_bin
+
+
+@contextlib.contextmanager
+def throwaway_gnupghome():
+    """
+    Use a temporary GNUPGHOME with a passphrase-less key for KEY_ID.
+
+    :return: Context manager giving the gpg binary.
+    """
+    previous = os.environ.get("GNUPGHOME")
+    with tempfile.TemporaryDirectory() as home:
+        try:
+            yield create_gnupghome(home)
+        finally:
+            subprocess.run(
+                ["gpgconf", "--kill", "gpg-agent"], capture_output=True, check=False
+            )
+            if previous is None:
+                del os.environ["GNUPGHOME"]
+            else:
+                os.environ["GNUPGHOME"] = previous
+
+
+def folder_paths(depth, fanout):
+    """
+    :param depth: The number of folder levels.
+    :param fanout: The number of subfolders per folder.
+    :return: List of the deepest folders, relative to the store root.
+    """
+    folders = [""]
+    for level in range(depth):
+        folders = [
+            f"{parent}/{NAMES[number % len(NAMES)]}{level}-{number}".lstrip("/")
+            for parent in folders
+            for number in range(fanout)
+        ]
+    return folders
+
+
+def entry_contents(number):
+    """
+    :param number: Number of the entry.
+    :return: Plausible decrypted contents of a password entry.
+    """
+    return (
+        f"secret-{number}\n"
+        f"login: user{number}@example.invalid\n"
+        f"url: https://site{number}.example.invalid/login\n"
+        "notes: generated for the benchmarks\n"
+    )
+
+
+def generate_store(
+    store_dir, entries, depth=2, fanout=10, gpg_id_every=0, data=None
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    Create a synthetic password store.
+
+    :param store_dir: Directory to create the store in.
+    :param entries: The number of password entries.
+    :param depth: The number of folder levels.
+    :param fanout: The number of subfolders per folder.
+    :param gpg_id_every: Give every n-th folder its own .gpg-id, 0 for none.
+    :param data: Contents of every entry file, a placeholder when None.
+    :return: List of the entry paths relative to the store root.
+    """
+    data = data or b"\x85 not encrypted, generated for the benchmarks\n"
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, ".gpg-id"), "w", encoding="utf-8") as gpg_id:
+        gpg_id.write(KEY_ID + "\n")
+    folders = folder_paths(depth, fanout)
+    for number, folder in enumerate(folders):
+        os.makedirs(os.path.join(store_dir, folder), exist_ok=True)
+        if gpg_id_every and folder and number % gpg_id_every == 0:
+            gpg_id_path = os.path.join(store_dir, folder, ".gpg-id")
+            with open(gpg_id_path, "w", encoding="utf-8") as gpg_id:
+                gpg_id.write(f"{KEY_ID}\nother{number}@example.invalid\n")
+    paths = []
+    for number in range(entries):
+        folder = folders[number % len(folders)]
+        name = f"{NAMES[number % len(NAMES)]}-entry{number}"
+        path = f"{folder}/{name}" if folder else name
+        with open(os.path.join(store_dir, path + ".gpg"), "wb") as key_file:
+            key_file.write(data)
+        paths.append(path)
+    return paths
+
+
+def main():
+    """Generate a store from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("store_dir")
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--gpg-id-every", type=int, default=0)
+    parser.add_argument(
+        "--encrypt",
+        action="store_true",
+        help="encrypt the entries for a key in a new GNUPGHOME next to DIR",
+    )
+    args = parser.parse_args()
+    shape = (args.entries, args.depth, args.fanout, args.gpg_id_every)
+    data = None
+    if args.encrypt:
+        home = os.path.abspath(args.store_dir.rstrip("/")) + "-gnupg"
+        gpg_bin = create_gnupghome(home)
+        data = encrypt_data(entry_contents(0), [KEY_ID], gpg_bin, GPG_OPTS)
+    generate_store(args.store_dir, *shape, data=data)
+    print(f"Generated {args.entries} entries in {args.store_dir}")
+    if args.encrypt:
+        print(f"Use them with GNUPGHOME={home}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+This module implements the command line mode of PyQtPass, for scripts that
+read the password store of the current profile without starting the GUI.
+
+Only QtCore is imported, for the settings, and passpy when an entry is
+decrypted. No QApplication is created and the store is not loaded into a
+model, entries are printed while the store is walked, so the first ones
+appear before the whole store was read.
+"""
+
+import fnmatch
+import json
+import os
+import sys
+
+from decrypt_service import DECRYPT_TIMEOUT
+from gpg_utils import CRYPTO_BACKENDS, get_crypto_backend, which_gpg
+from settings_manager import SettingsManager
+from store_index import scan_folder
+
+
+def add_arguments(parser):
+    """
+    Add the command line mode options to the argument parser.
+
+    :param parser: The argparse.ArgumentParser of main().
+    """
+    group = parser.add_argument_group(
+        "command line mode",
+        "Use the store of the current profile without starting the GUI.",
+    )
+    commands = group.add_mutually_exclusive_group()
+    commands.add_argument(
+        "--list", action="store_true", help="Print the paths of all entries."
+    )
+    commands.add_argument(
+        "--find",
+        metavar="PATTERN",
+        help="Print the paths of the entries matching PATTERN, "
+        "a case insensitive glob or part of the path.",
+    )
+    commands.add_argument(
+        "--show", metavar="PATH", help="Print the decrypted entry at PATH."
+    )
+    commands.add_argument(
+        "--first-line",
+        metavar="PATH",
+        help="Print the first line, the password, of the entry at PATH.",
+    )
+    commands.add_argument(
+        "--copy",
+        metavar="PATH",
+        help="Let the running PyQtPass copy the password of the entry at PATH "
+        "to the clipboard.",
+    )
+    group.add_argument(
+        "--json",
+        action="store_true",
+        help="Print --list and --find as a JSON array of paths.",
+    )
+
+
+def requested(args):
+    """
+    :param args: The parsed arguments.
+    :return: True when a command line mode option was given.
+    """
+    return bool(args.list or args.find or args.show or args.first_line or args.copy)
+
+
+def walk(store_dir, folder=""):
+    """
+    Generate the paths of the entries in a folder and below, in the order
+    of the tree view, while reading the folders.
+
+    :param store_dir: Root directory of the password store.
+    :param folder: Folder path relative to the store root.
+    :return: Generator of entry paths relative to the store root.
+    """
+    prefix = folder + "/" if folder else ""
+    try:
+        folders, entries = scan_folder(os.path.join(store_dir, folder))
+    except OSError:
+        return
+    for name in folders:
+        yield from walk(store_dir, prefix + name)
+    for name in entries:
+        yield prefix + name
+
+
+def matches(pattern):
+    """
+    :param pattern: A glob or part of a path.
+    :return: Function telling whether an entry path matches pattern.
+    """
+    pattern = f"*{pattern.lower()}*"
+    return lambda path: fnmatch.fnmatchcase(path.lower(), pattern)
+
+
+def print_paths(paths, as_json=False):
+    """
+    Print entry paths as soon as they are found.
+
+    :param paths: Iterable of entry paths.
+    :param as_json: True to print a JSON array instead of one per line.
+    :return: The number of paths printed.
+    """
+    count = 0
+    for path in paths:
+        if as_json:
+            sys.stdout.write(("[" if count == 0 else ",") + json.dumps(path))
+        else:
+            sys.stdout.write(path + "\n")
+        count += 1
+    if as_json:
+        sys.stdout.write(("[" if count == 0 else "") + "]\n")
+    return count
+
+
+def entry_file(store_dir, path):
+    """
+    :param store_dir: Root directory of the password store.
+    :param path: Path of an entry, with or without the .gpg extension.
+    :return: Absolute path of the .gpg file of the entry.
+    :raises FileNotFoundError: when path points outside the store.
+    """
+    path = path.strip("/")
+    if path.endswith(".gpg"):
+        path = path[:-4]
+    full_path = os.path.normpath(os.path.join(store_dir, path + ".gpg"))
+    if not path or not full_path.startswith(os.path.join(store_dir, "")):
+        raise FileNotFoundError(f"{path} is not in the password store.")
+    return full_path
+
+
+def decrypt(settings, store_dir, path):
+    """
+    Decrypt an entry with the crypto backend of the settings, and gpg
+    with the options of a passpy Store like the GUI opens it.
+
+    :param settings: The SettingsManager.
+    :param store_dir: Root directory of the password store.
+    :param path: Path of the entry relative to the store root.
+    :return: The decrypted contents.
+    :raises OSError: when the store was not initialised or gpg failed.
+    """
+    # Only imported when decrypting, listing does not need it.
+    # pylint: disable-next=import-outside-toplevel
+    import passpy
+
+    try:
+        store = passpy.Store(gpg_bin=which_gpg(), store_dir=store_dir)
+    except passpy.StoreNotInitialisedError as error:
+        raise OSError(str(error) or "The password store is not initialised.") from error
+    index = int(settings.get("crypto_backend"))
+    name = CRYPTO_BACKENDS[index] if 0 <= index < len(CRYPTO_BACKENDS) else ""
+    backend = get_crypto_backend(name, store.gpg_bin, store.gpg_opts)
+    return backend.decrypt(entry_file(store_dir, path))
+
+
+def copy(path):
+    """
+    Ask the running PyQtPass to copy the password of an entry, a clipboard
+    owned by this process would be gone once it exits.
+
+    :param path: Path of the entry relative to the store root.
+    :raises OSError: when PyQtPass is not running or could not copy it.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from instance_server import send_request
+
+    response = send_request("copy", timeout=DECRYPT_TIMEOUT * 1000, path=path)
+    if response is None:
+        raise OSError("PyQtPass is not running.")
+    if not response.get("ok"):
+        raise OSError(response.get("error"))
+
+
+def run(args):
+    """
+    Run the command line mode option that was given.
+
+    :param args: The parsed arguments.
+    :return: The exit status, 1 when nothing was found or decrypting failed.
+    """
+    settings = SettingsManager()
+    store_dir = os.path.normpath(os.path.expanduser(settings.store_dir()))
+    try:
+        if args.list or args.find:
+            paths = walk(store_dir)
+            if args.find:
+                paths = filter(matches(args.find), paths)
+            status = 0 if print_paths(paths, args.json) or args.list else 1
+        elif args.copy:
+            copy(args.copy)
+            status = 0
+        else:
+            contents = decrypt(settings, store_dir, args.show or args.first_line)
+            if args.first_line:
+                contents = contents.split("\n", 1)[0] + "\n"
+            sys.stdout.write(contents)
+            status = 0
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away, e.g. head, do not complain when exiting.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        status = 0
+    except OSError as error:
+        print(f"pyqtpass: {error}", file=sys.stderr)
+        status = 1
+    return status
@@ -24,6 +24,7 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from gpg_utils import gpgme_available
 from settings_manager import SettingsManager
 
 
@@ -119,6 +120,35 @@ class ConfigDialog(QDialog):
             self.add_field("clipboard_timeout", self.seconds_spin_box()),
         )
         layout.addWidget(clipboard_group)
+
+        cache_group = QGroupBox(self.tr("Decryption cache:"), tab)
+        cache_layout = QFormLayout(cache_group)
+        cache_size_spin_box = QSpinBox(self)
+        cache_size_spin_box.setRange(1, 1000)
+        cache_size_spin_box.setSuffix(self.tr(" entries"))
+        cache_layout.addRow(
+            self.add_field(
+                "cache_decrypted",
+                QCheckBox(self.tr("Keep decrypted entries in memory, at most:")),
+            ),
+            self.add_field("cache_max_entries", cache_size_spin_box),
+        )
+        layout.addWidget(cache_group)
+
+        search_group = QGroupBox(self.tr("Content search:"), tab)
+        search_layout = QFormLayout(search_group)
+        search_layout.addRow(
+            self.add_field(
+                "content_search",
+                QCheckBox(
+                    self.tr(
+                        "Search user names, URLs and notes "
+                        "(decrypts all entries into memory)"
+                    )
+                ),
+            )
+        )
+        layout.addWidget(search_group)
         layout.addStretch(1)
         return tab
 
@@ -172,6 +202,13 @@ class ConfigDialog(QDialog):
                 "auto_push", QCheckBox(self.tr("Automatically push local changes"))
             )
         )
+        push_delay_spin_box = QSpinBox(self)
+        push_delay_spin_box.setRange(0, 3600)
+        push_delay_spin_box.setSuffix(self.tr(" seconds"))
+        git_layout.addRow(
+            self.tr("Push after changes settled for:"),
+            self.add_field("auto_push_delay", push_delay_spin_box),
+        )
         git_layout.addRow(
             self.add_field(
                 "git_pull_on_start", QCheckBox(self.tr("Update (git pull) on startup"))
@@ -200,6 +237,24 @@ class ConfigDialog(QDialog):
         buttons_layout.addWidget(remove_button)
         buttons_layout.addStretch(1)
         layout.addLayout(buttons_layout)
+
+        pool_group = QGroupBox(self.tr("Switching profiles:"), tab)
+        pool_layout = QFormLayout(pool_group)
+        pool_size_spin_box = QSpinBox(self)
+        pool_size_spin_box.setRange(0, 32)
+        pool_size_spin_box.setSuffix(self.tr(" stores"))
+        pool_layout.addRow(
+            self.tr("Keep other stores open, at most:"),
+            self.add_field("store_pool_size", pool_size_spin_box),
+        )
+        pool_memory_spin_box = QSpinBox(self)
+        pool_memory_spin_box.setRange(1, 4096)
+        pool_memory_spin_box.setSuffix(self.tr(" MB"))
+        pool_layout.addRow(
+            self.tr("Using at most:"),
+            self.add_field("store_pool_memory", pool_memory_spin_box),
+        )
+        layout.addWidget(pool_group)
         return tab
 
     def create_system_tab(self):
@@ -220,6 +275,19 @@ class ConfigDialog(QDialog):
         system_layout.addRow(
             self.add_field("always_on_top", QCheckBox(self.tr("Always on top")))
         )
+        backend_combo_box = QComboBox(self)
+        backend_combo_box.addItems(
+            [self.tr("gpg executable"), self.tr("GPGME library (in-process)")]
+        )
+        if not gpgme_available():
+            backend_combo_box.model().item(1).setEnabled(False)
+            backend_combo_box.setToolTip(
+                self.tr("Install the gpg Python bindings to use GPGME.")
+            )
+        system_layout.addRow(
+            self.tr("Crypto backend:"),
+            self.add_field("crypto_backend", backend_combo_box),
+        )
         layout.addWidget(system_group)
         layout.addStretch(1)
         return tab
@@ -309,5 +377,4 @@ class ConfigDialog(QDialog):
         self.settings_manager.set("profiles", profiles)
         if self.settings_manager.get("current_profile") not in profiles:
             self.settings_manager.set("current_profile", "")
-        self.settings_manager.save()
         self.accept()
@@ -0,0 +1,323 @@
+"""
+This module defines the ContentIndex and ContentIndexer classes, which make
+the decrypted contents of password entries searchable.
+
+Content search is opt-in: entries are only decrypted for the index while it
+is enabled in the configuration and the search is opened. Only the words of
+the lines after the password end up in the index, never the password line
+itself or the raw contents. Entries are decrypted on a small pool of worker
+threads, so at most MAX_JOBS gpg processes run for the index at a time.
+Entries whose file did not change since they were indexed are not
+decrypted again. The index lives in memory only and is wiped together with
+the other decrypted contents.
+"""
+
+import os
+import re
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from decrypt_service import DECRYPT_TIMEOUT
+
+MAX_JOBS = 2
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    :param text: Text to split into words.
+    :return: Set of the lower case words in text.
+    """
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def content_tokens(key_data):
+    """
+    :param key_data: The decrypted contents of a password entry.
+    :return: Set of the words on the lines after the password.
+    """
+    _, _, rest = key_data.partition("\n")
+    return tokenize(rest)
+
+
+def scan_store(store_dir):
+    """
+    Find all password entries of a store with the version of their file.
+
+    :param store_dir: Root directory of the password store.
+    :return: Dict of entry path relative to the store root to a tuple of
+        (modification time, size).
+    """
+    stamps = {}
+    for root, dirs, files in os.walk(store_dir):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        relative = os.path.relpath(root, store_dir)
+        for name in files:
+            if not name.endswith(".gpg") or name.startswith("."):
+                continue
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            path = os.path.normpath(os.path.join(relative, name[:-4]))
+            stamps[path.replace(os.sep, "/")] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+class ContentIndex:
+    """
+    Inverted index from words to the entries containing them.
+
+    Every query word has to be the start of a word in an entry for the
+    entry to match. The words are also kept sorted, so the ones starting
+    with a query word are found with a binary search.
+    """
+
+    def __init__(self):
+        self.stamps = {}
+        self.entry_tokens = {}
+        self.postings = {}
+        self.tokens = []
+
+    def __len__(self):
+        return len(self.stamps)
+
+    def add(self, path, stamp, tokens):
+        """
+        Index an entry, replacing an earlier version of it.
+
+        :param path: Path of the entry relative to the store root.
+        :param stamp: The version of the file the tokens were read from.
+        :param tokens: Set of the words in the entry.
+        """
+        self.remove(path)
+        self.stamps[path] = stamp
+        self.entry_tokens[path] = tokens
+        for token in tokens:
+            paths = self.postings.get(token)
+            if paths is None:
+                paths = self.postings[token] = set()
+                insort(self.tokens, token)
+            paths.add(path)
+
+    def remove(self, path):
+        """
+        Remove an entry from the index.
+
+        :param path: Path of the entry relative to the store root.
+        """
+        self.stamps.pop(path, None)
+        for token in self.entry_tokens.pop(path, ()):
+            paths = self.postings[token]
+            paths.discard(path)
+            if not paths:
+                del self.postings[token]
+                del self.tokens[bisect_left(self.tokens, token)]
+
+    def is_current(self, path, stamp):
+        """
+        :param path: Path of the entry relative to the store root.
+        :param stamp: The current version of its file.
+        :return: True when the entry was indexed from this version.
+        """
+        return self.stamps.get(path) == stamp
+
+    def matches(self, path, words):
+        """
+        :param path: Path of an indexed entry.
+        :param words: The words of a query, see tokenize.
+        :return: True when every word starts a word of the entry.
+        """
+        tokens = self.entry_tokens.get(path)
+        if not tokens or not words:
+            return False
+        return all(any(token.startswith(word) for token in tokens) for word in words)
+
+    def search(self, query):
+        """
+        :param query: The text to search for.
+        :return: Sorted list of the paths of the matching entries.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        result = None
+        tokens = self.tokens
+        for word in sorted(words, key=len, reverse=True):
+            paths = set()
+            position = bisect_left(tokens, word)
+            while position < len(tokens) and tokens[position].startswith(word):
+                paths |= self.postings[tokens[position]]
+                position += 1
+            result = paths if result is None else result & paths
+            if not result:
+                return []
+        return sorted(result)
+
+    def wipe(self):
+        """
+        Forget everything that was indexed.
+        """
+        self.stamps.clear()
+        self.entry_tokens.clear()
+        self.postings.clear()
+        self.tokens.clear()
+
+
+class ContentIndexer(QObject):
+    """
+    Keeps a ContentIndex of a password store up to date in the background.
+
+    entry_indexed(path) is emitted on the GUI thread for every entry added
+    to the index, entries_removed(paths) when entries that are gone from
+    the store were dropped from it, progress(done, total) as entries are decrypted,
+    finished(error) when a run is over and wiped() when the index was
+    wiped. A run stops at the first entry that can not be decrypted, so a
+    cancelled pinentry does not ask again for every entry.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    entry_indexed = pyqtSignal(str)
+    entries_removed = pyqtSignal(list)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(str)
+    wiped = pyqtSignal()
+    scan_done = pyqtSignal(int, dict)
+    job_done = pyqtSignal(int, str, object, object, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = ContentIndex()
+        self.executor = None
+        self.store_dir = None
+        self.backend = None
+        self.generation = 0
+        self.running = False
+        self.rescan = False
+        self.done = 0
+        self.total = 0
+        self.scan_done.connect(self.on_scan_done)
+        self.job_done.connect(self.on_job_done)
+
+    def start(self, store_dir, backend):
+        """
+        Bring the index up to date with the store, decrypting the entries
+        that are new or changed since they were indexed.
+
+        :param store_dir: Root directory of the password store.
+        :param backend: The crypto backend to decrypt with.
+        """
+        if store_dir != self.store_dir:
+            self.wipe()
+            self.store_dir = store_dir
+        self.backend = backend
+        if self.running:
+            self.rescan = True
+            return
+        self.running = True
+        self.rescan = False
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=MAX_JOBS, thread_name_prefix="index"
+            )
+        self.executor.submit(self.scan, self.generation, store_dir)
+
+    def scan(self, generation, store_dir):
+        """Find the entries of the store, runs on a worker thread."""
+        self.scan_done.emit(generation, scan_store(store_dir))
+
+    def on_scan_done(self, generation, stamps):
+        """
+        Drop entries that are gone and queue the ones that changed.
+
+        :param generation: The generation the scan was started in.
+        :param stamps: Dict of entry path to the version of its file.
+        """
+        if generation != self.generation:
+            return
+        removed = sorted(set(self.index.stamps) - set(stamps))
+        for path in removed:
+            self.index.remove(path)
+        if removed:
+            self.entries_removed.emit(removed)
+        todo = [
+            (path, stamp)
+            for path, stamp in sorted(stamps.items())
+            if not self.index.is_current(path, stamp)
+        ]
+        self.done = 0
+        self.total = len(todo)
+        self.progress.emit(0, self.total)
+        if not todo:
+            self.finish("")
+            return
+        for path, stamp in todo:
+            self.executor.submit(self.decrypt, generation, path, stamp)
+
+    def decrypt(self, generation, path, stamp):
+        """Decrypt an entry and collect its words, runs on a worker thread."""
+        if generation != self.generation:
+            return
+        key_path = os.path.join(self.store_dir, os.path.normpath(path) + ".gpg")
+        try:
+            key_data = self.backend.decrypt(key_path, timeout=DECRYPT_TIMEOUT)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            # Any error has to end the run, or it would stay running.
+            message = f"{path}: {str(error) or type(error).__name__}"
+            self.job_done.emit(generation, path, stamp, None, message)
+            return
+        self.job_done.emit(generation, path, stamp, content_tokens(key_data), "")
+
+    def on_job_done(
+        self, generation, path, stamp, tokens, error
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        """
+        Add a decrypted entry to the index, stopping the run on errors.
+        """
+        if generation != self.generation:
+            return
+        if error:
+            self.stop()
+            self.finish(error)
+            return
+        self.index.add(path, stamp, tokens)
+        self.done += 1
+        self.entry_indexed.emit(path)
+        self.progress.emit(self.done, self.total)
+        if self.done == self.total:
+            self.finish("")
+
+    def finish(self, error):
+        """
+        End a run, starting another one when the store changed meanwhile.
+
+        :param error: An error message, '' on success.
+        """
+        self.running = False
+        self.finished.emit(error)
+        if self.rescan and not error:
+            self.start(self.store_dir, self.backend)
+
+    def stop(self):
+        """
+        Stop the current run, results of running jobs are ignored.
+        """
+        self.generation += 1
+        self.running = False
+        self.rescan = False
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def wipe(self):
+        """
+        Stop indexing and forget everything that was indexed.
+        """
+        was_active = self.running or len(self.index) > 0
+        self.stop()
+        self.index.wipe()
+        if was_active:
+            self.wiped.emit()
@@ -0,0 +1,132 @@
+"""
+This module defines the ContentSearchDialog class, a PyQt6 QDialog subclass.
+
+The ContentSearchDialog searches the decrypted contents of the password
+entries, like user names, URLs and notes, through a ContentIndexer. Results
+show up while the entries are still being indexed.
+"""
+
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtWidgets import (
+    QDialog,
+    QLabel,
+    QLineEdit,
+    QListWidget,
+    QVBoxLayout,
+)
+
+from content_index import tokenize
+
+
+class ContentSearchDialog(QDialog):
+    """
+    A dialog to find the entries containing some words.
+
+    path_activated(path) is emitted when a result is double clicked or
+    entered.
+    """
+
+    path_activated = pyqtSignal(str)
+
+    def __init__(self, indexer, parent=None):
+        super().__init__(parent)
+        self.indexer = indexer
+        self.words = set()
+        self.search_box = QLineEdit(self)
+        self.result_list = QListWidget(self)
+        self.status_label = QLabel(self)
+        self.setWindowTitle(self.tr("Search contents"))
+        self.init_ui()
+        indexer.entry_indexed.connect(self.on_entry_indexed)
+        indexer.entries_removed.connect(self.on_entries_removed)
+        indexer.progress.connect(self.on_progress)
+        indexer.finished.connect(self.on_finished)
+        indexer.wiped.connect(self.on_wiped)
+
+    def init_ui(self):
+        """
+        Sets up the user interface for the search dialog.
+        """
+        layout = QVBoxLayout(self)
+        self.search_box.setPlaceholderText(
+            self.tr("Type here to search user names, URLs and notes...")
+        )
+        self.search_box.textChanged.connect(self.search)
+        layout.addWidget(self.search_box)
+        self.result_list.setSortingEnabled(True)
+        self.result_list.itemActivated.connect(
+            lambda item: self.path_activated.emit(item.text())
+        )
+        layout.addWidget(self.result_list)
+        layout.addWidget(self.status_label)
+        self.resize(400, 400)
+
+    def search(self, text):
+        """
+        Show the indexed entries matching text.
+
+        :param text: The text typed into the search box.
+        """
+        self.words = tokenize(text)
+        self.result_list.clear()
+        self.result_list.addItems(self.indexer.index.search(text))
+
+    def on_entry_indexed(self, path):
+        """
+        Add an entry that was just indexed to the results when it matches,
+        or remove it when it was changed and no longer matches.
+
+        :param path: Path of the entry relative to the store root.
+        """
+        items = self.result_list.findItems(path, Qt.MatchFlag.MatchExactly)
+        if not self.indexer.index.matches(path, self.words):
+            for item in items:
+                self.result_list.takeItem(self.result_list.row(item))
+        elif not items:
+            self.result_list.addItem(path)
+
+    def on_entries_removed(self, paths):
+        """
+        Remove the results of entries that are gone from the store.
+
+        :param paths: Paths of the entries relative to the store root.
+        """
+        for path in paths:
+            for item in self.result_list.findItems(path, Qt.MatchFlag.MatchExactly):
+                self.result_list.takeItem(self.result_list.row(item))
+
+    def on_progress(self, done, total):
+        """
+        Show how far the indexing is.
+
+        :param done: The number of entries indexed so far.
+        :param total: The number of entries to index.
+        """
+        if done < total:
+            self.status_label.setText(
+                self.tr("Indexing {} of {} entries...").format(done + 1, total)
+            )
+
+    def on_finished(self, error):
+        """
+        Show whether all entries were indexed.
+
+        :param error: An error message, '' on success.
+        """
+        if error:
+            self.status_label.setText(
+                self.tr("Indexing stopped: {}").format(error.strip())
+            )
+        else:
+            self.status_label.setText(
+                self.tr("{} entries indexed.").format(len(self.indexer.index))
+            )
+
+    def on_wiped(self):
+        """
+        Close the dialog when the index was wiped, e.g. on lock.
+        """
+        self.result_list.clear()
+        self.search_box.clear()
+        self.status_label.clear()
+        self.reject()
@@ -0,0 +1,167 @@
+"""
+This module defines the DecryptService class, which decrypts password
+entries on worker threads so gpg and pinentry never block the GUI.
+
+Every request gets an id that is handed back with the result. Requests
+can be cancelled, which kills their gpg process, so moving through the
+tree only ever leaves the decryption of the current entry running.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer, pyqtSignal
+
+from key_cache import KeyCache
+
+DECRYPT_TIMEOUT = 120
+MAX_WORKERS = 2
+
+
+class DecryptJob:
+    """
+    Decrypts a single password file and reports back to the DecryptService.
+    """
+
+    def __init__(self, service, request_id, path, key_path):
+        self.service = service
+        self.request_id = request_id
+        self.path = path
+        self.key_path = key_path
+        self.backend = service.backend
+        self.process = None
+        self.cancelled = False
+
+    def set_process(self, process):
+        """
+        Remember the running gpg process, killing it right away when the
+        job was cancelled before gpg started.
+
+        :param process: The subprocess.Popen of gpg.
+        """
+        self.process = process
+        if self.cancelled:
+            process.kill()
+
+    def cancel(self):
+        """
+        Cancel the job, killing gpg when it is already running.
+        """
+        self.cancelled = True
+        if self.process is not None:
+            self.process.kill()
+
+    def run(self):
+        """Decrypt the file and report the result, runs on a worker thread."""
+        if self.cancelled:
+            return
+        try:
+            data = self.backend.decrypt(
+                self.key_path, timeout=DECRYPT_TIMEOUT, on_start=self.set_process
+            )
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            # Every job has to report back, or it is never cleared. An
+            # empty message would be taken for a successful decryption.
+            message = str(error) or type(error).__name__
+            self.service.job_done.emit(self.request_id, self.path, "", message)
+            return
+        self.service.job_done.emit(self.request_id, self.path, data, "")
+
+
+class DecryptService(QObject):
+    """
+    Runs decryption requests on a small thread pool, using the crypto
+    backend set in the backend attribute (see gpg_utils.get_crypto_backend).
+
+    finished(request_id, path, data) or failed(request_id, path, message)
+    is emitted on the GUI thread for every request that was not cancelled.
+    Results are kept in a KeyCache, which is used instead of gpg when it is
+    enabled and still holds the entry.
+    """
+
+    finished = pyqtSignal(int, str, str)
+    failed = pyqtSignal(int, str, str)
+    job_done = pyqtSignal(int, str, str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.executor = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="decrypt"
+        )
+        self.jobs = {}
+        self.last_id = 0
+        self.cache = KeyCache()
+        self.backend = None
+        self.job_done.connect(self.on_job_done)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def request(self, store, path):
+        """
+        Queue the decryption of a password entry.
+
+        :param store: The passpy Store the entry belongs to.
+        :param path: Path of the entry relative to the store root.
+        :return: The id of the request.
+        """
+        self.last_id += 1
+        key_path = os.path.join(store.store_dir, os.path.normpath(path) + ".gpg")
+        job = DecryptJob(self, self.last_id, path, key_path)
+        self.jobs[self.last_id] = job
+        data = self.cache.get(job.key_path)
+        if data is not None:
+            # Still deliver the result asynchronously, like gpg results.
+            QTimer.singleShot(
+                0, partial(self.job_done.emit, job.request_id, path, data, "")
+            )
+        else:
+            self.executor.submit(job.run)
+        return self.last_id
+
+    def cached(self, store, path):
+        """
+        :param store: The passpy Store the entry belongs to.
+        :param path: Path of the entry relative to the store root.
+        :return: The cached decrypted contents of the entry, or None.
+        """
+        return self.cache.get(
+            os.path.join(store.store_dir, os.path.normpath(path) + ".gpg")
+        )
+
+    def cancel(self, request_id=None):
+        """
+        Cancel a pending request, or all of them.
+
+        :param request_id: The id of the request, None to cancel all.
+        """
+        if request_id is None:
+            request_ids = list(self.jobs)
+        else:
+            request_ids = [request_id]
+        for cancelled_id in request_ids:
+            job = self.jobs.pop(cancelled_id, None)
+            if job is not None:
+                job.cancel()
+
+    def shutdown(self):
+        """
+        Cancel everything, wipe the cache and stop the worker threads.
+        """
+        self.cancel()
+        self.cache.wipe()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def on_job_done(self, request_id, path, data, error):
+        """
+        Pass the result of a job on, unless the request was cancelled.
+        """
+        job = self.jobs.pop(request_id, None)
+        if job is None or job.cancelled:
+            return
+        if error:
+            self.failed.emit(request_id, path, error)
+        else:
+            self.cache.put(job.key_path, data)
+            self.finished.emit(request_id, path, data)
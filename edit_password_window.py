@@ -22,6 +22,7 @@ from PyQt6.QtWidgets import (
 )
 
 from settings_manager import SettingsManager
+from store_transaction import StoreTransaction
 
 CHARACTER_SETS = [
     string.ascii_letters + string.digits + string.punctuation,
@@ -55,7 +56,9 @@ class EditPasswordDialog(QDialog):
 
     # pylint: disable=too-many-instance-attributes
 
-    def __init__(self, store, path, name, create=False, parent=None):
+    def __init__(
+        self, store, path, name, create=False, parent=None, key_data=None, backend=None
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
         super().__init__(parent)
         self.info_text_edit = None
         self.length_edit = None
@@ -65,6 +68,8 @@ class EditPasswordDialog(QDialog):
         self.store = store
         self.path = path
         self.create = create
+        self.key_data = key_data
+        self.backend = backend
         if create:
             self.setWindowTitle(self.tr("New password {}").format(name))
         else:
@@ -77,14 +82,7 @@ class EditPasswordDialog(QDialog):
         """
         layout = QVBoxLayout(self)
 
-        password = ""
-        information = ""
-        if not self.create:
-            data = self.store.get_key(self.path)
-            lines = data.splitlines(True)  # 'True' keeps the newline characters
-            if lines:
-                password = lines[0].rstrip("\n")
-                information = "".join(lines[1:])
+        password, information = self.read_entry()
 
         settings = SettingsManager()
 
@@ -144,6 +142,23 @@ class EditPasswordDialog(QDialog):
 
         self.setLayout(layout)
 
+    def read_entry(self):
+        """
+        Get the password and the other information of the entry, using the
+        already decrypted contents when they were passed in.
+
+        :return: Tuple of (password, information), empty for new entries.
+        """
+        if self.create:
+            return "", ""
+        data = self.key_data
+        if data is None:
+            data = self.store.get_key(self.path)
+        lines = data.splitlines(True)  # 'True' keeps the newline characters
+        if not lines:
+            return "", ""
+        return lines[0].rstrip("\n"), "".join(lines[1:])
+
     def toggle_password_visibility(self, _state):
         """Show or hide password"""
         if self.show_password_checkbox.isChecked():
@@ -162,7 +177,8 @@ class EditPasswordDialog(QDialog):
         """Save the password"""
         data = self.password_edit.text() + "\n" + self.info_text_edit.toPlainText()
         try:
-            self.store.set_key(self.path, data, force=not self.create)
+            with StoreTransaction(self.store, self.backend) as transaction:
+                transaction.set_key(self.path, data, force=not self.create)
         except FileExistsError:
             QMessageBox.warning(
                 self,
@@ -170,4 +186,11 @@ class EditPasswordDialog(QDialog):
                 self.tr("Password already exists at: {}").format(self.path),
             )
             return
+        except OSError as error:
+            QMessageBox.critical(
+                self,
+                self.tr("Saving failed"),
+                self.tr("Could not save {}: {}").format(self.path, error),
+            )
+            return
         self.accept()
@@ -0,0 +1,408 @@
+"""
+This module defines the FuzzyIndex and FuzzyFilterProxyModel classes, which
+filter the password tree with fuzzy matching on the full entry paths.
+
+An entry matches when the characters of the filter appear in its path in
+the same order, so 'wgh' finds 'web/github'. For every character the index
+keeps the entries containing it with the position of its first occurrence,
+and the matches for every prefix of the filter are kept. Typing another
+character only checks the matches of the previous prefix, and deleting
+one goes back to the matches that were already known.
+"""
+
+import heapq
+
+from PyQt6.QtCore import QObject, QSortFilterProxyModel, QTimer, pyqtSignal
+
+FILTER_DELAY = 100
+
+
+def normalize_query(text):
+    """
+    :param text: The text typed into the filter.
+    :return: The lower case query without white space.
+    """
+    return "".join(text.lower().split())
+
+
+def match_score(path, query):
+    """
+    Rank a matching path, lower is better.
+
+    Paths containing the query as is come first, especially when it is in
+    the name of the entry, then shorter paths.
+
+    :param path: The lower case path of the entry.
+    :param query: The normalized query.
+    :return: A sortable score.
+    """
+    position = path.find(query)
+    if position < 0:
+        return 2, len(path)
+    if position >= path.rfind("/") + 1:
+        return 0, len(path)
+    return 1, len(path)
+
+
+class FuzzyIndex:
+    """
+    Character index over the full paths of password entries.
+
+    Entries are identified by their StoreIndex id.
+    """
+
+    def __init__(self):
+        self.paths = {}
+        self.postings = {}
+        self.query = ""
+        self.states = []
+
+    def __len__(self):
+        return len(self.paths)
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self.paths.clear()
+        self.postings.clear()
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the matches of the current query, after the entries changed.
+        """
+        self.query = ""
+        self.states = []
+
+    def add(self, entry, path):
+        """
+        Index an entry, replacing an earlier version of it.
+
+        :param entry: The id of the entry.
+        :param path: The full path of the entry.
+        """
+        if entry in self.paths:
+            self.remove(entry)
+        path = path.lower()
+        self.paths[entry] = path
+        first = {}
+        for position, char in enumerate(path):
+            if char not in first:
+                first[char] = position + 1
+        for char, position in first.items():
+            posting = self.postings.get(char)
+            if posting is None:
+                posting = self.postings[char] = {}
+            posting[entry] = position
+        self.reset()
+
+    def remove(self, entry):
+        """
+        Remove an entry from the index.
+
+        :param entry: The id of the entry.
+        """
+        path = self.paths.pop(entry, None)
+        if path is None:
+            return
+        for char in set(path):
+            del self.postings[char][entry]
+        self.reset()
+
+    def step(self, matches, char):
+        """
+        Narrow down matches with the next character of the query.
+
+        :param matches: Dict of entry id to the position after the matched
+            characters, None for the empty query.
+        :param char: The next character.
+        :return: Dict of the entries that still match.
+        """
+        posting = self.postings.get(char)
+        if not posting:
+            return {}
+        if matches is None:
+            return posting
+        paths = self.paths
+        narrowed = {}
+        get = posting.get
+        for entry, start in matches.items():
+            position = get(entry, 0)
+            if position > start:
+                narrowed[entry] = position
+            elif position:
+                position = paths[entry].find(char, start)
+                if position >= 0:
+                    narrowed[entry] = position + 1
+        return narrowed
+
+    def search(self, text):
+        """
+        Find the entries matching a filter text.
+
+        :param text: The text typed into the filter.
+        :return: Dict with the ids of the matching entries as keys, None
+            for an empty filter. The dict must not be changed.
+        """
+        query = normalize_query(text)
+        common = 0
+        while (
+            common < min(len(query), len(self.query))
+            and query[common] == self.query[common]
+        ):
+            common += 1
+        del self.states[common:]
+        matches = self.states[-1] if self.states else None
+        for char in query[common:]:
+            matches = self.step(matches, char)
+            self.states.append(matches)
+        self.query = query
+        return matches
+
+    def ranked(self, limit=1):
+        """
+        :param limit: The number of entries to return.
+        :return: List of the best matching entries of the current query.
+        """
+        if not self.states:
+            return []
+        paths = self.paths
+        query = self.query
+        return heapq.nsmallest(
+            limit,
+            self.states[-1],
+            key=lambda entry: match_score(paths[entry], query),
+        )
+
+
+class FuzzyFilterProxyModel(QSortFilterProxyModel):
+    """
+    Proxy model that shows the entries of a StoreModel matching a
+    FuzzyIndex query, and the folders they are in.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.visible = None
+
+    def set_matches(self, matches):
+        """
+        Show only the given entries and their folders.
+
+        :param matches: Ids of the matching entries, None to show everything.
+        """
+        if matches is None:
+            visible = None
+        else:
+            store_index = self.sourceModel().store_index
+            visible = set()
+            for entry in matches:
+                while entry > 0 and entry not in visible:
+                    visible.add(entry)
+                    entry = store_index.parent(entry)
+        if visible is None and self.visible is None:
+            return
+        self.visible = visible
+        self.invalidateRowsFilter()
+
+    def filterAcceptsRow(
+        self, source_row, source_parent
+    ):  # pylint: disable=invalid-name
+        """Accept the rows that are visible for the current filter."""
+        if self.visible is None:
+            return True
+        model = self.sourceModel()
+        children = model.store_index.child_ids(model.entry_from_index(source_parent))
+        return source_row < len(children) and children[source_row] in self.visible
+
+
+class FuzzyFilter(QObject):
+    """
+    Keeps a FuzzyIndex in sync with a StoreModel and applies the filter
+    text to a FuzzyFilterProxyModel, once typing pauses for FILTER_DELAY
+    milliseconds.
+
+    The index is built the first time a filter is applied and updated as
+    the model changes after that. filtered(count) is emitted with the
+    number of matching entries after a filter was applied, -1 when the
+    filter was cleared.
+    """
+
+    filtered = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = FuzzyIndex()
+        self.proxy = FuzzyFilterProxyModel(self)
+        self.model = None
+        self.built = False
+        self.moving = []
+        self.text = ""
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(FILTER_DELAY)
+        self.timer.timeout.connect(self.apply)
+
+    def set_model(self, model):
+        """
+        Filter another model, the index is rebuilt when it is needed.
+
+        :param model: The StoreModel to filter.
+        """
+        if self.model is not None:
+            self.model.rowsInserted.disconnect(self.on_rows_inserted)
+            self.model.rowsAboutToBeRemoved.disconnect(self.on_rows_removed)
+            self.model.rowsAboutToBeMoved.disconnect(self.on_rows_about_to_move)
+            self.model.rowsMoved.disconnect(self.on_rows_moved)
+            self.model.dataChanged.disconnect(self.on_data_changed)
+        self.model = model
+        self.built = False
+        self.index.clear()
+        self.proxy.visible = None
+        self.proxy.setSourceModel(model)
+        model.rowsInserted.connect(self.on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self.on_rows_removed)
+        model.rowsAboutToBeMoved.connect(self.on_rows_about_to_move)
+        model.rowsMoved.connect(self.on_rows_moved)
+        model.dataChanged.connect(self.on_data_changed)
+        if self.text:
+            self.timer.start()
+
+    def set_text(self, text):
+        """
+        Filter on text once typing pauses.
+
+        :param text: The text typed into the filter.
+        """
+        self.text = text
+        self.timer.start()
+
+    def apply(self):
+        """
+        Apply the filter text right away.
+        """
+        self.timer.stop()
+        if self.model is None:
+            # Applied once there is a model to filter.
+            return
+        if self.text and not self.built:
+            self.build()
+        matches = self.index.search(self.text) if self.built else None
+        self.proxy.set_matches(matches)
+        self.filtered.emit(-1 if matches is None else len(matches))
+
+    def build(self):
+        """
+        List the whole store and index all entries.
+        """
+        self.model.fetch_all()
+        store_index = self.model.store_index
+        for entry in store_index.entries():
+            self.index.add(entry, store_index.full_path(entry))
+        self.built = True
+
+    def search(self, text):
+        """
+        Find the entries matching a text without changing the filter of the
+        tree view, building the index when needed.
+
+        :param text: The text to search for.
+        :return: List of the paths of the matching entries, best first.
+        """
+        if self.model is None:
+            return []
+        if not self.built:
+            self.build()
+        matches = self.index.search(text)
+        paths = self.index.paths
+        query = normalize_query(text)
+        ranked = sorted(
+            paths if matches is None else matches,
+            key=lambda entry: match_score(paths[entry], query),
+        )
+        # Go back to the matches of the filter, for best_match().
+        self.index.search(self.text)
+        return [self.model.store_index.full_path(entry) for entry in ranked]
+
+    def best_match(self):
+        """
+        :return: The source model index of the best match, or None.
+        """
+        ranked = self.index.ranked() if self.text else []
+        if not ranked:
+            return None
+        return self.model.index_from_entry(ranked[0])
+
+    def subtree(self, parent, first, last):
+        """
+        :param parent: A source model index.
+        :param first: The first row below parent.
+        :param last: The last row below parent.
+        :return: List of the ids of the listed entries in the rows, including
+            the ones in folders.
+        """
+        store_index = self.model.store_index
+        pending = list(
+            store_index.child_ids(self.model.entry_from_index(parent))[first : last + 1]
+        )
+        entries = []
+        while pending:
+            entry = pending.pop()
+            if store_index.is_folder(entry):
+                pending.extend(store_index.child_ids(entry))
+            else:
+                entries.append(entry)
+        return entries
+
+    def update(self, entries):
+        """
+        Re-index entries that were added, moved or renamed and filter again.
+
+        :param entries: Ids of the entries.
+        """
+        store_index = self.model.store_index
+        for entry in entries:
+            self.index.add(entry, store_index.full_path(entry))
+        if self.text:
+            self.timer.start()
+
+    def on_rows_inserted(self, parent, first, last):
+        """Index inserted entries, listing inserted folders first."""
+        if not self.built:
+            return
+        store_index = self.model.store_index
+        inserted = store_index.child_ids(self.model.entry_from_index(parent))
+        for entry in inserted[first : last + 1]:
+            if store_index.is_folder(entry) and not store_index.is_listed(entry):
+                # E.g. folders picked up by sync_folder, their rows are
+                # inserted and indexed while they are fetched.
+                self.model.fetchMore(self.model.index_from_entry(entry))
+        self.update(self.subtree(parent, first, last))
+
+    def on_rows_removed(self, parent, first, last):
+        """Remove entries that are about to be removed from the index."""
+        if not self.built:
+            return
+        for entry in self.subtree(parent, first, last):
+            self.index.remove(entry)
+        if self.text:
+            self.timer.start()
+
+    def on_rows_about_to_move(self, parent, first, last):
+        """Remember the entries that are moved, their paths change."""
+        if self.built:
+            self.moving = self.subtree(parent, first, last)
+
+    def on_rows_moved(self):
+        """Re-index moved entries under their new paths."""
+        if self.built:
+            self.update(self.moving)
+        self.moving = []
+
+    def on_data_changed(self, top_left, bottom_right):
+        """Re-index renamed entries."""
+        if self.built:
+            self.update(
+                self.subtree(top_left.parent(), top_left.row(), bottom_right.row())
+            )
@@ -0,0 +1,200 @@
+"""
+This module defines the GitRunner class, which runs git pull and push in
+the background with QProcess, so a slow remote never freezes the window.
+
+The --progress output of git is passed on line by line, for showing it
+in the status bar, and running operations can be cancelled.
+"""
+
+import os
+import re
+
+from PyQt6.QtCore import (
+    QDeadlineTimer,
+    QObject,
+    QProcess,
+    QProcessEnvironment,
+    pyqtSignal,
+)
+
+import tracing
+from git_utils import read_head
+
+OK = 0
+FAILED = 1
+CANCELLED = 2
+
+PROGRESS_PATTERN = re.compile(r":\s+\d+% \(")
+
+
+class GitRunner(QObject):
+    """
+    Runs git operations one at a time, queueing the ones that come in while
+    another is running.
+
+    finished(operation, status, output, head_changed) is emitted for every
+    operation, status is OK, FAILED or CANCELLED and head_changed tells
+    whether the checked out commit changed, e.g. because a pull brought in
+    new commits. While it is emitted, current_automatic tells whether the
+    operation was run automatically rather than asked for by the user.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(str, int, str, bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.queue = []
+        self.process = None
+        self.current = None
+        self.current_automatic = False
+        self.automatic = set()
+        self.head = None
+        self.started = None
+        self.output = []
+        self.cancelled = False
+
+    def is_busy(self):
+        """
+        :return: True while an operation is running or queued.
+        """
+        return self.process is not None or bool(self.queue)
+
+    def run(self, path, operation, automatic=False):
+        """
+        Run a git operation, after the ones already queued.
+
+        Operations that are already queued for the same repository are not
+        queued again, the queued one counts as automatic when either is.
+
+        :param path: Directory of the git repository, may contain '~'.
+        :param operation: The git subcommand, 'pull' or 'push'.
+        :param automatic: True when the user did not ask for the operation.
+        """
+        job = (os.path.expanduser(path), operation)
+        if automatic:
+            self.automatic.add(job)
+        if job in self.queue:
+            return
+        self.queue.append(job)
+        if self.process is None:
+            self.start_next()
+
+    def start_next(self):
+        """
+        Start the next queued operation.
+        """
+        if not self.queue:
+            return
+        self.current = self.queue.pop(0)
+        self.current_automatic = self.current in self.automatic
+        self.automatic.discard(self.current)
+        path, operation = self.current
+        self.head = read_head(path)
+        self.started = tracing.now()
+        self.output = []
+        self.cancelled = False
+        self.process = QProcess(self)
+        environment = QProcessEnvironment.systemEnvironment()
+        environment.insert("GIT_TERMINAL_PROMPT", "0")
+        self.process.setProcessEnvironment(environment)
+        self.process.readyReadStandardOutput.connect(self.on_output)
+        self.process.readyReadStandardError.connect(self.on_output)
+        self.process.finished.connect(self.on_finished)
+        self.process.errorOccurred.connect(self.on_error)
+        self.process.start("git", ["-C", path, operation, "--progress"])
+
+    def on_output(self):
+        """
+        Collect the output of git and pass the latest line on.
+
+        git rewrites progress lines with carriage returns, of those only the
+        final ones are kept in the output.
+        """
+        data = bytes(self.process.readAllStandardOutput())
+        data += bytes(self.process.readAllStandardError())
+        text = data.decode("utf-8", errors="replace")
+        lines = [line.strip() for line in text.replace("\r", "\n").split("\n")]
+        lines = [line for line in lines if line]
+        if not lines:
+            return
+        self.output.extend(
+            line
+            for line in lines
+            if not PROGRESS_PATTERN.search(line) or line.endswith("done.")
+        )
+        self.progress.emit(lines[-1])
+
+    def on_error(self, error):
+        """
+        Finish the operation when git could not be started at all.
+
+        :param error: The QProcess.ProcessError.
+        """
+        if error == QProcess.ProcessError.FailedToStart:
+            self.output.append(self.process.errorString())
+            self.done(FAILED)
+
+    def on_finished(self, exit_code, exit_status):
+        """
+        Finish the operation when git exits.
+
+        :param exit_code: The exit code of git.
+        :param exit_status: The QProcess.ExitStatus.
+        """
+        self.on_output()
+        if self.cancelled:
+            self.done(CANCELLED)
+        elif exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0:
+            self.done(OK)
+        else:
+            self.done(FAILED)
+
+    def done(self, status):
+        """
+        Report the result of the current operation and start the next one.
+
+        :param status: OK, FAILED or CANCELLED.
+        """
+        if self.process is None:
+            return
+        path, operation = self.current
+        tracing.complete(
+            f"git {operation}", "git", self.started, path=path, status=status
+        )
+        process = self.process
+        self.process = None
+        self.current = None
+        process.deleteLater()
+        head_changed = read_head(path) != self.head
+        self.finished.emit(operation, status, "\n".join(self.output), head_changed)
+        self.current_automatic = False
+        self.start_next()
+
+    def cancel(self):
+        """
+        Cancel the running operation and drop the queued ones.
+        """
+        self.queue.clear()
+        self.automatic.clear()
+        if self.process is not None:
+            self.cancelled = True
+            self.process.kill()
+
+    def shutdown(self, timeout=5000):
+        """
+        Give the running and queued operations some time to finish before
+        quitting, e.g. a push of the last changes, killing git after that.
+
+        :param timeout: Milliseconds to wait for git.
+        """
+        deadline = QDeadlineTimer(timeout)
+        while self.process is not None:
+            # Finishing an operation starts the next queued one.
+            if not self.process.waitForFinished(max(0, deadline.remainingTime())):
+                self.cancel()
+                if self.process is not None:
+                    self.process.waitForFinished(1000)
+                break
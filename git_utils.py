@@ -8,6 +8,8 @@ the password store can be synchronised with a remote repository.
 import os
 import subprocess
 
+import tracing
+
 
 def is_git_repo(path):
     """
@@ -27,14 +29,16 @@ def run_git(path, *args):
     :param args: The git subcommand and its arguments.
     :return: Tuple of (success, combined output).
     """
+    operation = f"git {args[0]}" if args else "git"
     try:
-        result = subprocess.run(
-            ["git", "-C", os.path.expanduser(path)] + list(args),
-            capture_output=True,
-            text=True,
-            timeout=120,
-            check=False,
-        )
+        with tracing.span(operation, "git", path=path, args=args[1:]):
+            result = subprocess.run(
+                ["git", "-C", os.path.expanduser(path)] + list(args),
+                capture_output=True,
+                text=True,
+                timeout=120,
+                check=False,
+            )
     except (OSError, subprocess.TimeoutExpired) as error:
         return False, str(error)
     output = (result.stdout + result.stderr).strip()
@@ -70,3 +74,32 @@ def git_push(path):
     :return: Tuple of (success, combined output).
     """
     return run_git(path, "push")
+
+
+def read_head(path):
+    """
+    Read the commit HEAD points to straight from the repository files,
+    without running git.
+
+    :param path: Directory of the git repository, may contain '~'.
+    :return: The commit id of HEAD, or None when it can not be read.
+    """
+    git_dir = os.path.join(os.path.expanduser(path), ".git")
+    try:
+        with open(os.path.join(git_dir, "HEAD"), "r", encoding="utf-8") as head:
+            value = head.read().strip()
+        if not value.startswith("ref: "):
+            return value
+        ref = value[5:]
+        ref_path = os.path.join(git_dir, *ref.split("/"))
+        if os.path.isfile(ref_path):
+            with open(ref_path, "r", encoding="utf-8") as ref_file:
+                return ref_file.read().strip()
+        with open(os.path.join(git_dir, "packed-refs"), "r", encoding="utf-8") as refs:
+            for line in refs:
+                commit, _, name = line.strip().partition(" ")
+                if name == ref:
+                    return commit
+    except OSError:
+        return None
+    return None
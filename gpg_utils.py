@@ -1,28 +1,262 @@
 """
 GPG helper functions for PyQtPass.
 
-Used to detect the gpg binary, list the available keys and read the
-.gpg-id files that determine which keys a password (sub)store is
-encrypted for.
+Used to detect the gpg binary, decrypt and encrypt password files through
+a pluggable crypto backend, list the available keys and read the .gpg-id
+files that determine which keys a password (sub)store is encrypted for.
 """
 
+import importlib.util
 import os
+import re
 import shutil
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-from passpy.git import git_add_path
-from passpy.gpg import reencrypt_path
+import tracing
 
+CRYPTO_BACKENDS = ["subprocess", "gpgme"]
+HEX_PATTERN = re.compile(r"(?:0[xX])?([0-9a-fA-F]+)")
+KEY_ID_SUFFIXES = [8, 16]
+KEYRING_FILES = ["pubring.kbx", "pubring.gpg", "private-keys-v1.d", "secring.gpg"]
 
+
+@lru_cache(maxsize=None)
 def which_gpg():
     """
     Find the gpg binary, preferring gpg2 like pass itself does.
 
+    The result is cached, the PATH is only searched once.
+
     :return: Name of the gpg binary ('gpg2' or 'gpg').
     """
     return "gpg2" if shutil.which("gpg2") else "gpg"
 
 
+@tracing.traced("gpg")
+def decrypt_file(
+    path, gpg_bin, gpg_opts, timeout=120, on_start=None, binary=False
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    Decrypt a password file with the gpg binary.
+
+    :param path: Absolute path of the .gpg file.
+    :param gpg_bin: The gpg binary to use.
+    :param gpg_opts: List of extra gpg options, like passpy's Store.gpg_opts.
+    :param timeout: Seconds after which gpg is killed.
+    :param on_start: Optional callable that gets the subprocess.Popen of
+        gpg as soon as it runs, so it can be killed from another thread.
+    :param binary: True to return the contents as bytes, unchanged.
+    :return: The decrypted contents as a string, or bytes when binary.
+    :raises FileNotFoundError: when path is not a file.
+    :raises TimeoutError: when gpg did not finish within timeout.
+    :raises OSError: when gpg could not be run or failed to decrypt.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"{path} is not in the password store.")
+    with subprocess.Popen(
+        [gpg_bin] + list(gpg_opts) + ["--decrypt", path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    ) as process:
+        if on_start:
+            on_start(process)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired as error:
+            process.kill()
+            process.communicate()
+            raise TimeoutError(f"gpg timed out decrypting {path}") from error
+    if process.returncode != 0:
+        message = stderr.decode("utf-8", errors="replace").strip()
+        raise OSError(message or f"gpg exited with status {process.returncode}")
+    if binary:
+        return stdout
+    return stdout.decode("utf-8", errors="replace")
+
+
+@tracing.traced("gpg")
+def encrypt_data(data, recipients, gpg_bin, gpg_opts, timeout=120):
+    """
+    Encrypt data for a list of recipients with the gpg binary.
+
+    :param data: The plain text as a string or bytes.
+    :param recipients: List of GPG ids to encrypt for.
+    :param gpg_bin: The gpg binary to use.
+    :param gpg_opts: List of extra gpg options, like passpy's Store.gpg_opts.
+    :param timeout: Seconds after which gpg is killed.
+    :return: The encrypted data as bytes.
+    :raises OSError: when gpg could not be run or failed to encrypt.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    command = [gpg_bin] + list(gpg_opts) + ["--encrypt"]
+    for recipient in recipients:
+        command += ["--recipient", recipient]
+    try:
+        result = subprocess.run(
+            command,
+            input=data,
+            capture_output=True,
+            timeout=timeout,
+            check=False,
+        )
+    except subprocess.TimeoutExpired as error:
+        raise TimeoutError("gpg timed out encrypting") from error
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", errors="replace").strip()
+        raise OSError(message or f"gpg exited with status {result.returncode}")
+    return result.stdout
+
+
+class SubprocessBackend:
+    """
+    Crypto backend that runs the gpg binary for every operation, the way
+    passpy does.
+    """
+
+    name = "subprocess"
+
+    def __init__(self, gpg_bin, gpg_opts):
+        self.gpg_bin = gpg_bin
+        self.gpg_opts = list(gpg_opts)
+
+    def decrypt(self, path, timeout=120, on_start=None, binary=False):
+        """
+        Decrypt a password file, see decrypt_file.
+
+        :return: The decrypted contents as a string, or bytes when binary.
+        """
+        return decrypt_file(
+            path, self.gpg_bin, self.gpg_opts, timeout, on_start, binary
+        )
+
+    def encrypt(self, data, recipients, timeout=120):
+        """
+        Encrypt data for recipients, see encrypt_data.
+
+        :return: The encrypted data as bytes.
+        """
+        return encrypt_data(data, recipients, self.gpg_bin, self.gpg_opts, timeout)
+
+
+class GpgmeBackend:
+    """
+    Crypto backend that uses the GPGME Python bindings (the 'gpg' module)
+    in-process, saving a fork and exec of gpg per operation.
+
+    GPGME contexts are not thread safe, every thread gets its own. The
+    timeout and on_start arguments are accepted for compatibility, an
+    in-process operation cannot be killed; it is up to the caller to drop
+    results it no longer wants.
+    """
+
+    name = "gpgme"
+
+    def __init__(self):
+        # pylint: disable-next=import-outside-toplevel,import-error
+        import gpg
+
+        self.gpg = gpg
+        self.local = threading.local()
+
+    def context(self):
+        """
+        :return: The GPGME context of the calling thread.
+        """
+        context = getattr(self.local, "context", None)
+        if context is None:
+            context = self.gpg.Context(armor=False)
+            self.local.context = context
+        return context
+
+    @tracing.traced("gpg")
+    def decrypt(
+        self, path, timeout=120, on_start=None, binary=False
+    ):  # pylint: disable=unused-argument
+        """
+        Decrypt a password file.
+
+        :param path: Absolute path of the .gpg file.
+        :param binary: True to return the contents as bytes, unchanged.
+        :return: The decrypted contents as a string, or bytes when binary.
+        :raises FileNotFoundError: when path is not a file.
+        :raises OSError: when GPGME failed to decrypt.
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"{path} is not in the password store.")
+        try:
+            with open(path, "rb") as key_file:
+                plaintext, _, _ = self.context().decrypt(key_file, verify=False)
+        except self.gpg.errors.GpgError as error:
+            raise OSError(str(error)) from error
+        if binary:
+            return plaintext
+        return plaintext.decode("utf-8", errors="replace")
+
+    @tracing.traced("gpg")
+    def encrypt(self, data, recipients, timeout=120):  # pylint: disable=unused-argument
+        """
+        Encrypt data for recipients.
+
+        Recipients are resolved through the shared KeyIndex to a key that
+        can be used for encryption, skipping expired, revoked and sign only
+        keys like gpg does, and the trust of the keys is checked by GPGME.
+
+        :param data: The plain text as a string or bytes.
+        :param recipients: List of GPG ids to encrypt for.
+        :return: The encrypted data as bytes.
+        :raises OSError: when a recipient is unknown or GPGME failed.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        key_index = key_listings().key_index()
+        context = self.context()
+        try:
+            keys = []
+            for recipient in recipients:
+                usable = [
+                    key for key in key_index.lookup(recipient) if key["encryption_ids"]
+                ]
+                if not usable:
+                    raise OSError(f"No usable public key for {recipient}")
+                keys.append(context.get_key(usable[0]["fingerprint"]))
+            ciphertext, _, _ = context.encrypt(data, recipients=keys, sign=False)
+        except self.gpg.errors.GpgError as error:
+            raise OSError(str(error)) from error
+        return ciphertext
+
+
+def gpgme_available():
+    """
+    :return: True when the GPGME Python bindings can be imported.
+    """
+    return importlib.util.find_spec("gpg") is not None
+
+
+def get_crypto_backend(name, gpg_bin, gpg_opts):
+    """
+    Create the crypto backend with the given name.
+
+    Falls back to the gpg subprocess backend when GPGME is not available.
+
+    :param name: One of CRYPTO_BACKENDS.
+    :param gpg_bin: The gpg binary for the subprocess backend.
+    :param gpg_opts: The gpg options for the subprocess backend.
+    :return: A SubprocessBackend or GpgmeBackend instance.
+    """
+    if name == "gpgme" and gpgme_available():
+        try:
+            return GpgmeBackend()
+        except (ImportError, OSError):
+            pass
+    return SubprocessBackend(gpg_bin, gpg_opts)
+
+
+@tracing.traced("gpg")
 def list_gpg_keys(secret=False):
     """
     List the GPG keys available in the user's keyring.
@@ -51,24 +285,249 @@ def parse_gpg_colons(output):
     Parse the colon-delimited output of gpg --list-keys.
 
     :param output: The raw gpg output.
-    :return: List of dicts with 'id', 'fingerprint' and 'uids' keys.
+    :return: List of dicts with 'id', 'fingerprint', 'uids' and
+        'encryption_ids' (ids of the usable encryption (sub)keys) keys,
+        the latter empty when the key as a whole can not encrypt, e.g.
+        because it expired, was revoked or disabled.
     """
     keys = []
     current = None
+    usable = False
     for line in output.splitlines():
         fields = line.split(":")
         record = fields[0]
+        capabilities = fields[11] if len(fields) > 11 else ""
         if record in ("pub", "sec"):
-            current = {"id": fields[4], "fingerprint": "", "uids": []}
+            current = {
+                "id": fields[4],
+                "fingerprint": "",
+                "uids": [],
+                "encryption_ids": [],
+            }
             keys.append(current)
+            # Capital letters are the capabilities of the whole key.
+            usable = "E" in capabilities and "D" not in capabilities
         elif current is not None:
             if record == "fpr" and not current["fingerprint"]:
                 current["fingerprint"] = fields[9]
             elif record == "uid":
                 current["uids"].append(fields[9])
+        if (
+            usable
+            and record in ("pub", "sec", "sub", "ssb")
+            and "e" in capabilities
+            and fields[1] not in ("e", "i", "r")
+        ):
+            current["encryption_ids"].append(fields[4].upper())
     return keys
 
 
+def gnupg_home():
+    """
+    :return: The GnuPG home directory gpg uses, GNUPGHOME or ~/.gnupg.
+    """
+    return os.path.expanduser(os.environ.get("GNUPGHOME") or "~/.gnupg")
+
+
+def keyring_stamp():
+    """
+    :return: Tuple identifying the current version of the keyring, the
+        modification time and size of every keyring file in the GnuPG home.
+    """
+    home = gnupg_home()
+    stamp = [home]
+    for name in KEYRING_FILES:
+        try:
+            stat = os.stat(os.path.join(home, name))
+        except OSError:
+            stamp.append(None)
+            continue
+        stamp.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stamp)
+
+
+class KeyListingCache:
+    """
+    Lists the public and secret keys of the keyring at the same time and
+    remembers the result until one of the keyring files changes.
+
+    Listing a large keyring takes gpg seconds, refresh() does it in the
+    background, so it is usually done before the keys are needed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="keys")
+        self.stamp = None
+        self.listing = None
+        self.loading = None
+        self.index = None
+
+    def load(self):
+        """
+        List the public and secret keys, runs on a worker thread.
+
+        Lists again when the keyring changed while gpg was running.
+
+        :return: Tuple of (public keys, secret keys).
+        """
+        while True:
+            stamp = keyring_stamp()
+            secret = self.executor.submit(list_gpg_keys, True)
+            listing = (list_gpg_keys(), secret.result())
+            with self.lock:
+                self.stamp = stamp
+                self.listing = listing
+                if keyring_stamp() == stamp:
+                    return listing
+
+    def refresh(self):
+        """
+        List the keys in the background, unless the last listing is still
+        current or a listing is already running.
+
+        :return: Future of the listing, None when the last one is current.
+        """
+        with self.lock:
+            if self.loading is None or self.loading.done():
+                if self.listing is not None and self.stamp == keyring_stamp():
+                    return None
+                self.loading = self.executor.submit(self.load)
+            return self.loading
+
+    def keys(self, wait=True):
+        """
+        :param wait: False to return the last listing, even when outdated,
+            instead of waiting for gpg.
+        :return: Tuple of (public keys, secret keys) like list_gpg_keys
+            returns them, None when not waiting and nothing was listed yet.
+        """
+        loading = self.refresh()
+        if loading is None or not wait:
+            with self.lock:
+                return self.listing
+        return loading.result()
+
+    def key_index(self):
+        """
+        :return: KeyIndex of the public keys, built once per listing.
+        """
+        public_keys, _ = self.keys()
+        with self.lock:
+            if self.index is None or self.index.keys is not public_keys:
+                self.index = KeyIndex(public_keys)
+            return self.index
+
+
+@lru_cache(maxsize=None)
+def key_listings():
+    """
+    :return: The KeyListingCache shared by the whole application.
+    """
+    return KeyListingCache()
+
+
+def read_new_length(key_file):
+    """
+    Read a new format OpenPGP packet length (RFC 4880 section 4.2.2).
+
+    :param key_file: File object opened in binary mode.
+    :return: The body length, or None for partial lengths and truncated files.
+    """
+    first = key_file.read(1)
+    if not first or 224 <= first[0] < 255:
+        return None
+    if first[0] < 192:
+        return first[0]
+    if first[0] < 224:
+        second = key_file.read(1)
+        return ((first[0] - 192) << 8) + second[0] + 192 if second else None
+    length = key_file.read(4)
+    return int.from_bytes(length, "big") if len(length) == 4 else None
+
+
+def read_packet_header(key_file):
+    """
+    Read the header of the next OpenPGP packet (RFC 4880 section 4.2).
+
+    :param key_file: File object opened in binary mode.
+    :return: Tuple of (tag, body length), or None at the end of the file
+        or for lengths that are not known up front.
+    """
+    first = key_file.read(1)
+    if not first or not first[0] & 0x80:
+        return None
+    octet = first[0]
+    if octet & 0x40:
+        length = read_new_length(key_file)
+        return None if length is None else (octet & 0x3F, length)
+    length_type = octet & 0x03
+    size = 1 << length_type
+    length = key_file.read(size) if length_type != 3 else b""
+    if len(length) != size:
+        return None
+    return (octet >> 2) & 0x0F, int.from_bytes(length, "big")
+
+
+def read_recipients(path):
+    """
+    Read the ids of the keys a password file is encrypted for from its
+    public-key encrypted session key packets, without decrypting it.
+
+    :param path: Path of the .gpg file.
+    :return: Set of upper case 16 digit key ids, or None when they can not
+        be determined, e.g. for hidden recipients or symmetric encryption.
+    """
+    recipients = set()
+    try:
+        with open(path, "rb") as key_file:
+            while True:
+                header = read_packet_header(key_file)
+                if header is None:
+                    return None
+                tag, length = header
+                if tag == 10:  # Marker packet
+                    key_file.seek(length, os.SEEK_CUR)
+                    continue
+                if tag != 1:  # Anything but a public-key encrypted session key
+                    break
+                body = key_file.read(min(length, 10))
+                if len(body) < 10 or body[0] != 3:
+                    return None
+                key_id = body[1:9].hex().upper()
+                if key_id == "0" * 16:
+                    return None
+                recipients.add(key_id)
+                key_file.seek(length - len(body), os.SEEK_CUR)
+    except OSError:
+        return None
+    return recipients or None
+
+
+def recipients_match(recipients, gpg_ids, key_index):
+    """
+    Check whether a file is encrypted for exactly the keys of gpg_ids.
+
+    :param recipients: Key ids as returned by read_recipients.
+    :param gpg_ids: The GPG ids from the .gpg-id file.
+    :param key_index: KeyIndex of the available keys.
+    :return: True when re-encrypting the file would not change its
+        recipients.
+    """
+    if not recipients:
+        return False
+    covered = set()
+    for gpg_id in gpg_ids:
+        matching = key_index.lookup(gpg_id)
+        found = recipients.intersection(
+            key_id for key in matching for key_id in key["encryption_ids"]
+        )
+        if not found:
+            return False
+        covered.update(found)
+    return covered == recipients
+
+
 def read_gpg_ids(store_dir, folder=""):
     """
     Read the GPG ids that apply to a folder in the password store.
@@ -93,36 +552,6 @@ def read_gpg_ids(store_dir, folder=""):
         parts.pop()
 
 
-def reencrypt_store(store, folder, gpg_ids):
-    """
-    Set the GPG ids for a (sub)store and re-encrypt its passwords.
-
-    This is what 'pass init' does. It is implemented here because
-    passpy's own init_store cannot handle an already existing store
-    directory.
-
-    :param store: The passpy Store instance.
-    :param folder: Folder relative to the store root, '' for the root.
-    :param gpg_ids: List of GPG ids to encrypt with.
-    """
-    path = store.store_dir
-    if folder:
-        path = os.path.normpath(os.path.join(path, folder))
-    os.makedirs(path, exist_ok=True)
-    gpg_id_path = os.path.join(path, ".gpg-id")
-    with open(gpg_id_path, "w", encoding="utf-8") as gpg_id_file:
-        gpg_id_file.write("\n".join(gpg_ids))
-        gpg_id_file.write("\n")
-    joined_ids = ", ".join(gpg_ids)
-    git_add_path(store.repo, gpg_id_path, f"Set GPG id to {joined_ids}.")
-    reencrypt_path(path, gpg_bin=store.gpg_bin, gpg_opts=store.gpg_opts)
-    git_add_path(
-        store.repo,
-        path,
-        f"Reencrypt password store using new GPG id {joined_ids}.",
-    )
-
-
 def key_matches_id(key, gpg_id):
     """
     Check whether a parsed gpg key matches an id from a .gpg-id file.
@@ -141,3 +570,74 @@ def key_matches_id(key, gpg_id):
         if gpg_id == uid or f"<{gpg_id}>" in uid:
             return True
     return False
+
+
+def uid_email(uid):
+    """
+    :param uid: A user id like 'Name (comment) <name@example.com>'.
+    :return: The lower case e-mail address of the uid, or ''.
+    """
+    start = uid.rfind("<")
+    end = uid.rfind(">")
+    if start == -1 or end < start:
+        return ""
+    return uid[start + 1 : end].lower()
+
+
+class KeyIndex:
+    """
+    Lookup tables to find the keys matching the ids of a .gpg-id file with
+    a few dict lookups, instead of comparing every id to every key.
+
+    Matches the same ids as key_matches_id: key ids and fingerprints,
+    their short (8) and long (16) suffixes, e-mail addresses and full
+    uids. Hex ids may have a 0x prefix and any case, like gpg accepts
+    them. Suffixes of other lengths fall back to a scan of the keys.
+    """
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.by_key_id = {}
+        self.by_email = {}
+        self.by_uid = {}
+        for key in keys:
+            key_ids = {key["id"], key["fingerprint"]}
+            for key_id in (key["id"], key["fingerprint"]):
+                key_ids.update(key_id[-length:] for length in KEY_ID_SUFFIXES)
+            for key_id in key_ids:
+                if key_id:
+                    self.by_key_id.setdefault(key_id.upper(), []).append(key)
+            for uid in key["uids"]:
+                self.by_uid.setdefault(uid, []).append(key)
+                email = uid_email(uid)
+                if email:
+                    self.by_email.setdefault(email, []).append(key)
+
+    def lookup(self, gpg_id):
+        """
+        :param gpg_id: An id from a .gpg-id file.
+        :return: List of the keys matching the id.
+        """
+        found = []
+        hex_id = HEX_PATTERN.fullmatch(gpg_id)
+        if hex_id:
+            key_id = hex_id.group(1).upper()
+            if key_id in self.by_key_id:
+                found += self.by_key_id[key_id]
+            elif len(key_id) not in KEY_ID_SUFFIXES:
+                found += [
+                    key
+                    for key in self.keys
+                    if key["fingerprint"].endswith(key_id) or key["id"].endswith(key_id)
+                ]
+        found += self.by_uid.get(gpg_id, [])
+        found += self.by_email.get(gpg_id.strip("<>").lower(), [])
+        unique = {id(key): key for key in found}
+        return list(unique.values())
+
+    def resolve(self, gpg_ids):
+        """
+        :param gpg_ids: The ids of a .gpg-id file.
+        :return: Set of the fingerprints of the keys matching any of them.
+        """
+        return {key["fingerprint"] for gpg_id in gpg_ids for key in self.lookup(gpg_id)}
@@ -0,0 +1,206 @@
+"""
+This module defines the InstanceServer class, which makes PyQtPass a single
+instance application and lets other processes use the running instance.
+
+The first PyQtPass listens on a QLocalServer, a Unix domain socket (a named
+pipe on Windows) only the user who started it can connect to. Launching
+PyQtPass again raises the window of the running instance instead. Clients
+send JSON requests, one per line, and get a JSON response line for each:
+
+    {"command": "raise"}
+    {"command": "list"}
+    {"command": "search", "query": "wgh"}
+    {"command": "first-line", "path": "web/github"}
+    {"command": "copy", "path": "web/github"}
+
+Responses are {"ok": true, "result": ...} or {"ok": false, "error": ...}.
+The requests are answered from the tree, the fuzzy filter index and the
+key cache of the running instance, so no store is read again.
+"""
+
+import getpass
+import json
+import os
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+COMMANDS = ["raise", "list", "search", "first-line", "copy"]
+CONNECT_TIMEOUT = 1000
+MAX_REQUEST = 64 * 1024
+
+
+def socket_name():
+    """
+    :return: The name of the socket of the user's PyQtPass, in the private
+        XDG_RUNTIME_DIR when there is one.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "pyqtpass.socket")
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = str(os.getuid()) if hasattr(os, "getuid") else "user"
+    return f"pyqtpass-{user}"
+
+
+def send_request(command, timeout=CONNECT_TIMEOUT, name=None, **arguments):
+    """
+    Send a request to the running PyQtPass and wait for its response.
+
+    :param command: One of COMMANDS, or 'ping'.
+    :param timeout: Milliseconds to wait for the response.
+    :param name: Name of the socket, socket_name() by default.
+    :param arguments: The arguments of the command.
+    :return: The response dict, None when no PyQtPass answered.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(name or socket_name())
+    if not socket.waitForConnected(CONNECT_TIMEOUT):
+        return None
+    request = dict(arguments, command=command)
+    socket.write((json.dumps(request) + "\n").encode("utf-8"))
+    data = b""
+    while not data.endswith(b"\n"):
+        if not socket.waitForReadyRead(timeout):
+            return None
+        data += bytes(socket.readAll())
+    socket.disconnectFromServer()
+    try:
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+class InstanceRequest:
+    """
+    A request of another process, answered with reply() or fail() once.
+    """
+
+    def __init__(self, server, socket, command, arguments):
+        self.server = server
+        self.socket = socket
+        self.command = command
+        self.arguments = arguments
+
+    def reply(self, result=True):
+        """
+        :param result: The JSON serializable result of the request.
+        """
+        self.server.send(self.socket, {"ok": True, "result": result})
+
+    def fail(self, message):
+        """
+        :param message: Why the request could not be answered.
+        """
+        self.server.send(self.socket, {"ok": False, "error": message})
+
+
+class InstanceServer(QObject):
+    """
+    Listens for requests of other processes on the socket of the user.
+
+    requested(InstanceRequest) is emitted for every valid request.
+    """
+
+    requested = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.on_new_connection)
+        self.buffers = {}
+
+    def listen(self, name=None):
+        """
+        Start listening, removing the socket of an instance that crashed.
+
+        :param name: Name of the socket, socket_name() by default.
+        :return: True when listening, False when another instance is.
+        """
+        name = name or socket_name()
+        if self.server.listen(name):
+            return True
+        if send_request("ping", name=name) is not None:
+            return False
+        QLocalServer.removeServer(name)
+        return self.server.listen(name)
+
+    def close(self):
+        """
+        Stop listening and remove the socket.
+        """
+        self.server.close()
+
+    def on_new_connection(self):
+        """
+        Start reading the requests of new clients.
+        """
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda socket=socket: self.on_ready_read(socket))
+            socket.disconnected.connect(
+                lambda socket=socket: self.on_disconnected(socket)
+            )
+
+    def on_disconnected(self, socket):
+        """
+        Forget a client, requests still running for it are not answered.
+
+        :param socket: The QLocalSocket of the client.
+        """
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def on_ready_read(self, socket):
+        """
+        Handle the complete request lines a client sent.
+
+        :param socket: The QLocalSocket of the client.
+        """
+        data = self.buffers.get(socket, b"") + bytes(socket.readAll())
+        *lines, rest = data.split(b"\n")
+        if len(rest) > MAX_REQUEST:
+            self.send(socket, {"ok": False, "error": "Request too long"})
+            socket.disconnectFromServer()
+            return
+        self.buffers[socket] = rest
+        for line in lines:
+            if line.strip():
+                self.handle(socket, line)
+
+    def handle(self, socket, line):
+        """
+        Parse a request line and pass it on.
+
+        :param socket: The QLocalSocket of the client.
+        :param line: The JSON request.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict) or not isinstance(request.get("command"), str):
+            self.send(socket, {"ok": False, "error": "Invalid request"})
+            return
+        command = request.pop("command")
+        if command == "ping":
+            self.send(socket, {"ok": True, "result": True})
+        elif command not in COMMANDS:
+            self.send(socket, {"ok": False, "error": f"Unknown command {command}"})
+        else:
+            self.requested.emit(InstanceRequest(self, socket, command, request))
+
+    def send(self, socket, response):
+        """
+        Send a response line, unless the client went away.
+
+        :param socket: The QLocalSocket of the client.
+        :param response: The JSON serializable response.
+        """
+        if socket in self.buffers:
+            socket.write((json.dumps(response) + "\n").encode("utf-8"))
+            socket.flush()
@@ -0,0 +1,99 @@
+"""
+This module defines the KeyCache class, a short lived in-memory cache of
+decrypted password entries.
+
+Selecting, copying and editing the same entry would otherwise decrypt it
+three times. Cached entries are only used while the password file on disk
+is unchanged (same inode, modification time and size) and expire after a
+timeout. The cache is off by default and wiped whenever the application
+locks away its contents.
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+
+class KeyCache:
+    """
+    LRU cache of decrypted entries keyed by the path of their .gpg file.
+
+    hits and misses count the lookups, to see whether the cache helps.
+    """
+
+    def __init__(self, max_entries=16, ttl=45):
+        self.enabled = False
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, enabled, ttl, max_entries):
+        """
+        Change the cache settings, wiping it when it gets disabled.
+
+        :param enabled: True to cache decrypted entries.
+        :param ttl: Seconds an entry stays cached.
+        :param max_entries: Maximum number of cached entries.
+        """
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        if not enabled:
+            self.wipe()
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    @staticmethod
+    def file_stamp(key_path):
+        """
+        :param key_path: Path of a .gpg file.
+        :return: Tuple identifying the current version of the file, or None.
+        """
+        try:
+            stat = os.stat(key_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def get(self, key_path):
+        """
+        :param key_path: Path of a .gpg file.
+        :return: The cached decrypted contents, or None.
+        """
+        if not self.enabled:
+            return None
+        cached = self.entries.get(key_path)
+        if cached is not None:
+            stamp, expires, data = cached
+            if expires > time.monotonic() and stamp == self.file_stamp(key_path):
+                self.entries.move_to_end(key_path)
+                self.hits += 1
+                return data
+            del self.entries[key_path]
+        self.misses += 1
+        return None
+
+    def put(self, key_path, data):
+        """
+        Cache the decrypted contents of a file.
+
+        :param key_path: Path of the .gpg file.
+        :param data: The decrypted contents.
+        """
+        if not self.enabled:
+            return
+        stamp = self.file_stamp(key_path)
+        if stamp is None:
+            return
+        self.entries[key_path] = (stamp, time.monotonic() + self.ttl, data)
+        self.entries.move_to_end(key_path)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def wipe(self):
+        """
+        Drop all cached contents.
+        """
+        self.entries.clear()
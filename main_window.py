@@ -0,0 +1,1416 @@
+"""
+This module defines the QtPassGUI class, the main window of PyQtPass. It
+shows the password store in a tree view and the content of the selected
+password entry next to it, see pyqtpass.py for how it is started.
+"""
+
+# pylint: disable=too-many-lines,import-outside-toplevel,wrong-import-order
+
+import os
+
+from PyQt6.QtCore import (
+    Qt,
+    QByteArray,
+    QEvent,
+    QFileSystemWatcher,
+    QTimer,
+)
+from PyQt6.QtGui import QAction, QIcon, QFontDatabase, QFont
+from PyQt6.QtWidgets import (
+    QApplication,
+    QComboBox,
+    QDialog,
+    QMainWindow,
+    QSplitter,
+    QStyle,
+    QSystemTrayIcon,
+    QMenu,
+    QMessageBox,
+    QInputDialog,
+)
+
+import git_utils
+import git_runner
+import tracing
+from startup_profile import StartupProfile
+from push_scheduler import PushScheduler
+from settings_manager import SettingsManager
+from content_index import ContentIndexer
+from decrypt_service import DecryptService
+from instance_server import InstanceServer
+from store_loader import StoreLoader
+from store_model import create_tree_model
+from store_pool import PooledStore, StorePool
+from store_watcher import StoreWatcher
+from ui_container import UiContainer
+from gpg_utils import (
+    CRYPTO_BACKENDS,
+    KEYRING_FILES,
+    get_crypto_backend,
+    gnupg_home,
+    key_listings,
+    which_gpg,
+)
+from utilities import (
+    format_key_html,
+    get_icon_path,
+    get_lato_font_path,
+    set_locale,
+)
+
+# Which method applies which settings, in the order they are applied.
+SETTING_HANDLERS = [
+    ("apply_tray_icon", {"use_tray_icon"}),
+    ("apply_window_flags", {"always_on_top"}),
+    ("configure_autoclear", {"autoclear_panel", "autoclear_clipboard"}),
+    (
+        "configure_key_cache",
+        {"cache_decrypted", "cache_max_entries", "panel_timeout", "clipboard_timeout"},
+    ),
+    ("configure_store_pool", {"store_pool_size", "store_pool_memory"}),
+    ("configure_crypto_backend", {"crypto_backend"}),
+    ("configure_auto_push", {"auto_push", "auto_push_delay"}),
+    ("configure_content_search", {"content_search"}),
+    ("update_profile_combo", {"profiles", "current_profile"}),
+    ("update_git_actions", {"use_git"}),
+    ("switch_store_if_needed", {"profiles", "current_profile"}),
+]
+
+
+class QtPassGUI(QMainWindow):
+    """
+    PyQt GUI class for the passpy password store.
+    """
+
+    # pylint: disable=too-many-instance-attributes,too-many-public-methods
+
+    def __init__(self, verbose=False, profile=None):
+        # pylint: disable=too-many-statements
+        super().__init__()
+        self.profile = profile or StartupProfile()
+        set_locale()
+        self.splitter = None
+        self.ui = UiContainer()
+        self.verbose = verbose
+        self.settings = SettingsManager()
+        self.settings.changed.connect(self.on_setting_changed)
+        self.changed_settings = set()
+        self.actions = {}
+        self.profile_combo = None
+        self.copied_text = ""
+        self.clipboard_timer = QTimer(self)
+        self.clipboard_timer.setSingleShot(True)
+        self.clipboard_timer.timeout.connect(self.clear_clipboard)
+        self.panel_timer = QTimer(self)
+        self.panel_timer.setSingleShot(True)
+        self.panel_timer.timeout.connect(self.clear_panel)
+        self.decrypt_service = DecryptService(self)
+        self.decrypt_service.finished.connect(self.on_decrypted)
+        self.decrypt_service.failed.connect(self.on_decrypt_failed)
+        self.decrypt_actions = {}
+        self.instance_requests = {}
+        self.configure_key_cache()
+        self.instance_server = InstanceServer(self)
+        self.start_instance_server()
+        self.content_indexer = ContentIndexer(self)
+        self.content_search_dialog = None
+        self.store = None
+        self.store_watcher = StoreWatcher(self)
+        self.store_watcher.store_changed.connect(self.on_store_changed)
+        self.keyring_watcher = QFileSystemWatcher(self)
+        self.keyring_watcher.directoryChanged.connect(self.on_keyring_changed)
+        self.keyring_watcher.fileChanged.connect(self.on_keyring_changed)
+        self.git_runner = git_runner.GitRunner(self)
+        self.git_runner.progress.connect(self.on_git_progress)
+        self.git_runner.finished.connect(self.on_git_finished)
+        self.push_scheduler = PushScheduler(self.git_runner, self)
+        self.configure_auto_push()
+        self.is_shut_down = False
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
+        self.store_loader = StoreLoader(self)
+        self.store_loader.loaded.connect(self.on_store_loaded)
+        self.store_loader.failed.connect(self.on_store_failed)
+        self.store_loader.recipients_scanned.connect(self.on_recipients_scanned)
+        self.recipient_map = None
+        self.store_pool = StorePool(self)
+        self.configure_store_pool()
+        self.profile.mark("main window")
+        self.init_ui()
+        self.restore_settings()
+        self.profile.mark("init_ui")
+        self.load_store()
+
+    def get_store_dir(self):
+        """
+        :return: The store directory of the currently selected profile.
+        """
+        return self.settings.store_dir()
+
+    def load_store(self):
+        """
+        Open the password store of the current profile in the background,
+        the tree shows a placeholder until it is loaded.
+        """
+        self.profile.wait_for("store loaded")
+        self.store_loader.load(self.get_store_dir())
+
+    def on_store_loaded(self, store, store_index):
+        """
+        Show the store once it was opened and pull changes when configured.
+
+        :param store: The passpy Store.
+        :param store_index: StoreIndex of the store with the root listed.
+        """
+        self.store = store
+        self.configure_crypto_backend()
+        self.ui.set_tree_model(create_tree_model(store, store_index))
+        self.store_watcher.set_model(self.ui.tree_model)
+        self.update_store_actions()
+        self.store_loader.scan_recipients(store.store_dir)
+        self.profile.mark("store loaded")
+        # The profile might have been changed while loading.
+        self.switch_store_if_needed()
+        if self.git_enabled() and self.settings.get("git_pull_on_start"):
+            self.on_git_pull()
+        self.on_keyring_changed()
+
+    def on_keyring_changed(self, _path=""):
+        """
+        List the keys in the background when the keyring changed, so the
+        users dialog does not have to wait for gpg.
+        """
+        home = gnupg_home()
+        paths = [home] + [os.path.join(home, name) for name in KEYRING_FILES]
+        watched = self.keyring_watcher.files() + self.keyring_watcher.directories()
+        # Files replaced by gpg are no longer watched, add them again.
+        missing = [
+            path for path in paths if path not in watched and os.path.exists(path)
+        ]
+        if missing:
+            self.keyring_watcher.addPaths(missing)
+        key_listings().refresh()
+
+    def on_recipients_scanned(self, recipient_map):
+        """
+        Show who the passwords are encrypted for in the tooltips of the tree.
+
+        :param recipient_map: RecipientMap of the store.
+        """
+        if self.store is None or recipient_map.store_dir != self.store.store_dir:
+            return
+        self.recipient_map = recipient_map
+        self.ui.tree_model.recipient_map = recipient_map
+
+    def on_store_failed(self, message):
+        """
+        Quit when the password store can not be opened.
+
+        :param message: The error message.
+        """
+        print(self.tr("Error initializing passpy store: {}").format(message))
+        QMessageBox.critical(
+            self,
+            self.tr("Store not initialised"),
+            self.tr("Cannot open password store {}: {}").format(
+                self.get_store_dir(), message
+            ),
+        )
+        QApplication.instance().exit(1)
+
+    def update_store_actions(self):
+        """
+        Enable the actions that need a store once it is loaded.
+        """
+        loaded = self.store is not None
+        for name in ("add", "edit", "delete", "copy", "users"):
+            self.actions[name].setEnabled(loaded)
+        self.update_git_actions()
+        self.configure_content_search()
+
+    def closeEvent(self, event):  # pylint: disable=invalid-name
+        """
+        Handles the close event of the window.
+
+        This method is overridden to control the behavior of the application on window close.
+        Depending on the 'close_is_hide' setting, the window will either be hidden or closed.
+
+        Note: The method name 'closeEvent' is a Qt convention and does not follow the PEP8
+        snake_case naming style. The Pylint warning for the method name is disabled for this reason.
+
+        Args:
+            event: The close event object, which contains information about the close event.
+        """
+        if (
+            self.settings.get("close_is_hide")
+            and self.ui.tray_icon
+            and self.ui.tray_icon.isVisible()
+        ):
+            self.hide()
+            event.ignore()
+        else:
+            self.shutdown()
+            event.accept()
+
+    def save_settings(self):
+        """
+        Saves the current settings of the application.
+
+        This method stores the current window geometry and splitter sizes into the settings
+        so that these can be restored the next time the application is started.
+        """
+        self.settings.set("window_geometry", self.saveGeometry())
+        self.settings.set("splitter_sizes", self.splitter.sizes())
+        self.settings.save()
+
+    def restore_settings(self):
+        """
+        Restores the saved settings of the application.
+
+        This method retrieves the previously saved window geometry and splitter sizes
+        from the settings and applies them to restore the state of the application
+        as it was in the previous session.
+        """
+        geometry = self.settings.get("window_geometry")
+        if isinstance(geometry, QByteArray):
+            self.restoreGeometry(geometry)
+        self.splitter.setSizes(self.settings.get("splitter_sizes"))
+
+    def entry_from_index(self, index):
+        """
+        :param index: An index of the proxy model.
+        :return: The id of the corresponding entry in the store index.
+        """
+        source_index = self.ui.proxy_model.mapToSource(index)
+        return self.ui.tree_model.entry_from_index(source_index)
+
+    def item_full_path(self, index):
+        """
+        :param index: An index of the proxy model.
+        :return: Path of the item at index relative to the store root.
+        """
+        return self.ui.tree_model.store_index.full_path(self.entry_from_index(index))
+
+    def item_folder(self, index):
+        """
+        :param index: An index of the proxy model.
+        :return: The folder of the item at index, ending in '/'.
+        """
+        return self.ui.tree_model.store_index.folder(self.entry_from_index(index))
+
+    def is_folder(self, index):
+        """
+        :param index: An index of the proxy model.
+        :return: True when the item at index is a folder.
+        """
+        return self.ui.tree_model.store_index.is_folder(self.entry_from_index(index))
+
+    def select_path(self, path):
+        """
+        Select and scroll to a folder or entry in the tree view.
+
+        :param path: Path relative to the store root.
+        """
+        entry = self.ui.tree_model.store_index.lookup(path)
+        if entry is None:
+            return
+        source_index = self.ui.tree_model.index_from_entry(entry)
+        index = self.ui.proxy_model.mapFromSource(source_index)
+        if index.isValid():
+            self.ui.tree_view.setCurrentIndex(index)
+            self.ui.tree_view.scrollTo(index)
+
+    def current_index(self):
+        """
+        :return: The currently selected index in the tree view or None.
+        """
+        index = self.ui.tree_view.currentIndex()
+        if index.isValid():
+            return index
+        return None
+
+    def open_item(self, index):
+        """
+        Show the content of the item at index in the content panel.
+
+        :param index: The index of the item in the proxy model.
+        """
+        path = self.item_full_path(index)
+        if self.is_folder(index):
+            self.verbose_print(
+                f"Cannot retrieve key for a directory or non-existent key: {path}"
+            )
+            return
+        self.decrypt(path, "open")
+
+    def decrypt(self, path, action):
+        """
+        Decrypt an entry in the background, cancelling any stale requests.
+
+        :param path: Path of the entry relative to the store root.
+        :param action: What to do with the result, 'open' or 'copy'.
+        """
+        self.cancel_decrypts()
+        request_id = self.decrypt_service.request(self.store, path)
+        self.decrypt_actions[request_id] = action
+        self.show_status(self.tr("Decrypting {}...").format(path))
+
+    def cancel_decrypts(self):
+        """
+        Cancel the decryptions started in the window, the ones of requests
+        over the instance socket are still answered.
+        """
+        for request_id in self.decrypt_actions:
+            self.decrypt_service.cancel(request_id)
+        self.decrypt_actions.clear()
+
+    def on_decrypted(self, request_id, path, key_data):
+        """
+        Handle a finished decryption request.
+
+        :param request_id: The id of the request.
+        :param path: Path of the decrypted entry.
+        :param key_data: The decrypted contents.
+        """
+        request = self.instance_requests.pop(request_id, None)
+        if request is not None:
+            password = key_data.split("\n", 1)[0]
+            if request.command == "copy":
+                self.copy_text_to_clipboard(password)
+                request.reply()
+            else:
+                request.reply(password)
+            return
+        action = self.decrypt_actions.pop(request_id, None)
+        self.statusBar().clearMessage()
+        if action == "open":
+            self.show_key_content(key_data)
+            self.verbose_print(f"Opened: {path}")
+            if self.settings.get("always_copy_to_clipboard"):
+                self.copy_text_to_clipboard(key_data.split("\n", 1)[0])
+        elif action == "copy":
+            self.copy_text_to_clipboard(key_data.split("\n", 1)[0])
+
+    def on_decrypt_failed(self, request_id, path, message):
+        """
+        Handle a failed decryption request.
+
+        :param request_id: The id of the request.
+        :param path: Path of the entry.
+        :param message: The error message.
+        """
+        request = self.instance_requests.pop(request_id, None)
+        if request is not None:
+            request.fail(message)
+            return
+        self.decrypt_actions.pop(request_id, None)
+        self.show_status(self.tr("Could not decrypt {}").format(path))
+        self.verbose_print(message)
+
+    @tracing.traced("ui")
+    def show_key_content(self, key_data):
+        """
+        Display decrypted key data in the content panel, honouring the
+        hide password/content settings and the panel autoclear timeout.
+
+        :param key_data: The decrypted contents of a password entry.
+        """
+        if self.settings.get("hide_content"):
+            hidden = self.tr("Content hidden")
+            self.ui.text_edit.setHtml(f"<i>{hidden}</i>")
+        else:
+            fixed_font = QFont("monospace", 10, QFont.Weight.Normal)
+            fixed_font.setFixedPitch(True)
+            self.ui.text_edit.setFont(fixed_font)
+            self.ui.text_edit.setHtml(
+                format_key_html(key_data, self.settings.get("hide_password"))
+            )
+        if self.settings.get("autoclear_panel"):
+            self.panel_timer.start(int(self.settings.get("panel_timeout")) * 1000)
+
+    def clear_panel(self):
+        """
+        Clear the content panel, called by the panel autoclear timer.
+        """
+        self.ui.text_edit.clear()
+
+    def copy_text_to_clipboard(self, text):
+        """
+        Copy text to the clipboard and start the autoclear timer.
+
+        :param text: The text to copy.
+        """
+        QApplication.clipboard().setText(text)
+        self.copied_text = text
+        if self.settings.get("autoclear_clipboard"):
+            timeout = int(self.settings.get("clipboard_timeout"))
+            self.clipboard_timer.start(timeout * 1000)
+            self.show_status(
+                self.tr("Copied to clipboard, clearing in {} seconds").format(timeout)
+            )
+        else:
+            self.show_status(self.tr("Copied to clipboard"))
+
+    def clear_clipboard(self):
+        """
+        Clear the clipboard if it still holds the text we copied.
+        """
+        clipboard = QApplication.clipboard()
+        if clipboard.text() == self.copied_text:
+            clipboard.clear()
+            self.show_status(self.tr("Clipboard cleared"))
+        self.copied_text = ""
+
+    def copy_password(self, index=None):
+        """
+        Copy the password (first line) of the item at index to the clipboard.
+
+        :param index: The index in the proxy model, or None for the selection.
+        """
+        if index is None:
+            index = self.current_index()
+        if index is None:
+            self.show_status(self.tr("No password selected"))
+            return
+        if self.is_folder(index):
+            self.show_status(self.tr("No password selected"))
+            return
+        self.decrypt(self.item_full_path(index), "copy")
+
+    def on_item_double_clicked(self, index):
+        """
+        Handle the double click event on an item in the tree view.
+
+        :param index: The index of the double-clicked item in the proxy model.
+        """
+        self.edit_item(index)
+
+    def on_selection_changed(self, selected, _deselected):
+        """
+        Handle the selection change event in the tree view.
+
+        :param selected: The new selection.
+        :param _deselected: The old selection (unused)
+        """
+        self.cancel_decrypts()
+        indexes = selected.indexes()
+        if indexes:
+            self.verbose_print(f"Selected: {self.item_full_path(indexes[0])}")
+            if self.settings.get("select_is_open"):
+                self.open_item(indexes[0])
+
+    def on_tray_icon_clicked(self, reason):
+        """
+        Handles the click event on the system tray icon.
+
+        This method is triggered when the tray icon is interacted with, such as
+        a single click or double click. Depending on the current visibility of
+        the main window, it either hides the window (if visible) or shows it
+        (if hidden).
+
+        :param reason: The reason for the trigger, indicating the type of interaction
+                       (e.g., single click, double click).
+        """
+        if reason in (
+            QSystemTrayIcon.ActivationReason.Trigger,
+            QSystemTrayIcon.ActivationReason.DoubleClick,
+        ):
+            if self.isVisible():
+                self.hide()
+            else:
+                self.show()
+
+    def start_instance_server(self):
+        """
+        Answer the requests of other processes, like a second launch.
+        """
+        self.instance_server.requested.connect(self.on_instance_request)
+        if not self.instance_server.listen():
+            self.verbose_print("Another PyQtPass is listening already")
+
+    def on_instance_request(self, request):
+        """
+        Answer a request of another process over the instance socket.
+
+        :param request: The InstanceRequest.
+        """
+        if request.command == "raise":
+            if self.isMinimized():
+                self.showNormal()
+            self.show()
+            self.raise_()
+            self.activateWindow()
+            request.reply()
+            return
+        if self.store is None or self.ui.tree_model is None:
+            request.fail("The password store is not loaded yet")
+            return
+        if request.command == "list":
+            self.ui.tree_model.fetch_all()
+            store_index = self.ui.tree_model.store_index
+            request.reply(
+                [store_index.full_path(entry) for entry in store_index.entries()]
+            )
+        elif request.command == "search":
+            query = str(request.arguments.get("query", ""))
+            request.reply(self.ui.fuzzy_filter.search(query))
+        else:
+            path = os.path.normpath(str(request.arguments.get("path", "")).strip("/"))
+            key_path = os.path.join(self.store.store_dir, path + ".gpg")
+            if path.startswith("..") or not os.path.isfile(key_path):
+                request.fail(f"{path} is not in the password store.")
+                return
+            request_id = self.decrypt_service.request(self.store, path)
+            self.instance_requests[request_id] = request
+
+    def verbose_print(self, *args, **kwargs):
+        """
+        Prints messages to the console if verbose mode is enabled.
+        """
+        if self.verbose:
+            print(*args, **kwargs)
+
+    def show_status(self, message):
+        """
+        Show a message in the status bar.
+
+        :param message: The message to show.
+        """
+        self.statusBar().showMessage(message, 5000)
+        self.verbose_print(message)
+
+    def exit(self):
+        """
+        Really quit that shit.
+        But save first <3
+        :return:
+        """
+        self.shutdown()
+        QApplication.instance().quit()
+
+    def shutdown(self):
+        """
+        Save the settings, push the last changes and stop the background
+        work, once, whichever way the application is closed.
+        """
+        if self.is_shut_down:
+            return
+        self.is_shut_down = True
+        self.save_settings()
+        self.wipe_secrets()
+        self.store_loader.shutdown()
+        self.store_pool.shutdown()
+        self.instance_server.close()
+        self.push_scheduler.flush()
+        self.git_runner.shutdown()
+
+    def wipe_secrets(self):
+        """
+        Forget all decrypted contents kept in memory.
+        """
+        cache = self.decrypt_service.cache
+        if cache.entries:
+            self.verbose_print(
+                f"Wiping key cache ({cache.hits} hits, {cache.misses} misses)"
+            )
+        cache.wipe()
+        if len(self.content_indexer.index):
+            self.verbose_print("Wiping content search index")
+        self.content_indexer.wipe()
+
+    def configure_key_cache(self):
+        """
+        Apply the decryption cache settings, the cache keeps entries as
+        long as the panel or clipboard would show them.
+        """
+        self.decrypt_service.cache.configure(
+            bool(self.settings.get("cache_decrypted")),
+            max(
+                int(self.settings.get("panel_timeout")),
+                int(self.settings.get("clipboard_timeout")),
+            ),
+            int(self.settings.get("cache_max_entries")),
+        )
+
+    def configure_store_pool(self):
+        """
+        Apply how many stores of other profiles are kept open.
+        """
+        self.store_pool.configure(
+            int(self.settings.get("store_pool_size")),
+            int(self.settings.get("store_pool_memory")),
+        )
+
+    def configure_crypto_backend(self):
+        """
+        Select the crypto backend used to decrypt entries of the store.
+        """
+        if self.store is None:
+            return
+        index = int(self.settings.get("crypto_backend"))
+        name = CRYPTO_BACKENDS[index] if 0 <= index < len(CRYPTO_BACKENDS) else ""
+        self.decrypt_service.backend = get_crypto_backend(
+            name, self.store.gpg_bin, self.store.gpg_opts
+        )
+
+    def hideEvent(self, event):  # pylint: disable=invalid-name
+        """
+        Wipe decrypted contents when the window is hidden, e.g. to the tray.
+
+        :param event: The hide event.
+        """
+        self.wipe_secrets()
+        super().hideEvent(event)
+
+    def changeEvent(self, event):  # pylint: disable=invalid-name
+        """
+        Wipe decrypted contents when the window gets minimized.
+
+        :param event: The change event.
+        """
+        if event.type() == QEvent.Type.WindowStateChange and self.isMinimized():
+            self.wipe_secrets()
+        super().changeEvent(event)
+
+    def setup_tray_icon(self):
+        """
+        Setup and enable trayicon
+        """
+        self.ui.tray_icon = QSystemTrayIcon(QIcon(get_icon_path()), self)
+        self.ui.tray_icon.setToolTip(self.tr("PyQtPass"))
+        self.ui.tray_icon.activated.connect(self.on_tray_icon_clicked)
+
+        tray_menu = QMenu()
+        open_action = QAction(self.tr("Open PyQtPass"), self)
+        open_action.triggered.connect(self.show)
+        exit_action = QAction(self.tr("Exit"), self)
+        exit_action.triggered.connect(self.exit)
+        tray_menu.addAction(open_action)
+        tray_menu.addAction(exit_action)
+        self.ui.tray_icon.setContextMenu(tray_menu)
+
+    def show_tree_model(self, model, recipient_map=None):
+        """
+        Show a model of the current store in the tree view.
+
+        :param model: The StoreModel.
+        :param recipient_map: RecipientMap of the store, None when unknown.
+        """
+        if (
+            recipient_map is not None
+            and recipient_map.store_dir != self.store.store_dir
+        ):
+            recipient_map = None
+        self.ui.set_tree_model(model)
+        self.store_watcher.set_model(model)
+        self.recipient_map = recipient_map
+        model.recipient_map = recipient_map
+
+    def on_store_changed(self, folders):
+        """
+        Called when the store watcher applied outside changes to the tree.
+
+        :param folders: The folders that changed, relative to the store root.
+        """
+        self.verbose_print(f"Store changed on disk: {', '.join(folders) or '/'}")
+        if self.recipient_map is not None:
+            self.recipient_map.update(folders)
+        if self.content_search_dialog and self.content_search_dialog.isVisible():
+            self.update_content_index()
+
+    def git_enabled(self):
+        """
+        :return: True when git support is on and the store is a git repository.
+        """
+        return (
+            self.store is not None
+            and self.settings.get("use_git")
+            and git_utils.is_git_repo(self.store.store_dir)
+        )
+
+    def update_git_actions(self):
+        """
+        Enable or disable the git actions based on the current settings.
+        """
+        enabled = self.git_enabled()
+        self.actions["git_pull"].setEnabled(enabled)
+        self.actions["git_push"].setEnabled(enabled)
+        self.actions["git_cancel"].setEnabled(self.git_runner.is_busy())
+
+    def on_git_pull(self):
+        """
+        Update the password store from the remote git repository.
+        """
+        if not self.git_enabled():
+            self.show_status(self.tr("Git is not available for this store"))
+            return
+        self.statusBar().showMessage(self.tr("Updating password store..."))
+        self.git_runner.run(self.store.store_dir, "pull")
+        self.update_git_actions()
+
+    def on_git_push(self):
+        """
+        Push local changes of the password store to the remote git repository.
+        """
+        if not self.git_enabled():
+            self.show_status(self.tr("Git is not available for this store"))
+            return
+        self.statusBar().showMessage(self.tr("Pushing password store..."))
+        self.git_runner.run(self.store.store_dir, "push")
+        self.update_git_actions()
+
+    def on_git_cancel(self):
+        """
+        Cancel the running git operation and pending automatic pushes.
+        """
+        self.push_scheduler.cancel()
+        self.git_runner.cancel()
+
+    def auto_push(self):
+        """
+        Push local changes automatically when the auto push setting is on,
+        together with the other changes made within the push delay.
+        """
+        if not self.git_enabled() or not self.settings.get("auto_push"):
+            return
+        self.push_scheduler.schedule(self.store.store_dir)
+
+    def configure_auto_push(self):
+        """
+        Apply the automatic push settings.
+        """
+        self.push_scheduler.delay = max(0, int(self.settings.get("auto_push_delay")))
+        if not self.settings.get("auto_push"):
+            self.push_scheduler.cancel()
+
+    def on_git_progress(self, line):
+        """
+        Show the progress of a git operation in the status bar.
+
+        :param line: The latest line of git output.
+        """
+        self.statusBar().showMessage(line)
+
+    def on_git_finished(self, operation, status, output, head_changed):
+        """
+        Report the result of a git operation, updating the tree when it
+        changed the checked out commit.
+
+        :param operation: The git subcommand, 'pull' or 'push'.
+        :param status: git_runner.OK, FAILED or CANCELLED.
+        :param output: The output of git.
+        :param head_changed: True when HEAD points to another commit now.
+        """
+        self.verbose_print(output)
+        self.update_git_actions()
+        if head_changed:
+            self.sync_tree()
+        retry = 0
+        if operation == "push":
+            retry = self.push_scheduler.on_push_finished(status, output)
+        if retry:
+            self.show_status(
+                self.tr("Remote not reachable, pushing again in {} seconds").format(
+                    retry
+                )
+            )
+        elif status == git_runner.CANCELLED:
+            self.show_status(self.tr("Git {} cancelled").format(operation))
+        elif status == git_runner.FAILED:
+            self.statusBar().clearMessage()
+            QMessageBox.warning(
+                self, self.tr("Git {} failed").format(operation), output
+            )
+        elif operation == "pull":
+            if head_changed:
+                self.show_status(self.tr("Password store updated"))
+            else:
+                self.show_status(self.tr("Password store is up to date"))
+        else:
+            self.show_status(self.tr("Password store pushed"))
+
+    def sync_tree(self):
+        """
+        Bring every listed folder of the tree in line with the store on
+        disk, keeping the expanded folders and the selection.
+        """
+        for path in self.ui.tree_model.listed_folders():
+            self.ui.tree_model.sync_folder(path)
+
+    def open_config_dialog(self):
+        """
+        Opens the configuration dialog.
+        """
+        from config_dialog import ConfigDialog
+
+        dialog = ConfigDialog(self)
+        dialog.exec()
+
+    def on_setting_changed(self, key, _value):
+        """
+        Queue a changed setting, the settings changed together (e.g. by
+        the configuration dialog) are applied in one go.
+
+        :param key: The key of the setting.
+        """
+        if not self.changed_settings:
+            QTimer.singleShot(0, self.apply_settings)
+        self.changed_settings.add(key)
+
+    def apply_settings(self):
+        """
+        Apply the settings that changed to the running application, only
+        updating what depends on them.
+        """
+        changed, self.changed_settings = self.changed_settings, set()
+        for handler, keys in SETTING_HANDLERS:
+            if changed & keys:
+                getattr(self, handler)()
+
+    def apply_tray_icon(self):
+        """
+        Show or hide the tray icon.
+        """
+        if self.settings.get("use_tray_icon"):
+            self.ui.tray_icon.show()
+        else:
+            self.ui.tray_icon.hide()
+
+    def apply_window_flags(self):
+        """
+        Keep the window on top of others or not.
+        """
+        flags = self.windowFlags()
+        if self.settings.get("always_on_top"):
+            flags |= Qt.WindowType.WindowStaysOnTopHint
+        else:
+            flags &= ~Qt.WindowType.WindowStaysOnTopHint
+        if flags != self.windowFlags():
+            self.setWindowFlags(flags)
+            self.show()
+
+    def configure_autoclear(self):
+        """
+        Stop clearing the panel or clipboard when that was switched off.
+        """
+        if not self.settings.get("autoclear_panel"):
+            self.panel_timer.stop()
+        if not self.settings.get("autoclear_clipboard"):
+            self.clipboard_timer.stop()
+
+    def configure_content_search(self):
+        """
+        Enable content search as configured, wiping the index when it is
+        switched off.
+        """
+        enabled = bool(self.settings.get("content_search"))
+        self.actions["search_contents"].setEnabled(enabled and self.store is not None)
+        if not enabled:
+            self.content_indexer.wipe()
+
+    def open_content_search(self):
+        """
+        Open the content search dialog and bring the index up to date.
+        """
+        if not self.settings.get("content_search") or self.store is None:
+            return
+        if self.content_search_dialog is None:
+            from content_search_dialog import ContentSearchDialog
+
+            self.content_search_dialog = ContentSearchDialog(self.content_indexer, self)
+            self.content_search_dialog.path_activated.connect(self.open_path)
+        self.content_search_dialog.show()
+        self.content_search_dialog.raise_()
+        self.content_search_dialog.activateWindow()
+        self.update_content_index()
+
+    def update_content_index(self):
+        """
+        Index the entries of the store that are new or changed.
+        """
+        self.content_indexer.start(self.store.store_dir, self.decrypt_service.backend)
+
+    def open_path(self, path):
+        """
+        Select an entry in the tree view and show its content.
+
+        :param path: Path of the entry relative to the store root.
+        """
+        self.ui.tree_model.add_path(path)
+        self.select_path(path)
+        index = self.current_index()
+        selected = index is not None and self.item_full_path(index) == path
+        if not selected or not self.settings.get("select_is_open"):
+            self.decrypt(path, "open")
+
+    def open_users_dialog(self, index=None):
+        """
+        Open the users dialog to select the GPG keys for a folder.
+
+        :param index: The index in the proxy model, or None for the selection.
+        """
+        folder = ""
+        if index is None:
+            index = self.current_index()
+        if index is not None:
+            folder = self.item_folder(index).strip("/")
+        from users_dialog import UsersDialog
+
+        dialog = UsersDialog(
+            self.store, folder, self, backend=self.decrypt_service.backend
+        )
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            if self.recipient_map is not None:
+                self.recipient_map.update([folder])
+            self.show_status(
+                self.tr("Re-encrypted passwords in {}").format(folder or "/")
+            )
+            self.auto_push()
+
+    def show_context_menu(self, position):
+        """Create context menu"""
+        if self.store is None:
+            return
+        context_menu = QMenu(self.ui.tree_view)
+
+        add_action = context_menu.addAction(self.tr("Add"))
+        add_action.triggered.connect(lambda: self.add_item(index))
+
+        index = self.ui.tree_view.indexAt(position)
+        if not index.isValid():
+            index = None
+            users_action = context_menu.addAction(self.tr("Users"))
+            users_action.triggered.connect(lambda: self.open_users_dialog(None))
+            context_menu.exec(self.ui.tree_view.mapToGlobal(position))
+            return
+
+        copy_action = context_menu.addAction(self.tr("Copy password"))
+        open_action = context_menu.addAction(self.tr("Open"))
+        edit_action = context_menu.addAction(self.tr("Edit"))
+        rename_action = context_menu.addAction(self.tr("Rename"))
+        delete_action = context_menu.addAction(self.tr("Delete"))
+        users_action = context_menu.addAction(self.tr("Users"))
+
+        copy_action.triggered.connect(lambda: self.copy_password(index))
+        open_action.triggered.connect(lambda: self.open_item(index))
+        edit_action.triggered.connect(lambda: self.edit_item(index))
+        rename_action.triggered.connect(lambda: self.rename_item(index))
+        delete_action.triggered.connect(lambda: self.delete_item(index))
+        users_action.triggered.connect(lambda: self.open_users_dialog(index))
+
+        context_menu.exec(self.ui.tree_view.mapToGlobal(position))
+
+    def transaction(self):
+        """
+        Start a transaction on the current store, to apply changes to it
+        with a single commit.
+
+        :return: A StoreTransaction using the configured crypto backend.
+        """
+        from store_transaction import StoreTransaction
+
+        return StoreTransaction(self.store, self.decrypt_service.backend)
+
+    def add_item(self, index=None):
+        """Add item"""
+        folder = ""
+        if index is None:
+            index = self.current_index()
+        if index is not None:
+            folder = self.item_folder(index)
+        folder = folder.lstrip("/")
+
+        name, ok = QInputDialog.getText(
+            self, self.tr("New password"), self.tr("Enter password name:"), text=folder
+        )
+        if not ok or not name or name.endswith("/"):
+            return
+        from edit_password_window import EditPasswordDialog
+
+        dialog = EditPasswordDialog(
+            self.store,
+            name,
+            name.split("/")[-1],
+            create=True,
+            backend=self.decrypt_service.backend,
+        )
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            self.ui.tree_model.add_path(name)
+            self.select_path(name)
+            self.show_status(self.tr("Added password {}").format(name))
+            self.auto_push()
+
+    def edit_item(self, index=None):
+        """Edit item"""
+        if index is None:
+            index = self.current_index()
+        if index is None:
+            self.show_status(self.tr("No password selected"))
+            return
+        path = self.item_full_path(index)
+        from edit_password_window import EditPasswordDialog
+
+        try:
+            dialog = EditPasswordDialog(
+                self.store,
+                path,
+                path.split("/")[-1],
+                key_data=self.decrypt_service.cached(self.store, path),
+                backend=self.decrypt_service.backend,
+            )
+        except FileNotFoundError:
+            self.verbose_print(
+                f"Cannot retrieve key for a directory or non-existent key: {path}"
+            )
+            return
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            if self.settings.get("select_is_open") and index == self.current_index():
+                self.open_item(index)
+            self.show_status(self.tr("Saved password {}").format(path))
+            self.auto_push()
+
+    def rename_item(self, index=None):
+        """Rename item"""
+        if index is None:
+            index = self.current_index()
+        if index is None:
+            self.show_status(self.tr("No password selected"))
+            return
+        path = self.item_full_path(index)
+        is_folder = self.is_folder(index)
+        new_path, ok = QInputDialog.getText(
+            self, self.tr("Rename Item"), self.tr("New Path:"), text=path
+        )
+        if ok and new_path and new_path != path:
+            target = os.path.normpath(new_path).strip("/")
+            if new_path.endswith("/") or os.path.isdir(
+                os.path.join(self.store.store_dir, target)
+            ):
+                target = f"{target}/{os.path.basename(path)}"
+            try:
+                with self.transaction() as transaction:
+                    transaction.move_path(path, target, is_folder=is_folder)
+            except OSError as e:
+                QMessageBox.warning(self, self.tr("Rename failed"), str(e))
+                return
+            self.ui.tree_model.move_path(path, target, is_folder)
+            self.select_path(target)
+            self.show_status(self.tr("Renamed {} to {}").format(path, new_path))
+            self.auto_push()
+        else:
+            self.verbose_print("Rename cancelled")
+
+    def delete_item(self, index=None):
+        """Delete item"""
+        if index is None:
+            index = self.current_index()
+        if index is None:
+            self.show_status(self.tr("No password selected"))
+            return
+        path = self.item_full_path(index)
+        is_folder = self.is_folder(index)
+
+        reply = QMessageBox.question(
+            self,
+            self.tr("Confirm Delete"),
+            self.tr("Are you sure you want to delete {}?").format(path),
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No,
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.verbose_print(f"Deleting {path}")
+            try:
+                with self.transaction() as transaction:
+                    transaction.remove_path(path, recursive=True, is_folder=is_folder)
+                self.ui.tree_model.remove_path(path, is_folder)
+                self.show_status(self.tr("Deleted {}").format(path))
+                self.auto_push()
+            except OSError as e:
+                print(f"Failure to delete {path}: {e}")
+        else:
+            self.verbose_print("Deletion cancelled")
+
+    def update_profile_combo(self):
+        """
+        Fill the profile selector with the configured profiles.
+        """
+        profiles = self.settings.get("profiles") or {}
+        self.profile_combo.blockSignals(True)
+        self.profile_combo.clear()
+        self.profile_combo.addItems(sorted(profiles))
+        current = self.settings.get("current_profile")
+        if current in profiles:
+            self.profile_combo.setCurrentText(current)
+        self.profile_combo.blockSignals(False)
+        self.profile_combo.setVisible(bool(profiles))
+
+    def on_profile_changed(self, name):
+        """
+        Switch to another password store profile.
+
+        :param name: The name of the selected profile.
+        """
+        if name == self.settings.get("current_profile"):
+            return
+        self.settings.set("current_profile", name)
+        self.switch_store_if_needed()
+
+    def switch_store_if_needed(self):
+        """
+        Reopen the password store when the current profile points elsewhere.
+        """
+        if self.store is None:
+            # The store of the new profile is opened once loading is done.
+            return
+        # Like StoreIndex, so 'store/' and './store' are the same store.
+        new_dir = os.path.normpath(os.path.expanduser(self.get_store_dir()))
+        if new_dir == os.path.normpath(self.store.store_dir):
+            return
+        pooled = self.store_pool.take(new_dir)
+        if pooled is None:
+            pooled = self.open_pooled_store(new_dir)
+            if pooled is None:
+                return
+        self.store_pool.park(
+            PooledStore(self.store, self.ui.tree_model, self.recipient_map)
+        )
+        self.store = pooled.store
+        self.decrypt_service.cancel()
+        self.decrypt_actions.clear()
+        for request in self.instance_requests.values():
+            request.fail("The password store was switched")
+        self.instance_requests.clear()
+        self.wipe_secrets()
+        self.configure_crypto_backend()
+        self.show_tree_model(pooled.model, pooled.recipient_map)
+        if self.recipient_map is None:
+            self.store_loader.scan_recipients(self.store.store_dir)
+        self.update_git_actions()
+        self.show_status(self.tr("Switched to password store {}").format(new_dir))
+
+    def open_pooled_store(self, store_dir):
+        """
+        Open a password store that is not in the store pool.
+
+        :param store_dir: Root directory of the password store.
+        :return: A PooledStore with a new tree model, None on errors.
+        """
+        import passpy
+
+        try:
+            with tracing.span("passpy.Store", "passpy", store_dir=store_dir):
+                store = passpy.Store(gpg_bin=which_gpg(), store_dir=store_dir)
+        except passpy.StoreNotInitialisedError as e:
+            QMessageBox.warning(
+                self,
+                self.tr("Store not initialised"),
+                self.tr("Cannot open password store {}: {}").format(store_dir, e),
+            )
+            return None
+        store = tracing.instrument_store(store)
+        return PooledStore(store, create_tree_model(store))
+
+    def make_action(self, text, icon, slot, shortcut=None):
+        """
+        Create a QAction with a themed icon.
+
+        :param text: The visible text of the action.
+        :param icon: Tuple of (icon theme name, QStyle standard pixmap fallback).
+        :param slot: The slot to connect the action to.
+        :param shortcut: Optional key sequence.
+        :return: The created QAction.
+        """
+        theme_name, standard_pixmap = icon
+        qicon = QIcon.fromTheme(theme_name)
+        if qicon.isNull():
+            qicon = self.style().standardIcon(standard_pixmap)
+        action = QAction(qicon, text, self)
+        action.triggered.connect(slot)
+        if shortcut:
+            action.setShortcut(shortcut)
+            action.setShortcutContext(Qt.ShortcutContext.WidgetWithChildrenShortcut)
+            self.ui.tree_view.addAction(action)
+        return action
+
+    def setup_actions(self):
+        """
+        Create the actions shared by the toolbar and the menus.
+        """
+        self.actions["add"] = self.make_action(
+            self.tr("Add password"),
+            ("list-add", QStyle.StandardPixmap.SP_FileDialogNewFolder),
+            self.add_item,
+            "Ctrl+N",
+        )
+        self.actions["edit"] = self.make_action(
+            self.tr("Edit password"),
+            ("document-edit", QStyle.StandardPixmap.SP_FileDialogDetailedView),
+            self.edit_item,
+            "Ctrl+E",
+        )
+        self.actions["delete"] = self.make_action(
+            self.tr("Delete password"),
+            ("edit-delete", QStyle.StandardPixmap.SP_TrashIcon),
+            self.delete_item,
+            "Del",
+        )
+        self.actions["copy"] = self.make_action(
+            self.tr("Copy password to clipboard"),
+            ("edit-copy", QStyle.StandardPixmap.SP_FileDialogContentsView),
+            self.copy_password,
+            "Ctrl+C",
+        )
+        self.actions["search_contents"] = self.make_action(
+            self.tr("Search contents"),
+            ("edit-find", QStyle.StandardPixmap.SP_FileDialogListView),
+            self.open_content_search,
+            "Ctrl+Shift+F",
+        )
+        self.actions["users"] = self.make_action(
+            self.tr("Users"),
+            ("system-users", QStyle.StandardPixmap.SP_FileDialogInfoView),
+            self.open_users_dialog,
+        )
+        self.actions["git_pull"] = self.make_action(
+            self.tr("Update from git remote"),
+            ("go-down", QStyle.StandardPixmap.SP_ArrowDown),
+            self.on_git_pull,
+            "F5",
+        )
+        self.actions["git_push"] = self.make_action(
+            self.tr("Push to git remote"),
+            ("go-up", QStyle.StandardPixmap.SP_ArrowUp),
+            self.on_git_push,
+        )
+        self.actions["git_cancel"] = self.make_action(
+            self.tr("Cancel git operation"),
+            ("process-stop", QStyle.StandardPixmap.SP_BrowserStop),
+            self.on_git_cancel,
+        )
+        self.actions["config"] = self.make_action(
+            self.tr("Configuration"),
+            ("preferences-system", QStyle.StandardPixmap.SP_ComputerIcon),
+            self.open_config_dialog,
+        )
+
+    def setup_toolbar(self):
+        """
+        Create the main toolbar with the shared actions and profile selector.
+        """
+        toolbar = self.addToolBar(self.tr("Main"))
+        toolbar.setMovable(False)
+        for name in ("add", "edit", "delete", "copy", "search_contents"):
+            toolbar.addAction(self.actions[name])
+        toolbar.addSeparator()
+        for name in ("users", "git_pull", "git_push", "git_cancel"):
+            toolbar.addAction(self.actions[name])
+        toolbar.addSeparator()
+        toolbar.addAction(self.actions["config"])
+
+        self.profile_combo = QComboBox(toolbar)
+        self.profile_combo.currentTextChanged.connect(self.on_profile_changed)
+        toolbar.addWidget(self.profile_combo)
+        self.update_profile_combo()
+
+    def setup_menus(self):
+        """
+        Create the menu bar.
+        """
+        menubar = self.menuBar()
+        system_menu = menubar.addMenu(self.tr("System"))
+        system_menu.addAction(self.actions["config"])
+        system_menu.addAction(self.actions["users"])
+        system_menu.addAction(self.actions["search_contents"])
+        system_menu.addSeparator()
+        system_menu.addAction(self.actions["git_pull"])
+        system_menu.addAction(self.actions["git_push"])
+        system_menu.addAction(self.actions["git_cancel"])
+        system_menu.addSeparator()
+        quit_action = QAction(self.tr("Quit"), self)
+        quit_action.setShortcut("Ctrl+Q")
+        quit_action.triggered.connect(self.exit)
+        system_menu.addAction(quit_action)
+
+        help_menu = menubar.addMenu(self.tr("Help"))
+        about_action = QAction(self.tr("About PyQtPass"), self)
+        about_action.triggered.connect(self.show_about)
+        help_menu.addAction(about_action)
+        about_qt_action = QAction(self.tr("About Qt"), self)
+        about_qt_action.triggered.connect(QApplication.instance().aboutQt)
+        help_menu.addAction(about_qt_action)
+
+    def show_about(self):
+        """
+        Show the about dialog.
+        """
+        QMessageBox.about(
+            self,
+            self.tr("About PyQtPass"),
+            self.tr(
+                "<b>PyQtPass {}</b><br><br>"
+                "A cross-platform GUI for pass, the standard Unix password manager, "
+                "written in Python. A port of "
+                '<a href="https://qtpass.org/">QtPass</a>.<br><br>'
+                "Please report any issues you might have with this software at "
+                '<a href="https://github.com/annejan/PyQtPass">GitHub</a>.'
+            ).format(QApplication.applicationVersion()),
+        )
+
+    def show_welcome(self):
+        """
+        Show the welcome text in the content panel.
+
+        Qt renders the Markdown itself and the font is only loaded now,
+        after the window was first shown, to keep both off the start up.
+        """
+        font_id = QFontDatabase.addApplicationFont(get_lato_font_path())
+        if font_id == -1:
+            print("Failed to load font. Check the file path.")
+            lato = "sans-serif"
+        else:
+            lato = QFontDatabase.applicationFontFamilies(font_id)[0]
+
+        self.ui.text_edit.setMarkdown(self.tr("""# Welcome to PyQtPass!
+
+PyQtPass is your password manager. With it, managing passwords is a breeze.
+
+- Generate secure passwords
+- Manage passwords with ease
+- Clipboard integration for quick access
+- Supports multiple password stores
+
+Check out the [documentation](https://github.com/annejan/PyQtPass/) for more info.
+"""))
+        self.ui.text_edit.setFont(QFont(lato, 16))
+
+    def init_ui(self):
+        """
+        Initialize the user interface.
+        """
+        self.splitter = QSplitter(self)
+        self.ui.setup_ui(self.splitter)
+        self.ui.tree_view.doubleClicked.connect(self.on_item_double_clicked)
+        self.ui.tree_view.selectionModel().selectionChanged.connect(
+            self.on_selection_changed
+        )
+        self.ui.tree_view.customContextMenuRequested.connect(self.show_context_menu)
+
+        self.setCentralWidget(self.ui.central_widget)
+
+        self.setGeometry(300, 300, 768, 596)
+        self.setWindowTitle(self.tr("PyQtPass"))
+
+        self.setup_actions()
+        self.setup_toolbar()
+        self.setup_menus()
+        QTimer.singleShot(0, self.show_welcome)
+        self.update_store_actions()
+
+        self.setup_tray_icon()
+        if self.settings.get("use_tray_icon"):
+            self.ui.tray_icon.show()
+
+        if self.settings.get("start_minimized"):
+            QTimer.singleShot(0, self.hide)
+
+        if self.settings.get("always_on_top"):
+            self.setWindowFlags(self.windowFlags() | Qt.WindowType.WindowStaysOnTopHint)
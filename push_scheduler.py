@@ -0,0 +1,143 @@
+"""
+This module defines the PushScheduler class, which pushes local changes of
+the password store automatically after edits.
+
+Edits made in quick succession are pushed together once things have been
+quiet for a while, and pushes that fail because the remote can not be
+reached are retried with an increasing delay.
+"""
+
+import os
+
+from PyQt6.QtCore import QObject, QTimer
+
+import git_runner
+from git_utils import has_remote
+
+DEFAULT_DELAY = 10
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 1800
+OFFLINE_MESSAGES = (
+    "could not resolve host",
+    "could not read from remote repository",
+    "unable to access",
+    "connection refused",
+    "connection timed out",
+    "network is unreachable",
+    "operation timed out",
+)
+
+
+def is_offline_error(output):
+    """
+    :param output: The output of a failed git push.
+    :return: True when the push failed because the remote was unreachable.
+    """
+    output = output.lower()
+    return any(message in output for message in OFFLINE_MESSAGES)
+
+
+class PushScheduler(QObject):
+    """
+    Debounces automatic pushes and runs them through a GitRunner.
+
+    Whether a repository has a remote is cached until its .git/config
+    changes, so scheduling a push does not run git. Scheduled pushes are
+    run as automatic operations, so they are told apart from the pushes
+    the user started when they finish.
+    """
+
+    def __init__(self, runner, parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        self.delay = DEFAULT_DELAY
+        self.path = None
+        self.retries = 0
+        self.remotes = {}
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.push)
+
+    def has_remote(self, path):
+        """
+        :param path: Directory of the git repository.
+        :return: True when the repository has a remote configured.
+        """
+        try:
+            mtime = os.stat(os.path.join(path, ".git", "config")).st_mtime_ns
+        except OSError:
+            return False
+        cached = self.remotes.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, has_remote(path))
+            self.remotes[path] = cached
+        return cached[1]
+
+    def schedule(self, path):
+        """
+        Push the repository once no other changes were scheduled for the
+        configured delay.
+
+        :param path: Directory of the git repository.
+        """
+        if not self.has_remote(path):
+            return
+        self.path = path
+        self.retries = 0
+        self.timer.start(self.delay * 1000)
+
+    def is_pending(self):
+        """
+        :return: True while a push is waiting to be run.
+        """
+        return self.timer.isActive()
+
+    def push(self):
+        """
+        Run the scheduled push.
+        """
+        self.timer.stop()
+        if self.path is None:
+            return
+        self.runner.run(self.path, "push", automatic=True)
+
+    def flush(self):
+        """
+        Run a scheduled push right away, e.g. before quitting.
+        """
+        if self.timer.isActive():
+            self.push()
+
+    def cancel(self):
+        """
+        Forget the scheduled push and stop retrying.
+        """
+        self.timer.stop()
+        self.path = None
+        self.retries = 0
+
+    def on_push_finished(self, status, output):
+        """
+        Handle the result of a push, retrying scheduled pushes that failed
+        because the remote could not be reached.
+
+        :param status: git_runner.OK, FAILED or CANCELLED.
+        :param output: The output of git.
+        :return: The delay in seconds before the next attempt, 0 when the
+            push is not retried.
+        """
+        scheduled = self.runner.current_automatic
+        if status == git_runner.OK:
+            if not self.timer.isActive():
+                self.path = None
+            self.retries = 0
+            return 0
+        if not scheduled or status != git_runner.FAILED or not is_offline_error(output):
+            return 0
+        if self.timer.isActive():
+            # New changes were scheduled meanwhile, they push everything.
+            return max(1, self.timer.remainingTime() // 1000)
+        delay = min(RETRY_DELAY << self.retries, MAX_RETRY_DELAY)
+        self.retries += 1
+        self.timer.start(delay * 1000)
+        return delay
@@ -1,4 +1,4 @@
-SOURCES = pyqtpass.py settings_manager.py ui_container.py utilities.py config_dialog.py edit_password_window.py users_dialog.py git_utils.py gpg_utils.py
+SOURCES = pyqtpass.py cli.py instance_server.py main_window.py settings_manager.py startup_profile.py tracing.py ui_container.py utilities.py store_loader.py store_model.py recipient_map.py store_watcher.py store_pool.py fuzzy_filter.py decrypt_service.py key_cache.py content_index.py reencrypt_engine.py store_transaction.py config_dialog.py content_search_dialog.py edit_password_window.py users_dialog.py git_utils.py git_runner.py push_scheduler.py gpg_utils.py
 TRANSLATIONS += localization/localization_en_US.ts \
                 localization/localization_en_GB.ts \
                 localization/localization_nl_NL.ts \
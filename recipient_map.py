@@ -0,0 +1,199 @@
+"""
+This module defines the RecipientMap class, which knows for every folder
+of a password store which GPG ids its passwords are encrypted for.
+
+read_gpg_ids walks up from a folder and reads .gpg-id files every time it
+is called. The map is filled by a single scan of the store instead, with
+the inheritance of .gpg-id files from parent folders already resolved, so
+looking up the recipients of a folder is a dict access. Changed folders
+are read again, updating only the folders below them.
+"""
+
+import os
+
+GPG_ID_FILE = ".gpg-id"
+
+
+def parent_folder(folder):
+    """
+    :param folder: Folder path relative to the store root, '' for the root.
+    :return: The path of its parent folder, None for the root.
+    """
+    if not folder:
+        return None
+    return folder.rpartition("/")[0]
+
+
+class RecipientMap:
+    """
+    Effective GPG ids of every folder of a password store.
+
+    own maps the folders that have a .gpg-id file to its ids, effective
+    maps every known folder to a tuple of (ids, folder of the .gpg-id file
+    they come from).
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = os.path.expanduser(store_dir)
+        self.own = {}
+        self.effective = {}
+
+    def read_folder(self, folder):
+        """
+        Read the .gpg-id file and subfolders of a folder from disk.
+
+        :param folder: Folder path relative to the store root.
+        :return: Tuple of (list of ids or None, list of subfolder names),
+            None when the folder can not be read.
+        """
+        ids = None
+        subfolders = []
+        try:
+            with os.scandir(os.path.join(self.store_dir, folder)) as entries:
+                for entry in entries:
+                    if entry.name == GPG_ID_FILE:
+                        ids = self.read_ids(entry.path)
+                    elif not entry.name.startswith(".") and entry.is_dir():
+                        subfolders.append(entry.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return None
+        return ids, subfolders
+
+    @staticmethod
+    def read_ids(path):
+        """
+        :param path: Path of a .gpg-id file.
+        :return: List of the ids in it, None when it can not be read.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as gpg_id_file:
+                return [line.strip() for line in gpg_id_file if line.strip()]
+        except OSError:
+            return None
+
+    def scan(self, folder=""):
+        """
+        Read a folder and everything below it from disk.
+
+        :param folder: Folder path relative to the store root.
+        :return: self, for chaining.
+        """
+        self.forget(folder)
+        pending = [(folder, self.inherited(folder))]
+        while pending:
+            path, inherited = pending.pop()
+            listing = self.read_folder(path)
+            if listing is None:
+                continue
+            ids, subfolders = listing
+            if ids is not None:
+                self.own[path] = ids
+                inherited = (tuple(ids), path)
+            self.effective[path] = inherited
+            pending.extend(
+                (f"{path}/{name}" if path else name, inherited) for name in subfolders
+            )
+        return self
+
+    def inherited(self, folder):
+        """
+        :param folder: Folder path relative to the store root.
+        :return: The (ids, source folder) a folder without .gpg-id gets.
+        """
+        parent = parent_folder(folder)
+        if parent is None:
+            return (), ""
+        return self.lookup(parent)
+
+    def below(self, folder):
+        """
+        :param folder: Folder path relative to the store root.
+        :return: List of the known folders below and including folder,
+            parents before their children.
+        """
+        prefix = folder + "/" if folder else ""
+        return sorted(
+            (
+                path
+                for path in self.effective
+                if path == folder or path.startswith(prefix)
+            ),
+            key=len,
+        )
+
+    def forget(self, folder):
+        """
+        Drop a folder and everything below it from the map.
+
+        :param folder: Folder path relative to the store root.
+        """
+        for path in self.below(folder):
+            del self.effective[path]
+            self.own.pop(path, None)
+
+    def resolve(self, folder):
+        """
+        Work out the effective ids of a folder and the folders below it
+        again, after its own ids changed.
+
+        :param folder: Folder path relative to the store root.
+        """
+        for path in self.below(folder):
+            if path in self.own:
+                self.effective[path] = (tuple(self.own[path]), path)
+            else:
+                self.effective[path] = self.inherited(path)
+
+    def update(self, folders):
+        """
+        Read changed folders again, e.g. after the store changed on disk.
+
+        Only the .gpg-id file and the subfolders of every folder are read,
+        new subfolders are scanned completely.
+
+        :param folders: Folder paths relative to the store root.
+        """
+        for folder in sorted(set(folders), key=len):
+            listing = self.read_folder(folder)
+            if listing is None:
+                self.forget(folder)
+                continue
+            if folder not in self.effective:
+                self.scan(folder)
+                continue
+            ids, subfolders = listing
+            known = {
+                path.rpartition("/")[2]
+                for path in self.effective
+                if path and parent_folder(path) == folder
+            }
+            for name in known - set(subfolders):
+                self.forget(f"{folder}/{name}" if folder else name)
+            if ids != self.own.get(folder):
+                if ids is None:
+                    del self.own[folder]
+                else:
+                    self.own[folder] = ids
+                self.resolve(folder)
+            for name in set(subfolders) - known:
+                self.scan(f"{folder}/{name}" if folder else name)
+
+    def lookup(self, folder):
+        """
+        :param folder: Folder path relative to the store root.
+        :return: Tuple of (tuple of GPG ids, folder of the .gpg-id file they
+            come from) that applies to the folder.
+        """
+        while folder is not None:
+            found = self.effective.get(folder)
+            if found is not None:
+                return found
+            folder = parent_folder(folder)
+        return (), ""
+
+    def recipients(self, folder):
+        """
+        :param folder: Folder path relative to the store root.
+        :return: Tuple of the GPG ids the passwords in folder are encrypted for.
+        """
+        return self.lookup(folder)[0]
@@ -0,0 +1,385 @@
+"""
+This module defines the ReencryptEngine class, which re-encrypts the
+passwords in a (sub)store for a new set of GPG ids, like 'pass init'.
+
+Files that are already encrypted for exactly the right keys are skipped,
+which is found out from their headers without decrypting them. The other
+files are re-encrypted on a small pool of worker threads, every file is
+replaced atomically so an interruption never leaves a half written
+password behind. Completed files are recorded in a journal, an
+interrupted run resumes where it stopped when it is started again for
+the same folder and GPG ids. All changes end up in a single git commit.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from git_utils import is_git_repo, run_git
+from gpg_utils import key_listings, read_gpg_ids, read_recipients, recipients_match
+
+JOURNAL_NAME = "pyqtpass-reencrypt"
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def journal_path(store_dir):
+    """
+    :param store_dir: Root directory of the password store.
+    :return: Path of the re-encryption journal, inside .git when possible.
+    """
+    git_dir = os.path.join(store_dir, ".git")
+    if os.path.isdir(git_dir):
+        return os.path.join(git_dir, JOURNAL_NAME)
+    return os.path.join(store_dir, "." + JOURNAL_NAME)
+
+
+class ReencryptJournal:
+    """
+    Append only record of the files a re-encryption run has completed.
+
+    The first line holds the folder and GPG ids of the run as JSON, every
+    following line the store relative path of a completed file.
+    """
+
+    def __init__(self, store_dir):
+        self.path = journal_path(store_dir)
+        self.lock = threading.Lock()
+        self.journal_file = None
+
+    def read(self):
+        """
+        :return: Tuple of (folder, gpg ids, set of completed paths) of an
+            unfinished run, or None.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as journal_file:
+                header = json.loads(journal_file.readline())
+                done = {line.rstrip("\n") for line in journal_file if line.strip()}
+        except (OSError, ValueError):
+            return None
+        if not isinstance(header, dict):
+            return None
+        return header.get("folder", ""), header.get("gpg_ids", []), done
+
+    def open(self, folder, gpg_ids):
+        """
+        Start recording a run, continuing the journal of an unfinished run
+        for the same folder and GPG ids.
+
+        :param folder: Folder relative to the store root, '' for the root.
+        :param gpg_ids: List of GPG ids the files are encrypted for.
+        :return: Set of the paths already completed.
+        """
+        pending = self.read()
+        if pending is not None and pending[:2] == (folder, list(gpg_ids)):
+            done = pending[2]
+            # pylint: disable-next=consider-using-with
+            self.journal_file = open(self.path, "a", encoding="utf-8")
+            return done
+        # pylint: disable-next=consider-using-with
+        self.journal_file = open(self.path, "w", encoding="utf-8")
+        self.journal_file.write(
+            json.dumps({"folder": folder, "gpg_ids": list(gpg_ids)}) + "\n"
+        )
+        self.journal_file.flush()
+        return set()
+
+    def record(self, path):
+        """
+        Record a completed file, called from the worker threads.
+
+        :param path: Path of the file relative to the store root.
+        """
+        with self.lock:
+            self.journal_file.write(path + "\n")
+            self.journal_file.flush()
+
+    def close(self, finished=False):
+        """
+        Stop recording, removing the journal when the run finished.
+
+        :param finished: True when every file was re-encrypted.
+        """
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+        if finished:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def collect_keys(store_dir, folder):
+    """
+    Find the password files below a folder and the GPG ids for each of
+    them, honouring .gpg-id files in subfolders like pass does.
+
+    :param store_dir: Root directory of the password store.
+    :param folder: Folder relative to the store root, '' for the root.
+    :return: List of (path relative to the store root, gpg ids) tuples.
+    """
+    keys = []
+    top = os.path.join(store_dir, folder)
+    for root, dirs, files in os.walk(top):
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        relative = os.path.relpath(root, store_dir)
+        relative = "" if relative == "." else relative.replace(os.sep, "/")
+        gpg_ids = None
+        for name in sorted(files):
+            if not name.endswith(".gpg") or name.startswith("."):
+                continue
+            if gpg_ids is None:
+                gpg_ids, _ = read_gpg_ids(store_dir, relative)
+            keys.append((f"{relative}/{name}" if relative else name, gpg_ids))
+    return keys
+
+
+def write_temp_file(path, data):
+    """
+    Write data to a new hidden temporary file next to path.
+
+    :param path: The file the data is meant for.
+    :param data: The contents as bytes.
+    :return: Path of the temporary file.
+    """
+    directory, name = os.path.split(path)
+    handle, temp_path = tempfile.mkstemp(
+        prefix=f".{name}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(handle, "wb") as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def replace_file(path, data):
+    """
+    Atomically replace the contents of a file, keeping its permissions.
+
+    :param path: The file to replace.
+    :param data: The new contents as bytes.
+    """
+    temp_path = write_temp_file(path, data)
+    try:
+        os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ReencryptEngine(QObject):
+    """
+    Re-encrypts the passwords in a folder of the store on a thread pool.
+
+    planned(todo, skipped) is emitted on the GUI thread once it is known
+    how many files need to be re-encrypted and how many are already
+    encrypted for the right keys, progress(done, total) as files complete
+    and finished(completed, error) once the run is over. A run that failed or
+    was cancelled keeps its journal and can be resumed by starting a new
+    engine for the same folder and GPG ids.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    planned = pyqtSignal(int, int)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(bool, str)
+    file_done = pyqtSignal(str, bool, str)
+    plan_done = pyqtSignal(list, int)
+    plan_failed = pyqtSignal(str)
+
+    def __init__(
+        self, store, folder, gpg_ids, backend, parent=None
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        super().__init__(parent)
+        self.store_dir = store.store_dir
+        self.folder = folder.strip("/")
+        self.gpg_ids = list(gpg_ids)
+        self.backend = backend
+        self.journal = ReencryptJournal(self.store_dir)
+        self.executor = None
+        self.cancelled = threading.Event()
+        self.error = ""
+        self.done = 0
+        self.total = 0
+        self.skipped = 0
+        self.pending = 0
+        self.file_done.connect(self.on_file_done)
+        self.plan_done.connect(self.on_plan_done)
+        self.plan_failed.connect(self.on_plan_failed)
+
+    def write_gpg_ids(self):
+        """
+        Write the new GPG ids to the .gpg-id file of the folder.
+
+        :return: Path of the .gpg-id file.
+        """
+        path = os.path.join(self.store_dir, self.folder)
+        os.makedirs(path, exist_ok=True)
+        gpg_id_path = os.path.join(path, ".gpg-id")
+        with open(gpg_id_path, "w", encoding="utf-8") as gpg_id_file:
+            gpg_id_file.write("\n".join(self.gpg_ids))
+            gpg_id_file.write("\n")
+        return gpg_id_path
+
+    def start(self):
+        """
+        Write the .gpg-id file and find the files that still need to be
+        re-encrypted on a worker thread.
+
+        :raises OSError: when the .gpg-id file or journal can not be written.
+        """
+        self.write_gpg_ids()
+        done = self.journal.open(self.folder, self.gpg_ids)
+        self.executor = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="reencrypt"
+        )
+        self.executor.submit(self.plan, done)
+
+    def plan(self, done):
+        """
+        Collect the files below the folder whose recipients do not match
+        their GPG ids yet, runs on a worker thread.
+
+        :param done: Set of the paths completed by an earlier run.
+        """
+        todo = []
+        skipped = 0
+        try:
+            key_index = key_listings().key_index()
+            for path, gpg_ids in collect_keys(self.store_dir, self.folder):
+                if self.cancelled.is_set():
+                    break
+                recipients = None
+                if path not in done:
+                    recipients = read_recipients(os.path.join(self.store_dir, path))
+                if path in done or recipients_match(recipients, gpg_ids, key_index):
+                    skipped += 1
+                else:
+                    todo.append((path, gpg_ids))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            # E.g. a .gpg-id file that is not UTF-8 or an error of gpg, the
+            # executor would swallow it and the run would never finish.
+            self.plan_failed.emit(str(error))
+            return
+        self.plan_done.emit(todo, skipped)
+
+    def on_plan_done(self, todo, skipped):
+        """
+        Queue the files that need to be re-encrypted.
+
+        :param todo: List of (path, gpg ids) tuples.
+        :param skipped: Number of files that are already up to date.
+        """
+        if self.cancelled.is_set():
+            self.finish()
+            return
+        self.total = len(todo)
+        self.skipped = skipped
+        self.pending = len(todo)
+        self.planned.emit(len(todo), skipped)
+        self.progress.emit(0, self.total)
+        if not todo:
+            self.finish()
+            return
+        for path, gpg_ids in todo:
+            self.executor.submit(self.reencrypt, path, gpg_ids)
+
+    def on_plan_failed(self, error):
+        """
+        Stop the run when the files could not be collected.
+
+        :param error: The error message.
+        """
+        self.error = error
+        self.finish()
+
+    def cancel(self):
+        """
+        Stop the run, files that are being re-encrypted are finished first.
+        """
+        self.cancelled.set()
+
+    def reencrypt(self, path, gpg_ids):
+        """Re-encrypt a single file, runs on a worker thread."""
+        if self.cancelled.is_set():
+            self.file_done.emit(path, False, "")
+            return
+        key_path = os.path.join(self.store_dir, path)
+        try:
+            data = self.backend.decrypt(key_path, binary=True)
+            replace_file(key_path, self.backend.encrypt(data, gpg_ids))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            # Next to OSErrors the crypto backends raise their own errors.
+            self.file_done.emit(path, False, f"{path}: {error}")
+            return
+        self.journal.record(path)
+        self.file_done.emit(path, True, "")
+
+    def on_file_done(self, _path, success, error):
+        """
+        Count a finished file, stopping the run on the first error.
+        """
+        self.pending -= 1
+        if success:
+            self.done += 1
+            self.progress.emit(self.done, self.total)
+        elif error and not self.error:
+            self.error = error
+            self.cancel()
+        if self.pending == 0:
+            self.finish()
+
+    def finish(self):
+        """
+        Commit the result when every file was re-encrypted and report back.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        completed = not self.error and not self.cancelled.is_set()
+        if completed:
+            self.error = self.commit()
+            # Keep the journal when committing failed, resuming commits.
+            completed = not self.error
+        self.journal.close(finished=completed)
+        self.finished.emit(completed, self.error)
+
+    def commit(self):
+        """
+        Commit the new .gpg-id file and the re-encrypted files in one go.
+
+        :return: An error message, '' on success.
+        """
+        if not is_git_repo(self.store_dir):
+            return ""
+        path = self.folder or "."
+        success, output = run_git(self.store_dir, "add", "--all", "--", path)
+        if not success:
+            return output
+        joined_ids = ", ".join(self.gpg_ids)
+        success, output = run_git(
+            self.store_dir,
+            "commit",
+            "-m",
+            f"Reencrypt password store using new GPG id {joined_ids}.",
+            "--",
+            path,
+        )
+        if not success and "nothing to commit" not in output:
+            return output
+        return ""
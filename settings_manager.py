@@ -3,18 +3,36 @@ This module provides a SettingsManager class to manage application settings
 using the QSettings interface from the PyQt6.QtCore module. It allows for storing
 and retrieving various settings such as window geometry, splitter sizes, and
 boolean flags for application behavior.
+
+Changed settings are written to QSettings together, FLUSH_DELAY milliseconds
+after the first change, and only the keys that actually changed.
 """
 
-from PyQt6.QtCore import QSettings, QByteArray
+from PyQt6.QtCore import (
+    QCoreApplication,
+    QObject,
+    QSettings,
+    QTimer,
+    QByteArray,
+    pyqtSignal,
+)
+
+FLUSH_DELAY = 1000
+DEFAULT_STORE_DIR = "~/.password-store"
 
 
-class SettingsManager:
+class SettingsManager(QObject):
     """
     The SettingsManager class encapsulates methods for saving and retrieving
     application settings. It uses QSettings for persistent storage.
+
+    changed(key, value) is emitted whenever a setting gets a new value.
     """
 
+    changed = pyqtSignal(str, object)
+
     _instance = None
+    _initialized = False
 
     def __new__(cls):
         if cls._instance is None:
@@ -22,10 +40,19 @@ class SettingsManager:
         return cls._instance
 
     def __init__(self):
-        if getattr(self, "initialized", False):
+        if SettingsManager._initialized:
             return
-        self.initialized = True
+        super().__init__()
+        SettingsManager._initialized = True
         self.settings = QSettings("IJHack", "PyQtPass")
+        self.dirty = set()
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FLUSH_DELAY)
+        self.flush_timer.timeout.connect(self.flush)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.flush)
         self.options = {
             "select_is_open": True,
             "close_is_hide": False,
@@ -41,21 +68,37 @@ class SettingsManager:
             "hide_content": False,
             "autoclear_panel": False,
             "panel_timeout": 10,
+            "cache_decrypted": False,
+            "cache_max_entries": 16,
+            "content_search": False,
+            "crypto_backend": 0,
             "password_length": 16,
             "password_charset": 0,
             "use_git": True,
             "auto_push": True,
+            "auto_push_delay": 10,
             "git_pull_on_start": False,
             "profiles": {},
+            "store_pool_size": 4,
+            "store_pool_memory": 64,
             "current_profile": "",
         }
         self.load()
 
     def set(self, key, value):
         """
-        Set that value
+        Set that value, it is written to QSettings a little later.
+
+        Values are compared to the current one, so change copies of dicts
+        and lists instead of the ones that get returned.
         """
+        if key in self.options and self.options[key] == value:
+            return
         self.options[key] = value
+        self.dirty.add(key)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+        self.changed.emit(key, value)
 
     def get(self, key):
         """
@@ -66,6 +109,16 @@ class SettingsManager:
 
         return self.options.get(key)
 
+    def store_dir(self):
+        """
+        :return: The store directory of the currently selected profile.
+        """
+        profiles = self.get("profiles") or {}
+        current = self.get("current_profile")
+        if current and current in profiles:
+            return profiles[current]
+        return DEFAULT_STORE_DIR
+
     def get_splitter_sizes(self):
         """
         Retrieves the sizes of the splitters as a list of integers.
@@ -73,10 +126,10 @@ class SettingsManager:
         Returns:
             list: The sizes of the splitters.
         """
-        return [
-            int(item)
-            for item in self.settings.value("splitter_sizes", [200, 400], type=list)
-        ]
+        sizes = self.options["splitter_sizes"]
+        if not isinstance(sizes, list):
+            sizes = [sizes]
+        return [int(item) for item in sizes]
 
     def load(self):
         """Load settings, coercing stored values back to their default types."""
@@ -101,6 +154,12 @@ class SettingsManager:
                 self.options[key] = value
 
     def save(self):
-        """Save settings"""
-        for key, value in self.options.items():
-            self.settings.setValue(key, value)
+        """Save the changed settings right away."""
+        self.flush()
+
+    def flush(self):
+        """Write the settings that changed since the last flush."""
+        self.flush_timer.stop()
+        for key in sorted(self.dirty):
+            self.settings.setValue(key, self.options[key])
+        self.dirty.clear()
@@ -0,0 +1,81 @@
+"""
+This module defines the StartupProfile class, which times the phases of
+starting PyQtPass for the --profile-startup option.
+
+It is imported before anything else, so the time spent importing the rest
+of the application is reported as well.
+"""
+
+import sys
+import time
+
+from PyQt6.QtCore import QEvent, QObject
+
+START = time.perf_counter()
+
+
+class StartupProfile(QObject):
+    """
+    Records how long every phase of the start up took and prints them once
+    the main window was painted for the first time and the phases that run
+    in the background are done.
+    """
+
+    def __init__(self, enabled=False, parent=None):
+        super().__init__(parent)
+        self.enabled = enabled
+        self.phases = []
+        self.waiting = set()
+        self.last = START
+
+    def wait_for(self, phase):
+        """
+        Only report once phase has ended as well.
+
+        :param phase: Name of the phase.
+        """
+        self.waiting.add(phase)
+
+    def mark(self, phase):
+        """
+        End a phase, it took the time since the previous phase ended.
+
+        :param phase: Name of the phase.
+        """
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+        if phase in self.waiting:
+            self.waiting.discard(phase)
+            if not self.waiting and self.enabled:
+                self.report()
+
+    def watch_first_paint(self, widget):
+        """
+        End the 'first paint' phase and report when widget gets painted.
+
+        :param widget: The main window.
+        """
+        if self.enabled:
+            self.wait_for("first paint")
+            widget.installEventFilter(self)
+
+    def eventFilter(self, watched, event):  # pylint: disable=invalid-name
+        """Catch the first paint event of the watched widget."""
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            self.mark("first paint")
+        return False
+
+    def report(self, stream=None):
+        """
+        Print the time every phase took.
+
+        :param stream: File to print to, stderr by default.
+        """
+        stream = stream or sys.stderr
+        width = max(len(phase) for phase, _ in self.phases)
+        for phase, duration in self.phases:
+            print(f"{phase:<{width}} {duration:8.1f} ms", file=stream)
+        total = sum(duration for _, duration in self.phases)
+        print(f"{'total':<{width}} {total:8.1f} ms", file=stream)
@@ -0,0 +1,365 @@
+"""
+This module defines the StoreIndex class, a compact index of the folders and
+password entries in a password store.
+
+Every folder and entry gets an integer id. Names, parents, rows, sort keys
+and full paths are kept in flat arrays indexed by that id, so a path lookup
+is a single list access and an entry costs a few dozen bytes instead of a
+full Qt item. Folders are listed on demand, the same way pass lists them.
+"""
+
+import os
+import sys
+from array import array
+
+import tracing
+
+ROOT = 0
+FOLDER = 1
+LISTED = 2
+REMOVED = 4
+
+
+@tracing.traced("store")
+def scan_folder(path):
+    """
+    List a folder of the password store on disk.
+
+    Hidden files and folders are skipped and only .gpg files are entries,
+    sorted case insensitively, like passpy's Store.list_dir.
+
+    :param path: Absolute path of the folder.
+    :return: Tuple of (sorted folder names, sorted entry names).
+    """
+    folders = []
+    entries = []
+    with os.scandir(path) as scanner:
+        for dir_entry in scanner:
+            name = dir_entry.name
+            if name.startswith("."):
+                continue
+            if dir_entry.is_dir():
+                folders.append(name)
+            elif name.endswith(".gpg") and dir_entry.is_file():
+                entries.append(name[:-4])
+    folders.sort(key=str.lower)
+    entries.sort(key=str.lower)
+    return folders, entries
+
+
+class StoreIndex:
+    """
+    Array backed index of a password store.
+
+    The root folder has id ROOT and path ''. Paths of other folders and
+    entries are relative to the store root without the .gpg extension.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, store_dir):
+        self.store_dir = os.path.normpath(os.path.expanduser(store_dir))
+        self.names = [""]
+        self.sort_keys = [""]
+        self.paths = [""]
+        self.parents = array("i", [-1])
+        self.rows = array("i", [0])
+        self.flags = bytearray([FOLDER])
+        self.children = [None]
+        # A folder and an entry can have the same path ('web/' and 'web.gpg').
+        self.folder_ids = {"": ROOT}
+        self.entry_ids = {}
+
+    def __len__(self):
+        """
+        :return: The number of folders and entries indexed so far.
+        """
+        return len(self.folder_ids) + len(self.entry_ids) - 1
+
+    def _add(self, parent, name, is_folder):
+        """
+        Allocate an id for a new folder or entry.
+
+        :param parent: Id of the parent folder.
+        :param name: Name of the folder or entry.
+        :param is_folder: True for folders.
+        :return: The new id.
+        """
+        entry = len(self.names)
+        name = sys.intern(name)
+        parent_path = self.paths[parent]
+        path = f"{parent_path}/{name}" if parent_path else name
+        self.names.append(name)
+        self.sort_keys.append(sys.intern(name.lower()))
+        self.paths.append(path)
+        self.parents.append(parent)
+        self.rows.append(0)
+        self.flags.append(FOLDER if is_folder else 0)
+        self.children.append(None)
+        self.path_ids(entry)[path] = entry
+        return entry
+
+    def path_ids(self, entry):
+        """
+        :param entry: An id of this index.
+        :return: The dict mapping paths to ids of the kind of entry.
+        """
+        return self.folder_ids if self.is_folder(entry) else self.entry_ids
+
+    def is_folder(self, entry):
+        """
+        :param entry: An id of this index.
+        :return: True when entry is a folder.
+        """
+        return bool(self.flags[entry] & FOLDER)
+
+    def is_listed(self, entry):
+        """
+        :param entry: An id of this index.
+        :return: True when entry is a folder that has been listed.
+        """
+        return bool(self.flags[entry] & LISTED)
+
+    def name(self, entry):
+        """
+        :param entry: An id of this index.
+        :return: The name of the folder or entry.
+        """
+        return self.names[entry]
+
+    def full_path(self, entry):
+        """
+        :param entry: An id of this index.
+        :return: Path relative to the store root.
+        """
+        return self.paths[entry]
+
+    def folder(self, entry):
+        """
+        :param entry: An id of this index.
+        :return: The folder path of entry ending in '/', itself for folders.
+        """
+        if not self.is_folder(entry):
+            entry = self.parents[entry]
+        return self.paths[entry] + "/"
+
+    def parent(self, entry):
+        """
+        :param entry: An id of this index.
+        :return: Id of the parent folder, -1 for the root.
+        """
+        return self.parents[entry]
+
+    def row(self, entry):
+        """
+        :param entry: An id of this index.
+        :return: Position of entry within its parent folder.
+        """
+        return self.rows[entry]
+
+    def lookup(self, path, is_folder=None):
+        """
+        :param path: Path relative to the store root.
+        :param is_folder: True to only find a folder, False to only find an
+            entry, None to find the entry, or the folder when there is none.
+        :return: The id for path, or None when it is not indexed.
+        """
+        path = path.strip("/")
+        if is_folder:
+            return self.folder_ids.get(path)
+        entry = self.entry_ids.get(path)
+        if entry is None and is_folder is None:
+            return self.folder_ids.get(path)
+        return entry
+
+    def child_ids(self, folder):
+        """
+        :param folder: Id of a folder.
+        :return: Array of the ids of the listed children of folder.
+        """
+        return self.children[folder] or ()
+
+    def read_folder(self, folder):
+        """
+        Read the children of a folder from disk without indexing them.
+
+        :param folder: Id of the folder to read.
+        :return: Tuple of (sorted folder names, sorted entry names).
+        """
+        path = os.path.join(self.store_dir, self.paths[folder])
+        try:
+            return scan_folder(path)
+        except (FileNotFoundError, PermissionError, NotADirectoryError) as e:
+            print(f"Error accessing {self.paths[folder]}: {e}")
+            return [], []
+
+    def set_children(self, folder, folders, entries):
+        """
+        Index the children of a not yet listed folder.
+
+        :param folder: Id of the folder.
+        :param folders: Sorted names of the subfolders.
+        :param entries: Sorted names of the password entries.
+        :return: Array of the ids of the children, folders first.
+        """
+        self.flags[folder] |= LISTED
+        ids = array("i")
+        for name in folders:
+            ids.append(self._add(folder, name, True))
+        for name in entries:
+            ids.append(self._add(folder, name, False))
+        for row, entry in enumerate(ids):
+            self.rows[entry] = row
+        self.children[folder] = ids
+        return ids
+
+    def list_folder(self, folder):
+        """
+        Read a folder from disk and index its children.
+
+        Folders are only listed once, later calls return the known children.
+
+        :param folder: Id of the folder to list.
+        :return: Array of the ids of the children, folders first.
+        """
+        if self.is_listed(folder) or not self.is_folder(folder):
+            return self.child_ids(folder)
+        return self.set_children(folder, *self.read_folder(folder))
+
+    def _renumber(self, folder, start=0):
+        """
+        Update the rows of the children of folder from start onwards.
+
+        :param folder: Id of the folder.
+        :param start: First row that changed.
+        """
+        siblings = self.child_ids(folder)
+        for index in range(start, len(siblings)):
+            self.rows[siblings[index]] = index
+
+    def insert_row(self, folder, name, is_folder, exclude=None):
+        """
+        Find the row a new child of folder should get to keep it sorted.
+
+        :param folder: Id of a listed folder.
+        :param name: Name of the new child.
+        :param is_folder: True when the new child is a folder.
+        :param exclude: Id of a child to ignore, used when moving it.
+        :return: The row to insert at.
+        """
+        key = name.lower()
+        row = 0
+        for entry in self.child_ids(folder):
+            if entry == exclude:
+                continue
+            if self.is_folder(entry) != is_folder:
+                if is_folder:
+                    break
+            elif self.sort_keys[entry] > key:
+                break
+            row += 1
+        return row
+
+    def insert(self, folder, name, is_folder, row, listed=False):
+        """
+        Add a new child to a listed folder.
+
+        :param folder: Id of the folder.
+        :param name: Name of the new child.
+        :param is_folder: True when the new child is a folder.
+        :param row: Row as returned by insert_row.
+        :param listed: True for new folders that are known to be empty,
+            otherwise their contents are read from disk when needed.
+        :return: Id of the new child.
+        """
+        entry = self._add(folder, name, is_folder)
+        if is_folder and listed:
+            self.flags[entry] |= LISTED
+        if self.children[folder] is None:
+            self.children[folder] = array("i")
+        self.children[folder].insert(row, entry)
+        self._renumber(folder, row)
+        return entry
+
+    def move(self, entry, folder, name, row):
+        """
+        Move and/or rename a folder or entry, updating the paths below it.
+
+        :param entry: Id of the folder or entry to move.
+        :param folder: Id of the listed destination folder.
+        :param name: The new name.
+        :param row: Row in the destination, as returned by insert_row
+            with entry excluded.
+        """
+        old_parent = self.parents[entry]
+        del self.children[old_parent][self.rows[entry]]
+        self._renumber(old_parent, self.rows[entry])
+        name = sys.intern(name)
+        self.names[entry] = name
+        self.sort_keys[entry] = sys.intern(name.lower())
+        self.parents[entry] = folder
+        if self.children[folder] is None:
+            self.children[folder] = array("i")
+        self.children[folder].insert(row, entry)
+        self._renumber(folder, row)
+        pending = [entry]
+        while pending:
+            moved = pending.pop()
+            path_ids = self.path_ids(moved)
+            if path_ids.get(self.paths[moved]) == moved:
+                del path_ids[self.paths[moved]]
+            parent_path = self.paths[self.parents[moved]]
+            name = self.names[moved]
+            self.paths[moved] = f"{parent_path}/{name}" if parent_path else name
+            path_ids[self.paths[moved]] = moved
+            pending.extend(self.child_ids(moved))
+
+    def remove(self, entry):
+        """
+        Remove a folder or entry, and everything below it, from the index.
+
+        The ids of removed entries are not reused.
+
+        :param entry: Id of the folder or entry to remove.
+        """
+        parent = self.parents[entry]
+        del self.children[parent][self.rows[entry]]
+        self._renumber(parent, self.rows[entry])
+        pending = [entry]
+        while pending:
+            removed = pending.pop()
+            path_ids = self.path_ids(removed)
+            if path_ids.get(self.paths[removed]) == removed:
+                del path_ids[self.paths[removed]]
+            self.flags[removed] |= REMOVED
+            pending.extend(self.child_ids(removed))
+            self.children[removed] = None
+
+    def list_all(self):
+        """
+        List every folder of the store that has not been listed yet.
+        """
+        pending = [ROOT]
+        while pending:
+            folder = pending.pop()
+            pending.extend(
+                entry for entry in self.list_folder(folder) if self.is_folder(entry)
+            )
+
+    def entries(self):
+        """
+        Iterate over all password entries, listing folders as needed.
+
+        :return: Generator of entry ids, folder by folder.
+        """
+        pending = [ROOT]
+        while pending:
+            folder = pending.pop()
+            children = self.list_folder(folder)
+            subfolders = []
+            for entry in children:
+                if self.is_folder(entry):
+                    subfolders.append(entry)
+                else:
+                    yield entry
+            pending.extend(reversed(subfolders))
@@ -0,0 +1,123 @@
+"""
+This module defines the StoreLoader class, which opens a password store on
+a worker thread, so the main window can be shown right away.
+
+Opening a store imports passpy (and with it GitPython) and lists the root
+folder of the store, both of which can take a while on a cold start or a
+slow disk.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+import tracing
+from gpg_utils import which_gpg
+from recipient_map import RecipientMap
+from store_index import ROOT, StoreIndex
+
+
+def open_store(store_dir):
+    """
+    Open a password store and list its root folder.
+
+    :param store_dir: Root directory of the password store.
+    :return: Tuple of (passpy Store, StoreIndex with the root listed).
+    :raises passpy.StoreNotInitialisedError: when the store has no .gpg-id.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    import passpy
+
+    with tracing.span("passpy.Store", "passpy", store_dir=store_dir):
+        store = passpy.Store(gpg_bin=which_gpg(), store_dir=store_dir)
+    tracing.instrument_store(store)
+    store_index = StoreIndex(store.store_dir)
+    store_index.list_folder(ROOT)
+    return store, store_index
+
+
+class StoreLoader(QObject):
+    """
+    Opens password stores in the background.
+
+    loaded(store, store_index) or failed(message) is emitted on the GUI
+    thread for the last store that was requested, recipients_scanned(map)
+    for the last RecipientMap that was asked for.
+    """
+
+    loaded = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+    recipients_scanned = pyqtSignal(object)
+    job_done = pyqtSignal(int, object, str)
+    scan_done = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="load")
+        self.last_id = 0
+        self.last_scan = 0
+        self.job_done.connect(self.on_job_done)
+        self.scan_done.connect(self.on_scan_done)
+
+    def load(self, store_dir):
+        """
+        Open a store, replacing earlier requests that are still running.
+
+        :param store_dir: Root directory of the password store.
+        """
+        self.last_id += 1
+        self.executor.submit(self.run, self.last_id, store_dir)
+
+    def run(self, request_id, store_dir):
+        """Open the store, runs on the worker thread."""
+        try:
+            result = open_store(store_dir)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            # passpy raises its own exception types, which are not imported
+            # here, next to the usual OSErrors.
+            self.job_done.emit(request_id, None, str(error))
+            return
+        self.job_done.emit(request_id, result, "")
+
+    def on_job_done(self, request_id, result, error):
+        """
+        Pass the result of the last request on.
+        """
+        if request_id != self.last_id:
+            return
+        if error:
+            self.failed.emit(error)
+        else:
+            self.loaded.emit(*result)
+
+    def scan_recipients(self, store_dir):
+        """
+        Build the RecipientMap of a store, replacing earlier requests.
+
+        :param store_dir: Root directory of the password store.
+        """
+        self.last_scan += 1
+        self.executor.submit(self.run_scan, self.last_scan, store_dir)
+
+    def run_scan(self, request_id, store_dir):
+        """Scan the .gpg-id files of the store, runs on the worker thread."""
+        if request_id != self.last_scan:
+            return
+        with tracing.span("RecipientMap.scan", "store", store_dir=store_dir):
+            recipient_map = RecipientMap(store_dir).scan()
+        self.scan_done.emit(request_id, recipient_map)
+
+    def on_scan_done(self, request_id, recipient_map):
+        """
+        Pass the RecipientMap of the last request on.
+        """
+        if request_id == self.last_scan:
+            self.recipients_scanned.emit(recipient_map)
+
+    def shutdown(self):
+        """
+        Forget pending requests and stop the worker thread.
+        """
+        self.last_id += 1
+        self.last_scan += 1
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,370 @@
+"""
+This module defines the StoreModel class, a lazy QAbstractItemModel for the
+password store.
+
+Instead of walking the whole store up front, folders are only listed when
+the view asks for their children (when they get expanded). This keeps the
+start up time and refreshes of large stores independent of their size.
+The structure itself lives in a StoreIndex, the model only exposes it to Qt.
+"""
+
+import os
+
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QIcon
+
+import tracing
+from recipient_map import GPG_ID_FILE
+from store_index import ROOT, StoreIndex
+from utilities import get_icon_path
+
+FULL_PATH_ROLE = Qt.ItemDataRole.UserRole + 1
+
+_ICONS = {}
+
+
+def shared_icons():
+    """
+    The folder and entry icons, created once and shared by all models.
+
+    :return: Tuple of (folder icon, entry icon).
+    """
+    if not _ICONS:
+        _ICONS["folder"] = QIcon.fromTheme("folder")
+        _ICONS["entry"] = QIcon(get_icon_path())
+    return _ICONS["folder"], _ICONS["entry"]
+
+
+class StoreModel(QAbstractItemModel):
+    """
+    Tree model of the password store that lists folders on demand.
+
+    Implements canFetchMore/fetchMore, so only the root and the folders
+    that have been expanded are read from disk. The internal id of every
+    index is the id of its folder or entry in the StoreIndex.
+    """
+
+    folder_listed = pyqtSignal(str)
+
+    def __init__(self, store, parent=None, store_index=None):
+        super().__init__(parent)
+        self.store = store
+        self.store_index = store_index or StoreIndex(store.store_dir)
+        self.recipient_map = None
+
+    def entry_from_index(self, index):
+        """
+        :param index: An index of this model.
+        :return: The StoreIndex id for index, ROOT for invalid indexes.
+        """
+        if index.isValid():
+            return index.internalId()
+        return ROOT
+
+    def index_from_entry(self, entry):
+        """
+        :param entry: A StoreIndex id.
+        :return: The index of entry in this model.
+        """
+        if entry == ROOT:
+            return QModelIndex()
+        return self.createIndex(self.store_index.row(entry), 0, entry)
+
+    def index(self, row, column, parent=QModelIndex()):
+        """Create the index for row and column under parent."""
+        children = self.store_index.child_ids(self.entry_from_index(parent))
+        if column != 0 or not 0 <= row < len(children):
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index=QModelIndex()):  # pylint: disable=arguments-differ
+        """Return the parent index of index."""
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_from_entry(self.store_index.parent(index.internalId()))
+
+    def rowCount(self, parent=QModelIndex()):  # pylint: disable=invalid-name
+        """Return the number of listed children of parent."""
+        if parent.column() > 0:
+            return 0
+        return len(self.store_index.child_ids(self.entry_from_index(parent)))
+
+    def columnCount(self, _parent=QModelIndex()):  # pylint: disable=invalid-name
+        """The store tree has a single column."""
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):  # pylint: disable=invalid-name
+        """Folders that have not been listed yet might have children."""
+        entry = self.entry_from_index(parent)
+        if not self.store_index.is_folder(entry):
+            return False
+        return not self.store_index.is_listed(entry) or bool(
+            self.store_index.child_ids(entry)
+        )
+
+    def canFetchMore(self, parent):  # pylint: disable=invalid-name
+        """Folders can be fetched once."""
+        entry = self.entry_from_index(parent)
+        return self.store_index.is_folder(entry) and not self.store_index.is_listed(
+            entry
+        )
+
+    @tracing.traced("model")
+    def fetchMore(self, parent):  # pylint: disable=invalid-name
+        """List the folder at parent and insert its children."""
+        if not self.canFetchMore(parent):
+            return
+        entry = self.entry_from_index(parent)
+        folders, entries = self.store_index.read_folder(entry)
+        count = len(folders) + len(entries)
+        if count:
+            self.beginInsertRows(parent, 0, count - 1)
+        self.store_index.set_children(entry, folders, entries)
+        if count:
+            self.endInsertRows()
+        self.folder_listed.emit(self.store_index.full_path(entry))
+
+    def fetch_all(self):
+        """
+        Fetch every folder of the store.
+
+        Needed before filtering, because the filter proxy only sees the
+        rows that have been fetched.
+        """
+        pending = [QModelIndex()]
+        while pending:
+            parent = pending.pop()
+            self.fetchMore(parent)
+            entry = self.entry_from_index(parent)
+            pending.extend(
+                self.index_from_entry(child)
+                for child in self.store_index.child_ids(entry)
+                if self.store_index.is_folder(child)
+            )
+
+    def recipients_tooltip(self, entry):
+        """
+        :param entry: A StoreIndex id.
+        :return: Who the passwords of entry (or in it) are encrypted for.
+        """
+        folder = self.store_index.folder(entry).strip("/")
+        gpg_ids, source = self.recipient_map.lookup(folder)
+        if not gpg_ids:
+            return self.tr("No .gpg-id file applies here")
+        tooltip = self.tr("Encrypted for: {}").format(", ".join(gpg_ids))
+        if source != folder or not self.store_index.is_folder(entry):
+            tooltip += "\n" + self.tr("Set in {}").format(f"{source}/{GPG_ID_FILE}")
+        return tooltip
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        """Return the name, icon, full path or recipients of the entry at index."""
+        if not index.isValid():
+            return None
+        entry = index.internalId()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.store_index.name(entry)
+        if role == Qt.ItemDataRole.DecorationRole:
+            folder_icon, entry_icon = shared_icons()
+            return folder_icon if self.store_index.is_folder(entry) else entry_icon
+        if role == FULL_PATH_ROLE:
+            return self.store_index.full_path(entry)
+        if role == Qt.ItemDataRole.ToolTipRole and self.recipient_map is not None:
+            return self.recipients_tooltip(entry)
+        return None
+
+    def flags(self, index):
+        """Entries are selectable but not editable."""
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def removeRows(
+        self, row, count, parent=QModelIndex()
+    ):  # pylint: disable=invalid-name
+        """Remove count listed children of parent starting at row."""
+        children = self.store_index.child_ids(self.entry_from_index(parent))
+        if count <= 0 or row < 0 or row + count > len(children):
+            return False
+        removed = list(children[row : row + count])
+        self.beginRemoveRows(parent, row, row + count - 1)
+        for entry in removed:
+            self.store_index.remove(entry)
+        self.endRemoveRows()
+        return True
+
+    def add_path(self, path, is_folder=False):
+        """
+        Insert a folder or entry that was added to the store, including
+        any new folders above it.
+
+        Folders that have not been listed yet are read from disk instead,
+        which picks up the new path as well. New folders only contain what
+        gets added to them, so they are not read from disk.
+
+        :param path: Path relative to the store root.
+        :param is_folder: True when path is a folder.
+        :return: Id of the folder or entry in the store index.
+        """
+        parts = [part for part in path.split("/") if part]
+        folder = ROOT
+        for depth, name in enumerate(parts):
+            self.fetchMore(self.index_from_entry(folder))
+            child_path = "/".join(parts[: depth + 1])
+            child_is_folder = is_folder or depth < len(parts) - 1
+            entry = self.store_index.lookup(child_path, child_is_folder)
+            if entry is None:
+                row = self.store_index.insert_row(folder, name, child_is_folder)
+                self.beginInsertRows(self.index_from_entry(folder), row, row)
+                entry = self.store_index.insert(
+                    folder, name, child_is_folder, row, listed=True
+                )
+                self.endInsertRows()
+                if child_is_folder:
+                    self.folder_listed.emit(child_path)
+            folder = entry
+        return folder
+
+    def remove_path(self, path, is_folder=None):
+        """
+        Remove a folder or entry that was deleted from the store.
+
+        Folders left behind empty (and therefore removed from disk by git)
+        are removed from the model as well.
+
+        :param path: Path relative to the store root.
+        :param is_folder: True when path is a folder, False when it is an
+            entry, None when it is not known.
+        """
+        entry = self.store_index.lookup(path, is_folder)
+        while entry is not None and entry != ROOT:
+            parent = self.store_index.parent(entry)
+            self.removeRows(
+                self.store_index.row(entry), 1, self.index_from_entry(parent)
+            )
+            parent_dir = os.path.join(
+                self.store_index.store_dir, self.store_index.full_path(parent)
+            )
+            if parent == ROOT or os.path.isdir(parent_dir):
+                break
+            entry = parent
+
+    def move_path(self, old_path, new_path, is_folder=None):
+        """
+        Move a folder or entry that was renamed in the store.
+
+        :param old_path: The old path relative to the store root.
+        :param new_path: The final new path relative to the store root.
+        :param is_folder: True when old_path is a folder, False when it is
+            an entry, None when it is not known.
+        """
+        entry = self.store_index.lookup(old_path, is_folder)
+        if entry is None:
+            self.add_path(new_path, bool(is_folder))
+            return
+        is_folder = self.store_index.is_folder(entry)
+        parent_path, _, name = new_path.strip("/").rpartition("/")
+        folder = self.add_path(parent_path, is_folder=True) if parent_path else ROOT
+        if (
+            not self.store_index.is_listed(folder)
+            or self.store_index.lookup(new_path, is_folder) is not None
+        ):
+            # The destination is read from disk when it gets fetched.
+            self.remove_path(old_path, is_folder)
+            return
+        old_parent = self.store_index.parent(entry)
+        old_row = self.store_index.row(entry)
+        row = self.store_index.insert_row(folder, name, is_folder, exclude=entry)
+        if folder == old_parent and row == old_row:
+            self.store_index.move(entry, folder, name, row)
+            index = self.index_from_entry(entry)
+            self.dataChanged.emit(index, index)
+            return
+        destination = row + 1 if folder == old_parent and row > old_row else row
+        self.beginMoveRows(
+            self.index_from_entry(old_parent),
+            old_row,
+            old_row,
+            self.index_from_entry(folder),
+            destination,
+        )
+        self.store_index.move(entry, folder, name, row)
+        self.endMoveRows()
+        self.remove_path_if_gone(old_parent)
+
+    def remove_path_if_gone(self, folder):
+        """
+        Remove a folder from the model when it no longer exists on disk.
+
+        :param folder: Id of the folder in the store index.
+        """
+        path = self.store_index.full_path(folder)
+        if folder != ROOT and not os.path.isdir(
+            os.path.join(self.store_index.store_dir, path)
+        ):
+            self.remove_path(path, is_folder=True)
+
+    def sync_folder(self, path):
+        """
+        Bring a listed folder in line with its contents on disk, after it
+        was changed outside of PyQtPass.
+
+        Folders that have not been listed are left alone, they are read
+        from disk when they get fetched.
+
+        :param path: Path of the folder relative to the store root.
+        """
+        folder = self.store_index.lookup(path, is_folder=True)
+        if folder is None or not self.store_index.is_listed(folder):
+            return
+        if folder != ROOT and not os.path.isdir(
+            os.path.join(self.store_index.store_dir, path)
+        ):
+            self.remove_path(path, is_folder=True)
+            return
+        folders, entries = self.store_index.read_folder(folder)
+        wanted = {(name, True) for name in folders}
+        wanted.update((name, False) for name in entries)
+        current = {
+            (self.store_index.name(entry), self.store_index.is_folder(entry)): entry
+            for entry in self.store_index.child_ids(folder)
+        }
+        parent = self.index_from_entry(folder)
+        for key, entry in current.items():
+            if key not in wanted:
+                self.removeRows(self.store_index.row(entry), 1, parent)
+        for name, is_folder in sorted(wanted.difference(current)):
+            row = self.store_index.insert_row(folder, name, is_folder)
+            self.beginInsertRows(parent, row, row)
+            self.store_index.insert(folder, name, is_folder, row)
+            self.endInsertRows()
+
+    def listed_folders(self):
+        """
+        :return: Paths of all folders that have been listed, the root first.
+        """
+        paths = []
+        pending = [ROOT]
+        while pending:
+            folder = pending.pop()
+            if not self.store_index.is_listed(folder):
+                continue
+            paths.append(self.store_index.full_path(folder))
+            pending.extend(
+                entry
+                for entry in self.store_index.child_ids(folder)
+                if self.store_index.is_folder(entry)
+            )
+        return paths
+
+
+@tracing.traced("model")
+def create_tree_model(store, store_index=None):
+    """
+    Create a tree model from the password store.
+
+    :param store: The password store instance from passpy.
+    :param store_index: A StoreIndex of the store to start from, e.g. one
+        that was filled on a worker thread.
+    :return: StoreModel that lists the directories and entries on demand.
+    """
+    return StoreModel(store, store_index=store_index)
@@ -0,0 +1,196 @@
+"""
+This module defines the StorePool class, which keeps the password stores of
+recently used profiles open, so switching back to one of them only swaps
+the model of the tree view instead of reading the store from disk again.
+
+Pooled stores keep their passpy Store, StoreModel (with its StoreIndex of
+everything listed so far) and RecipientMap. The pool is limited both in
+the number of stores and in the estimated memory of their indexes, the
+least recently used store is closed first. Pooled stores are not watched
+for changes, instead the modification times of their listed folders are
+compared in the background every REVALIDATE_INTERVAL milliseconds and
+when a store is taken out of the pool, and changed folders are read again.
+"""
+
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+ENTRY_BYTES = 300
+REVALIDATE_INTERVAL = 60000
+
+
+def folder_stamps(store_dir, folders):
+    """
+    :param store_dir: Root directory of the password store.
+    :param folders: Folder paths relative to the store root.
+    :return: Dict of folder to its modification time, None when it is gone.
+    """
+    stamps = {}
+    for folder in folders:
+        try:
+            stamps[folder] = os.stat(os.path.join(store_dir, folder)).st_mtime_ns
+        except OSError:
+            stamps[folder] = None
+    return stamps
+
+
+class PooledStore:
+    """
+    An open password store with its tree model and recipient map.
+    """
+
+    def __init__(self, store, model, recipient_map=None):
+        self.store = store
+        self.model = model
+        self.recipient_map = recipient_map
+        self.stamps = {}
+
+    def memory(self):
+        """
+        :return: Estimated number of bytes the store keeps in memory.
+        """
+        return len(self.model.store_index) * ENTRY_BYTES
+
+    def apply(self, stamps):
+        """
+        Read the folders that changed since the last stamps were taken.
+
+        :param stamps: Current modification times of the listed folders.
+        :return: List of the changed folders.
+        """
+        changed = [
+            folder
+            for folder, stamp in stamps.items()
+            if self.stamps.get(folder) != stamp
+        ]
+        for folder in sorted(changed, key=len):
+            self.model.sync_folder(folder)
+        if changed and self.recipient_map is not None:
+            self.recipient_map.update(changed)
+        self.stamps = folder_stamps(
+            self.model.store_index.store_dir, self.model.listed_folders()
+        )
+        return changed
+
+
+class StorePool(QObject):
+    """
+    LRU pool of the stores of recently used profiles, keyed by their
+    store directory.
+    """
+
+    stamps_done = pyqtSignal(object, dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.stores = OrderedDict()
+        self.max_stores = 4
+        self.max_memory = 64 * 1024 * 1024
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pool")
+        self.stamps_done.connect(self.on_stamps_done)
+        self.timer = QTimer(self)
+        self.timer.setInterval(REVALIDATE_INTERVAL)
+        self.timer.timeout.connect(self.revalidate_all)
+
+    def configure(self, max_stores, max_memory):
+        """
+        Change the limits of the pool, closing stores beyond them.
+
+        :param max_stores: Number of stores to keep open, 0 disables pooling.
+        :param max_memory: Megabytes the pooled indexes may use together.
+        """
+        self.max_stores = max(0, max_stores)
+        self.max_memory = max(0, max_memory) * 1024 * 1024
+        self.evict()
+
+    def memory(self):
+        """
+        :return: Estimated number of bytes all pooled stores use.
+        """
+        return sum(pooled.memory() for pooled in self.stores.values())
+
+    def park(self, pooled):
+        """
+        Keep a store that is no longer shown open.
+
+        :param pooled: The PooledStore.
+        """
+        store_dir = pooled.model.store_index.store_dir
+        self.stores.pop(store_dir, None)
+        pooled.stamps = folder_stamps(store_dir, pooled.model.listed_folders())
+        self.stores[store_dir] = pooled
+        self.evict()
+        if self.stores and not self.timer.isActive():
+            self.timer.start()
+
+    def take(self, store_dir):
+        """
+        Take a store out of the pool to show it again, folders that changed
+        meanwhile are read again in the background.
+
+        :param store_dir: Root directory of the password store.
+        :return: The PooledStore, None when it is not pooled.
+        """
+        pooled = self.stores.pop(os.path.normpath(store_dir), None)
+        if not self.stores:
+            self.timer.stop()
+        if pooled is not None:
+            self.revalidate(pooled)
+        return pooled
+
+    def evict(self):
+        """
+        Close the least recently used stores until the pool fits its limits.
+        """
+        while self.stores and (
+            len(self.stores) > self.max_stores or self.memory() > self.max_memory
+        ):
+            self.stores.popitem(last=False)
+        if not self.stores:
+            self.timer.stop()
+
+    def revalidate(self, pooled):
+        """
+        Compare the modification times of the listed folders of a store in
+        the background.
+
+        :param pooled: The PooledStore.
+        """
+        folders = list(pooled.stamps)
+        store_dir = pooled.model.store_index.store_dir
+        self.executor.submit(
+            lambda: self.stamps_done.emit(pooled, folder_stamps(store_dir, folders))
+        )
+
+    def revalidate_all(self):
+        """
+        Revalidate every pooled store.
+        """
+        for pooled in self.stores.values():
+            self.revalidate(pooled)
+
+    def on_stamps_done(self, pooled, stamps):
+        """
+        Read the folders of a store again that changed on disk.
+
+        :param pooled: The PooledStore that was revalidated.
+        :param stamps: The current modification times of its folders.
+        """
+        pooled.apply(stamps)
+
+    def clear(self):
+        """
+        Close all pooled stores.
+        """
+        self.stores.clear()
+        self.timer.stop()
+
+    def shutdown(self):
+        """
+        Close all pooled stores and stop the worker thread.
+        """
+        self.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
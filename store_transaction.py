@@ -0,0 +1,486 @@
+"""
+This module defines the StoreTransaction class, which batches changes to
+the password store into a single git commit.
+
+passpy commits every set_key, move_path and remove_path on its own, which
+adds up to thousands of commits and git runs for bulk changes. Within a
+transaction new contents are encrypted in parallel before anything on
+disk is touched, then all changes are applied and committed in one go:
+
+    with StoreTransaction(store, backend) as transaction:
+        transaction.set_key("web/github", data)
+        transaction.remove_path("web/old", recursive=True, is_folder=True)
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from git_utils import is_git_repo, run_git
+from gpg_utils import (
+    SubprocessBackend,
+    key_listings,
+    read_gpg_ids,
+    read_recipients,
+    recipients_match,
+)
+from reencrypt_engine import MAX_WORKERS, write_temp_file
+
+MAX_MESSAGE_LINES = 50
+GIT_ADD_BATCH = 500
+
+
+class StoreTransaction:
+    """
+    Collects changes to a passpy Store and applies them with one commit.
+
+    Paths are relative to the store root, entries without the .gpg
+    extension, like in passpy. As an entry and a folder can have the same
+    path, removing and moving take whether path is a folder, when that is
+    not given the entry is meant if there is one. Mistakes that can be spotted up front, like
+    adding an entry that already exists, raise right away, everything else
+    when the transaction is committed. Leaving the with block because of
+    an exception discards the transaction.
+    """
+
+    def __init__(self, store, backend=None):
+        self.store_dir = store.store_dir
+        self.backend = backend or SubprocessBackend(store.gpg_bin, store.gpg_opts)
+        self.operations = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.operations.clear()
+        return False
+
+    def full_path(self, path):
+        """
+        :param path: Path relative to the store root.
+        :return: The absolute path, refusing paths outside the store.
+        """
+        path = os.path.normpath(path.strip("/"))
+        if path == ".." or path.startswith(".." + os.sep) or os.path.isabs(path):
+            raise PermissionError(f"{path} is outside the password store.")
+        return os.path.join(self.store_dir, path)
+
+    def resolve(self, path, is_folder=None):
+        """
+        :param path: An entry or folder relative to the store root.
+        :param is_folder: True for the folder, False for the entry, None
+            for the entry when there is one and the folder otherwise.
+        :return: True when path is a folder.
+        :raises FileNotFoundError: when there is no such entry or folder.
+        """
+        full_path = self.full_path(path)
+        if is_folder is None:
+            is_folder = not os.path.isfile(full_path + ".gpg")
+        if is_folder and not os.path.isdir(full_path):
+            raise FileNotFoundError(f"{path}/ is not in the password store.")
+        if not is_folder and not os.path.isfile(full_path + ".gpg"):
+            raise FileNotFoundError(f"{path} is not in the password store.")
+        return is_folder
+
+    def set_key(self, path, key_data, force=False):
+        """
+        Add or update a password entry.
+
+        :param path: The entry to write.
+        :param key_data: The contents of the entry.
+        :param force: True to overwrite an existing entry.
+        :raises FileExistsError: when the entry exists and force is False.
+        """
+        key_path = self.full_path(path) + ".gpg"
+        if os.path.exists(key_path) and not force:
+            raise FileExistsError(f"An entry already exists for {path}.")
+        # pass always ends its files with a newline.
+        if not key_data.endswith("\n"):
+            key_data += "\n"
+        self.operations.append(("set", os.path.normpath(path), key_data, False))
+
+    def remove_path(self, path, recursive=False, is_folder=None):
+        """
+        Remove a password entry or folder.
+
+        :param path: The entry or folder to remove.
+        :param recursive: True to remove folders that are not empty.
+        :param is_folder: Whether path is a folder, see resolve.
+        :raises FileNotFoundError: when there is no such entry or folder.
+        """
+        is_folder = self.resolve(path, is_folder)
+        self.operations.append(("remove", os.path.normpath(path), recursive, is_folder))
+
+    def move_path(self, old_path, new_path, force=False, is_folder=None):
+        """
+        Move or rename a password entry or folder.
+
+        Moved entries are re-encrypted when their new folder uses other
+        GPG ids, like passpy does.
+
+        :param old_path: The entry or folder to move.
+        :param new_path: The final new path, not the folder to move into.
+        :param force: True to overwrite an existing entry.
+        :param is_folder: Whether old_path is a folder, see resolve.
+        :raises FileNotFoundError: when there is no such entry or folder.
+        :raises FileExistsError: when new_path exists and force is False.
+        """
+        is_folder = self.resolve(old_path, is_folder)
+        new_full = self.full_path(new_path)
+        if not is_folder:
+            new_full += ".gpg"
+        if os.path.exists(new_full) and (os.path.isdir(new_full) or not force):
+            raise FileExistsError(f"{new_path} already exists.")
+        self.operations.append(
+            ("move", os.path.normpath(old_path), os.path.normpath(new_path), is_folder)
+        )
+
+    def recipients(self, path):
+        """
+        :param path: Path of an entry relative to the store root.
+        :return: The GPG ids the entry should be encrypted for.
+        :raises FileNotFoundError: when no .gpg-id file applies.
+        """
+        gpg_ids, _ = read_gpg_ids(self.store_dir, os.path.dirname(path))
+        if not gpg_ids:
+            raise FileNotFoundError("You must initialise the password store first!")
+        return gpg_ids
+
+    def encrypt(self, executor):
+        """
+        Encrypt the contents of all set_key operations in parallel into
+        temporary files next to their destination.
+
+        :param executor: The thread pool to encrypt on.
+        :return: Dict of entry path to temporary file path.
+        """
+        entries = {}
+        for operation, path, key_data, _ in self.operations:
+            if operation == "set":
+                entries[path] = key_data
+        for path in entries:
+            os.makedirs(os.path.dirname(self.full_path(path)), exist_ok=True)
+
+        def stage(item):
+            path, key_data = item
+            data = self.backend.encrypt(key_data, self.recipients(path))
+            return path, write_temp_file(self.full_path(path) + ".gpg", data)
+
+        return self.collect(executor, stage, entries.items())
+
+    def prune(self, directory):
+        """
+        Remove directory and its parents when they are empty, like git does.
+
+        :param directory: Absolute path of a folder in the store.
+        """
+        while directory != self.store_dir and os.path.isdir(directory):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                return
+            directory = os.path.dirname(directory)
+
+    def apply(self, staged, reencrypted):
+        """
+        Apply the operations to the working tree in order.
+
+        :param staged: Dict of entry path to encrypted temporary file.
+        :param reencrypted: Dict of the new .gpg path of moved entries to
+            their re-encrypted temporary file.
+        :return: List of the touched store paths.
+        """
+        touched = []
+        for operation, path, argument, is_folder in self.operations:
+            full_path = self.full_path(path)
+            if operation == "set":
+                if path in staged:
+                    os.replace(staged.pop(path), full_path + ".gpg")
+                touched.append(path + ".gpg")
+            elif operation == "remove":
+                if is_folder:
+                    if argument:
+                        shutil.rmtree(full_path)
+                    else:
+                        os.rmdir(full_path)
+                    touched.append(path)
+                else:
+                    os.remove(full_path + ".gpg")
+                    touched.append(path + ".gpg")
+                self.prune(os.path.dirname(full_path))
+            else:
+                self.move(path, argument, is_folder, touched, reencrypted)
+        return touched
+
+    def move(
+        self, old_path, new_path, is_folder, touched, reencrypted
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        """
+        Move an entry or folder on disk.
+
+        :param old_path: The entry or folder to move.
+        :param new_path: The new path.
+        :param is_folder: True when old_path is a folder.
+        :param touched: List the changed store paths are added to.
+        :param reencrypted: Dict of the new .gpg path of moved entries to
+            their re-encrypted temporary file, used entries are removed.
+        """
+        old_full = self.full_path(old_path)
+        new_full = self.full_path(new_path)
+        suffix = "" if is_folder else ".gpg"
+        os.makedirs(os.path.dirname(new_full), exist_ok=True)
+        os.replace(old_full + suffix, new_full + suffix)
+        self.prune(os.path.dirname(old_full))
+        touched.extend([old_path + suffix, new_path + suffix])
+        for path, _, _ in self.moved_entries(old_path, new_path, new_full + suffix):
+            if path in reencrypted:
+                temp_path = reencrypted.pop(path)
+                full_path = os.path.join(self.store_dir, path)
+                os.chmod(temp_path, os.stat(full_path).st_mode & 0o7777)
+                os.replace(temp_path, full_path)
+
+    @staticmethod
+    def moved_entries(old_path, new_path, location):
+        """
+        :param old_path: The entry or folder that is moved.
+        :param new_path: Its new path.
+        :param location: Where the entry or folder is on disk right now.
+        :return: List of (new .gpg path, old .gpg path, old folder) tuples
+            of the entries that are moved, relative to the store root.
+        """
+        if not os.path.isdir(location):
+            return [(new_path + ".gpg", old_path + ".gpg", os.path.dirname(old_path))]
+        moved = []
+        for root, dirs, files in os.walk(location):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            relative = os.path.relpath(root, location)
+            old_root = os.path.normpath(os.path.join(old_path, relative))
+            new_root = os.path.normpath(os.path.join(new_path, relative))
+            moved.extend(
+                (os.path.join(new_root, name), os.path.join(old_root, name), old_root)
+                for name in files
+                if name.endswith(".gpg")
+            )
+        return moved
+
+    def plan_reencrypt(self):
+        """
+        Find the entries that get moved to a folder with other GPG ids and
+        are not encrypted for those yet, before anything is moved.
+
+        :return: List of (new .gpg path, old .gpg path, GPG ids) tuples.
+        """
+        todo = []
+        key_index = None
+        for operation, old_path, new_path, is_folder in self.operations:
+            if operation != "move":
+                continue
+            location = self.full_path(old_path)
+            if not is_folder:
+                location += ".gpg"
+            for path, old_key, old_folder in self.moved_entries(
+                old_path, new_path, location
+            ):
+                old_ids, source = read_gpg_ids(self.store_dir, old_folder)
+                if source == old_path or source.startswith(old_path + "/"):
+                    # The .gpg-id file is moved along with the entry.
+                    continue
+                gpg_ids = self.recipients(path)
+                if old_ids == gpg_ids:
+                    continue
+                if key_index is None:
+                    key_index = key_listings().key_index()
+                key_path = os.path.join(self.store_dir, old_key)
+                if not recipients_match(read_recipients(key_path), gpg_ids, key_index):
+                    todo.append((path, old_key, gpg_ids))
+        return todo
+
+    def reencrypt_moved(self, executor):
+        """
+        Re-encrypt the entries found by plan_reencrypt in parallel into
+        temporary files in the store root, which replace them once they
+        have been moved.
+
+        :param executor: The thread pool to re-encrypt on.
+        :return: Dict of the new .gpg path to the temporary file path.
+        """
+
+        def reencrypt(item):
+            path, old_key, gpg_ids = item
+            old_full = os.path.join(self.store_dir, old_key)
+            data = self.backend.decrypt(old_full, binary=True)
+            # Staged in the store root, so moving a folder leaves it alone.
+            temp_for = os.path.join(self.store_dir, os.path.basename(path))
+            return path, write_temp_file(temp_for, self.backend.encrypt(data, gpg_ids))
+
+        return self.collect(executor, reencrypt, self.plan_reencrypt())
+
+    @staticmethod
+    def collect(executor, function, items):
+        """
+        Run function for all items on executor, removing the temporary files
+        of the others when one fails.
+
+        :param executor: The thread pool.
+        :param function: Callable returning a (path, temporary file) tuple.
+        :param items: The arguments for function.
+        :return: Dict of path to temporary file.
+        """
+        futures = [executor.submit(function, item) for item in items]
+        wait(futures)
+        staged = dict(
+            future.result() for future in futures if future.exception() is None
+        )
+        for future in futures:
+            if future.exception() is not None:
+                for temp_path in staged.values():
+                    os.remove(temp_path)
+                raise future.exception()
+        return staged
+
+    def message(self):
+        """
+        :return: The commit message summarizing the operations.
+        """
+        lines = []
+        counts = {"set": 0, "remove": 0, "move": 0}
+        for operation, path, argument, _ in self.operations:
+            counts[operation] += 1
+            if operation == "set":
+                lines.append(f"Add given password for {path} to store.")
+            elif operation == "remove":
+                lines.append(f"Remove {path} from store.")
+            else:
+                lines.append(f"Rename {path} to {argument}.")
+        if len(lines) == 1:
+            return lines[0]
+        summary = ", ".join(
+            f"{count} {label}"
+            for count, label in (
+                (counts["set"], "added or updated"),
+                (counts["move"], "renamed"),
+                (counts["remove"], "removed"),
+            )
+            if count
+        )
+        if len(lines) > MAX_MESSAGE_LINES:
+            more = len(lines) - MAX_MESSAGE_LINES
+            lines = lines[:MAX_MESSAGE_LINES] + [f"... and {more} more."]
+        return f"Update password store: {summary}.\n\n" + "\n".join(lines)
+
+    def commit(self):
+        """
+        Encrypt, apply and commit all collected operations.
+
+        :raises OSError: when encrypting, changing the files or git failed.
+        """
+        if not self.operations:
+            return
+        with ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="transaction"
+        ) as executor:
+            staged = self.encrypt(executor)
+            reencrypted = {}
+            try:
+                # Everything is encrypted before the working tree changes.
+                reencrypted = self.reencrypt_moved(executor)
+                touched = self.apply(staged, reencrypted)
+            finally:
+                for temp_path in [*staged.values(), *reencrypted.values()]:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+        message = self.message()
+        self.operations.clear()
+        if is_git_repo(self.store_dir):
+            self.git_commit(touched, message)
+
+    def git_pathspecs(self, paths):
+        """
+        :param paths: Changed paths relative to the store root.
+        :return: Literal pathspecs of the paths that are on disk or known to
+            git, not of the ones that were added and removed again.
+        """
+        paths = list(dict.fromkeys(paths))
+        missing = [
+            path
+            for path in paths
+            if not os.path.lexists(os.path.join(self.store_dir, path))
+        ]
+        known = set()
+        for start in range(0, len(missing), GIT_ADD_BATCH):
+            batch = missing[start : start + GIT_ADD_BATCH]
+            success, output = run_git(
+                self.store_dir,
+                "ls-files",
+                "--cached",
+                "-z",
+                "--",
+                *(f":(literal){path}" for path in batch),
+            )
+            if not success:
+                raise OSError(output)
+            files = output.split("\0")
+            known.update(
+                path
+                for path in batch
+                if any(name == path or name.startswith(path + "/") for name in files)
+            )
+        return [
+            f":(literal){path}"
+            for path in paths
+            if path in known or path not in missing
+        ]
+
+    def git_commit(self, paths, message):
+        """
+        Stage the changed paths and commit only them, leaving anything else
+        the user staged alone.
+
+        :param paths: Changed paths relative to the store root.
+        :param message: The commit message.
+        :raises OSError: when git failed.
+        """
+        pathspecs = self.git_pathspecs(paths)
+        if not pathspecs:
+            return
+        for start in range(0, len(pathspecs), GIT_ADD_BATCH):
+            success, output = run_git(
+                self.store_dir,
+                "add",
+                "--all",
+                "--",
+                *pathspecs[start : start + GIT_ADD_BATCH],
+            )
+            if not success:
+                raise OSError(output)
+        if len(pathspecs) <= GIT_ADD_BATCH:
+            success, output = run_git(
+                self.store_dir, "commit", "-m", message, "--", *pathspecs
+            )
+        else:
+            # Too many paths for one command line.
+            git_dir = os.path.join(self.store_dir, ".git")
+            handle, pathspec_file = tempfile.mkstemp(
+                prefix="pyqtpass-",
+                suffix=".pathspec",
+                dir=git_dir if os.path.isdir(git_dir) else None,
+            )
+            try:
+                with os.fdopen(handle, "w", encoding="utf-8") as spec_file:
+                    spec_file.write("\0".join(pathspecs))
+                success, output = run_git(
+                    self.store_dir,
+                    "commit",
+                    "-m",
+                    message,
+                    f"--pathspec-from-file={pathspec_file}",
+                    "--pathspec-file-nul",
+                )
+            finally:
+                os.remove(pathspec_file)
+        if not success and "nothing to commit" not in output:
+            raise OSError(output)
@@ -0,0 +1,141 @@
+"""
+This module defines the StoreWatcher class, which keeps the tree model in
+sync with changes made to the password store outside of PyQtPass, for
+example by pass on the command line, a cron job or a git pull.
+
+Only folders that have been listed in the model are watched, everything
+else is read from disk when it gets expanded anyway. Bursts of changes,
+like a git checkout touching thousands of files, are coalesced into a
+single update of every changed folder.
+"""
+
+import os
+
+from PyQt6.QtCore import QElapsedTimer, QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+COALESCE_DELAY = 300
+MAX_COALESCE_DELAY = 2000
+MAX_WATCHED_FOLDERS = 512
+POLL_INTERVAL = 10000
+
+
+class StoreWatcher(QObject):
+    """
+    Watches the listed folders of a StoreModel and applies changes to it.
+
+    At most MAX_WATCHED_FOLDERS folders get a file system watch, so large
+    stores do not exhaust the inotify watch limit of the user. Folders
+    beyond that are polled for modification time changes every
+    POLL_INTERVAL milliseconds instead.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    store_changed = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = None
+        self.watched = set()
+        self.polled = {}
+        self.pending = set()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush)
+        self.burst_timer = QElapsedTimer()
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(POLL_INTERVAL)
+        self.poll_timer.timeout.connect(self.poll)
+
+    def set_model(self, model):
+        """
+        Start watching the folders of another model.
+
+        :param model: The StoreModel to keep in sync.
+        """
+        if self.model is not None:
+            self.model.folder_listed.disconnect(self.watch_folder)
+        if self.watched:
+            self.watcher.removePaths(list(self.watched))
+        self.watched.clear()
+        self.polled.clear()
+        self.pending.clear()
+        self.flush_timer.stop()
+        self.poll_timer.stop()
+        self.model = model
+        model.folder_listed.connect(self.watch_folder)
+        for path in model.listed_folders():
+            self.watch_folder(path)
+
+    def directory(self, path):
+        """
+        :param path: Folder path relative to the store root.
+        :return: The absolute directory of the folder.
+        """
+        return os.path.normpath(os.path.join(self.model.store_index.store_dir, path))
+
+    def watch_folder(self, path):
+        """
+        Watch a folder that was listed in the model.
+
+        :param path: Folder path relative to the store root.
+        """
+        directory = self.directory(path)
+        if directory in self.watched or directory in self.polled:
+            return
+        if len(self.watched) < MAX_WATCHED_FOLDERS and self.watcher.addPath(directory):
+            self.watched.add(directory)
+            return
+        try:
+            self.polled[directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            return
+        if not self.poll_timer.isActive():
+            self.poll_timer.start()
+
+    def on_directory_changed(self, directory):
+        """
+        Queue a changed directory, applying the changes once things quiet
+        down or MAX_COALESCE_DELAY milliseconds after the first change.
+
+        :param directory: The absolute path of the changed directory.
+        """
+        if not self.flush_timer.isActive():
+            self.burst_timer.start()
+        self.pending.add(directory)
+        if self.burst_timer.elapsed() < MAX_COALESCE_DELAY:
+            self.flush_timer.start(COALESCE_DELAY)
+
+    def poll(self):
+        """
+        Check the polled folders for modification time changes.
+        """
+        for directory, mtime in list(self.polled.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                self.polled[directory] = current
+                self.on_directory_changed(directory)
+
+    def flush(self):
+        """
+        Apply all queued changes to the model in one go.
+        """
+        store_dir = self.model.store_index.store_dir
+        paths = []
+        for directory in sorted(self.pending):
+            path = os.path.relpath(directory, store_dir)
+            paths.append("" if path == "." else path)
+        self.pending.clear()
+        for path in paths:
+            self.model.sync_folder(path)
+        for directory in [d for d in self.watched if not os.path.isdir(d)]:
+            self.watched.discard(directory)
+            self.watcher.removePath(directory)
+        for directory in [d for d in self.polled if not os.path.isdir(d)]:
+            del self.polled[directory]
+        self.store_changed.emit(paths)
@@ -0,0 +1,48 @@
+"""
+Shared fixtures for the PyQtPass tests.
+
+The modules of PyQtPass live in the root of the repository, which is put on
+the path here. Tests run without a display, on the offscreen platform.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# pylint: disable-next=wrong-import-position
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """
+    :return: The QCoreApplication the tests run their event loops on.
+    """
+    return QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+
+
+def wait_for(signal, timeout=10000):
+    """
+    Run the event loop until signal is emitted.
+
+    :param signal: The bound signal to wait for.
+    :param timeout: Milliseconds after which the test fails.
+    :return: The arguments signal was emitted with.
+    """
+    loop = QEventLoop()
+    received = []
+
+    def on_signal(*arguments):
+        received.append(arguments)
+        loop.quit()
+
+    signal.connect(on_signal)
+    QTimer.singleShot(timeout, loop.quit)
+    loop.exec()
+    signal.disconnect(on_signal)
+    assert received, "timed out waiting for a signal"
+    return received[0]
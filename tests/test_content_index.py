@@ -0,0 +1,52 @@
+"""
+Tests for the content index of the decrypted entries.
+"""
+
+from content_index import ContentIndex, ContentIndexer
+
+
+def make_index():
+    """
+    :return: A ContentIndex with a few entries.
+    """
+    index = ContentIndex()
+    index.add("web/github", 1, {"user", "alice", "github", "com"})
+    index.add("web/gitlab", 1, {"user", "alicia", "gitlab", "com"})
+    index.add("mail/work", 1, {"login", "bob", "example", "org"})
+    return index
+
+
+def test_search_prefixes():
+    """Every query word has to start a word of the entry."""
+    index = make_index()
+    assert index.search("ali") == ["web/github", "web/gitlab"]
+    assert index.search("alic git") == ["web/github", "web/gitlab"]
+    assert index.search("alice") == ["web/github"]
+    assert index.search("com user") == ["web/github", "web/gitlab"]
+    assert index.search("lice") == []
+    assert index.search("b") == ["mail/work"]
+    assert index.search("zz") == []
+    assert index.search("") == []
+
+
+def test_tokens_follow_changes():
+    """The sorted words are kept in line with the entries."""
+    index = make_index()
+    index.add("web/github", 2, {"user", "carol"})
+    index.remove("mail/work")
+    assert index.tokens == sorted(index.postings)
+    assert index.tokens == ["alicia", "carol", "com", "gitlab", "user"]
+    assert index.search("ali") == ["web/gitlab"]
+    index.wipe()
+    assert not index.tokens
+
+
+def test_removed_entries_are_reported(qapp):  # pylint: disable=unused-argument
+    """Entries that are gone from the store are dropped and reported."""
+    indexer = ContentIndexer()
+    indexer.index = make_index()
+    removed = []
+    indexer.entries_removed.connect(removed.append)
+    indexer.on_scan_done(indexer.generation, {"web/github": 1, "web/gitlab": 1})
+    assert removed == [["mail/work"]]
+    assert indexer.index.search("bob") == []
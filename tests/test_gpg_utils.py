@@ -0,0 +1,46 @@
+"""
+Tests for parsing the key listings of gpg.
+"""
+
+from gpg_utils import KeyIndex, parse_gpg_colons
+
+KEYRING = """\
+pub:u:3072:1:1FD2E0A6B0746BE3:1792204293:::u:::scESC::::::23::0:
+fpr:::::::::A1B2C3D4E5F60718293A4B5C1FD2E0A6B0746BE3:
+uid:u::::1792204293::0001::Valid <valid@example.com>::::::::::0:
+sub:u:3072:1:7478ECAAB1E7FB39:1792204293::::::e::::::23:
+sub:e:3072:1:0123456789ABCDEF:1692204293::::::e::::::23:
+pub:e:3072:1:B462FE8121DA9D8B:1692204294:1700000000::u:::sc::::::23::0:
+fpr:::::::::B1B2C3D4E5F60718293A4B5CB462FE8121DA9D8B:
+uid:e::::1692204294::0002::Expired <expired@example.com>::::::::::0:
+sub:e:3072:1:11E082BB83EFCAA6:1692204294:1700000000:::::e::::::23:
+pub:u:255:22:72EF1969A942F6A8:1792208800:::u:::scSC::::::ed25519::0:
+fpr:::::::::C1B2C3D4E5F60718293A4B5C72EF1969A942F6A8:
+uid:u::::1792208800::0003::Signing <signing@example.com>::::::::::0:
+pub:u:3072:1:540BADAAEEDA5A83:1792208800:::u:::scESCD::::::23::0:
+fpr:::::::::D1B2C3D4E5F60718293A4B5C540BADAAEEDA5A83:
+uid:u::::1792208800::0004::Disabled <disabled@example.com>::::::::::0:
+sub:u:3072:1:9999AAAABBBBCCCC:1792208800::::::e::::::23:
+"""
+
+
+def test_encryption_ids():
+    """Only the valid encryption subkeys of usable keys can encrypt."""
+    keys = {key["uids"][0]: key for key in parse_gpg_colons(KEYRING)}
+    assert keys["Valid <valid@example.com>"]["encryption_ids"] == ["7478ECAAB1E7FB39"]
+    assert keys["Expired <expired@example.com>"]["encryption_ids"] == []
+    assert keys["Signing <signing@example.com>"]["encryption_ids"] == []
+    assert keys["Disabled <disabled@example.com>"]["encryption_ids"] == []
+
+
+def test_key_index_lookup():
+    """Keys are found by e-mail address, long id and fingerprint."""
+    key_index = KeyIndex(parse_gpg_colons(KEYRING))
+    for gpg_id in [
+        "valid@example.com",
+        "<valid@example.com>",
+        "0x1FD2E0A6B0746BE3",
+        "a1b2c3d4e5f60718293a4b5c1fd2e0a6b0746be3",
+    ]:
+        assert [key["id"] for key in key_index.lookup(gpg_id)] == ["1FD2E0A6B0746BE3"]
+    assert not key_index.lookup("unknown@example.com")
@@ -0,0 +1,183 @@
+"""
+Tests for the PushScheduler, against a clone of a local bare repository.
+"""
+
+import os
+import subprocess
+
+import pytest
+from conftest import wait_for
+from PyQt6.QtCore import QEventLoop, QTimer
+
+import git_runner
+import push_scheduler
+from push_scheduler import PushScheduler
+
+
+def git(path, *args):
+    """
+    Run git in path, failing the test when it fails.
+
+    :return: The output of git.
+    """
+    return subprocess.run(
+        ["git", "-C", path, *args], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def commit(path, name):
+    """
+    Add a file to the repository at path and commit it.
+    """
+    with open(os.path.join(path, name), "w", encoding="utf-8") as new_file:
+        new_file.write(name)
+    git(path, "add", name)
+    git(path, "commit", "-q", "-m", f"Add {name}")
+
+
+def spin(milliseconds):
+    """
+    Run the event loop for a while.
+    """
+    loop = QEventLoop()
+    QTimer.singleShot(milliseconds, loop.quit)
+    loop.exec()
+
+
+@pytest.fixture(name="clone")
+def fixture_clone(tmp_path, qapp):  # pylint: disable=unused-argument
+    """
+    :return: Path of a clone of a bare repository, with one pushed commit.
+    """
+    remote = str(tmp_path / "remote.git")
+    clone = str(tmp_path / "clone")
+    subprocess.run(["git", "init", "-q", "--bare", remote], check=True)
+    subprocess.run(["git", "clone", "-q", remote, clone], check=True)
+    git(clone, "config", "user.email", "test@example.invalid")
+    git(clone, "config", "user.name", "Test")
+    commit(clone, "first")
+    git(clone, "push", "-q", "-u", "origin", "HEAD")
+    return clone
+
+
+@pytest.fixture(name="scheduler")
+def fixture_scheduler(qapp):  # pylint: disable=unused-argument
+    """
+    :return: A PushScheduler that counts its pushes in runner.pushes.
+    """
+    runner = git_runner.GitRunner()
+    runner.pushes = 0
+    run = runner.run
+
+    def counting_run(path, operation, automatic=False):
+        runner.pushes += operation == "push"
+        run(path, operation, automatic)
+
+    runner.run = counting_run
+    scheduler = PushScheduler(runner)
+    runner.finished.connect(
+        lambda operation, status, output, _: scheduler.on_push_finished(status, output)
+    )
+    return scheduler
+
+
+def remote_head(clone):
+    """
+    :return: The commit the remote branch of clone points to.
+    """
+    branch = git(clone, "rev-parse", "--abbrev-ref", "HEAD")
+    return git(git(clone, "remote", "get-url", "origin"), "rev-parse", branch)
+
+
+def test_commits_are_pushed_together(clone, scheduler):
+    """Several edits in quick succession end up in a single push."""
+    scheduler.delay = 1
+    for name in ["second", "third", "fourth"]:
+        commit(clone, name)
+        scheduler.schedule(clone)
+        spin(300)
+    assert scheduler.runner.pushes == 0
+    operation, status, _, _ = wait_for(scheduler.runner.finished)
+    assert (operation, status) == ("push", git_runner.OK)
+    assert scheduler.runner.pushes == 1
+    assert remote_head(clone) == git(clone, "rev-parse", "HEAD")
+    assert not scheduler.is_pending()
+
+
+def test_remote_check_is_cached(clone, scheduler, monkeypatch):
+    """git is only asked for the remotes again after .git/config changed."""
+    calls = []
+    has_remote = push_scheduler.has_remote
+
+    def counting_has_remote(path):
+        calls.append(path)
+        return has_remote(path)
+
+    monkeypatch.setattr(push_scheduler, "has_remote", counting_has_remote)
+    for _ in range(3):
+        assert scheduler.has_remote(clone)
+    assert len(calls) == 1
+    config = os.path.join(clone, ".git", "config")
+    stat = os.stat(config)
+    git(clone, "config", "pyqtpass.test", "1")
+    os.utime(config, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    assert scheduler.has_remote(clone)
+    assert len(calls) == 2
+    scheduler.cancel()
+
+
+def test_offline_push_is_retried(clone, scheduler, tmp_path):
+    """A push that can not reach the remote is tried again later."""
+    remote = git(clone, "remote", "get-url", "origin")
+    git(clone, "remote", "set-url", "origin", str(tmp_path / "unreachable.git"))
+    scheduler.delay = 0
+    commit(clone, "second")
+    scheduler.schedule(clone)
+    _, status, _, _ = wait_for(scheduler.runner.finished)
+    assert status == git_runner.FAILED
+    assert scheduler.retries == 1
+    assert scheduler.is_pending()
+    assert scheduler.timer.interval() == push_scheduler.RETRY_DELAY * 1000
+
+    git(clone, "remote", "set-url", "origin", remote)
+    scheduler.timer.start(0)
+    _, status, _, _ = wait_for(scheduler.runner.finished)
+    assert status == git_runner.OK
+    assert scheduler.runner.pushes == 2
+    assert scheduler.retries == 0
+    assert not scheduler.is_pending()
+    assert remote_head(clone) == git(clone, "rev-parse", "HEAD")
+
+
+def test_manual_push_is_not_retried(clone, scheduler, tmp_path):
+    """Only the scheduled push is retried when both can not reach the remote."""
+    git(clone, "remote", "set-url", "origin", str(tmp_path / "unreachable.git"))
+    commit(clone, "second")
+    scheduler.runner.run(clone, "push")
+    scheduler.schedule(clone)
+    scheduler.push()
+    results = []
+    scheduler.runner.finished.connect(
+        lambda _, status, output, __: results.append(
+            (status, scheduler.runner.current_automatic)
+        )
+    )
+    wait_for(scheduler.runner.finished)
+    assert results == [(git_runner.FAILED, False)]
+    assert scheduler.retries == 0
+    assert not scheduler.is_pending()
+    wait_for(scheduler.runner.finished)
+    assert results[1] == (git_runner.FAILED, True)
+    assert scheduler.retries == 1
+    assert scheduler.is_pending()
+    scheduler.cancel()
+
+
+def test_shutdown_runs_queued_push(clone, scheduler):
+    """Quitting pushes changes that were scheduled but not pushed yet."""
+    commit(clone, "second")
+    scheduler.schedule(clone)
+    scheduler.flush()
+    scheduler.runner.shutdown()
+    assert not scheduler.runner.is_busy()
+    assert remote_head(clone) == git(clone, "rev-parse", "HEAD")
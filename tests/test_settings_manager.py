@@ -0,0 +1,91 @@
+"""
+Tests for the delayed writing of the SettingsManager.
+"""
+
+import pytest
+from conftest import wait_for
+
+import settings_manager
+from settings_manager import SettingsManager
+
+
+class CountingSettings:
+    """
+    Stand-in for QSettings that keeps the values in memory and records
+    every write.
+    """
+
+    def __init__(self, *_):
+        self.values = {"use_git": "false", "password_length": "20"}
+        self.writes = []
+
+    def value(self, key):
+        """
+        :return: The stored value of key, None when there is none.
+        """
+        return self.values.get(key)
+
+    def setValue(self, key, value):  # pylint: disable=invalid-name
+        """
+        Store and record a value.
+        """
+        self.values[key] = value
+        self.writes.append(key)
+
+
+@pytest.fixture(name="manager")
+def fixture_manager(qapp, monkeypatch):  # pylint: disable=unused-argument
+    """
+    :return: A new SettingsManager on a CountingSettings.
+    """
+    monkeypatch.setattr(settings_manager, "QSettings", CountingSettings)
+    monkeypatch.setattr(SettingsManager, "_instance", None)
+    monkeypatch.setattr(SettingsManager, "_initialized", False)
+    manager = SettingsManager()
+    yield manager
+    manager.flush_timer.stop()
+    manager.deleteLater()
+
+
+def test_loads_without_writing(manager):
+    """Loading converts the stored values and writes nothing back."""
+    assert manager.get("use_git") is False
+    assert manager.get("password_length") == 20
+    assert not manager.settings.writes
+    assert not manager.flush_timer.isActive()
+
+
+def test_only_changed_keys_are_written(manager):
+    """Setting the current value again does not make a key dirty."""
+    manager.set("use_git", False)
+    manager.set("password_length", 20)
+    manager.set("clipboard_timeout", 45)
+    assert not manager.dirty
+    assert not manager.flush_timer.isActive()
+    manager.set("clipboard_timeout", 30)
+    manager.flush()
+    assert manager.settings.writes == ["clipboard_timeout"]
+    manager.flush()
+    assert manager.settings.writes == ["clipboard_timeout"]
+
+
+def test_changes_are_written_together(manager):
+    """A burst of changes is written once, after FLUSH_DELAY."""
+    flushes = []
+    manager.flush_timer.timeout.connect(lambda: flushes.append(True))
+    for length in range(21, 31):
+        manager.set("password_length", length)
+    manager.set("use_git", True)
+    manager.set("current_profile", "work")
+    assert not manager.settings.writes
+    assert manager.flush_timer.isActive()
+    assert manager.flush_timer.interval() == settings_manager.FLUSH_DELAY
+    wait_for(manager.flush_timer.timeout)
+    assert flushes == [True]
+    assert sorted(manager.settings.writes) == [
+        "current_profile",
+        "password_length",
+        "use_git",
+    ]
+    assert manager.settings.values["password_length"] == 30
+    assert not manager.dirty
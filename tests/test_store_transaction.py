@@ -0,0 +1,115 @@
+"""
+Tests for the StoreTransaction, on a git store whose entries are never
+decrypted, so no keys are needed.
+"""
+
+import os
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from store_transaction import StoreTransaction
+
+
+def git(path, *args):
+    """
+    Run git in path, failing the test when it fails.
+
+    :return: The output of git.
+    """
+    return subprocess.run(
+        ["git", "-C", path, *args], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def write(store_dir, path, data="data"):
+    """
+    Write a file of the store, creating its folder.
+    """
+    full_path = os.path.join(store_dir, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w", encoding="utf-8") as store_file:
+        store_file.write(data)
+
+
+@pytest.fixture(name="store")
+def fixture_store(tmp_path):
+    """
+    :return: A store with both an entry and a folder called web, committed.
+    """
+    store_dir = str(tmp_path / "store")
+    for path in [".gpg-id", "web.gpg", "web/github.gpg", "web/gitlab.gpg"]:
+        write(store_dir, path)
+    git(tmp_path, "init", "-q", store_dir)
+    git(store_dir, "config", "user.email", "test@example.invalid")
+    git(store_dir, "config", "user.name", "Test")
+    git(store_dir, "add", "--all")
+    git(store_dir, "commit", "-q", "-m", "Initial")
+    return SimpleNamespace(store_dir=store_dir, gpg_bin="gpg", gpg_opts=[])
+
+
+def tracked(store):
+    """
+    :return: The files of the last commit.
+    """
+    return git(store.store_dir, "ls-tree", "-r", "--name-only", "HEAD").split()
+
+
+def test_removing_entry_keeps_folder(store):
+    """Removing the entry web leaves the folder web/ alone."""
+    with StoreTransaction(store) as transaction:
+        transaction.remove_path("web", recursive=True, is_folder=False)
+    assert os.path.isdir(os.path.join(store.store_dir, "web"))
+    assert tracked(store) == [".gpg-id", "web/github.gpg", "web/gitlab.gpg"]
+
+
+def test_removing_folder_keeps_entry(store):
+    """Removing the folder web/ leaves the entry web alone."""
+    with StoreTransaction(store) as transaction:
+        transaction.remove_path("web", recursive=True, is_folder=True)
+    assert os.path.isfile(os.path.join(store.store_dir, "web.gpg"))
+    assert tracked(store) == [".gpg-id", "web.gpg"]
+
+
+def test_entry_is_preferred(store):
+    """Without is_folder the entry is meant when there is one."""
+    transaction = StoreTransaction(store)
+    assert not transaction.resolve("web")
+    assert transaction.resolve("web", is_folder=True)
+    with pytest.raises(FileNotFoundError):
+        transaction.resolve("web/github", is_folder=True)
+
+
+def test_moving_entry_keeps_folder(store):
+    """Moving the entry web does not take the folder web/ along."""
+    with StoreTransaction(store) as transaction:
+        transaction.move_path("web", "sites", is_folder=False)
+    assert sorted(tracked(store)) == [
+        ".gpg-id",
+        "sites.gpg",
+        "web/github.gpg",
+        "web/gitlab.gpg",
+    ]
+
+
+def test_commit_leaves_other_staged_changes(store):
+    """Changes the user staged in the store are not committed along."""
+    write(store.store_dir, "notes.txt")
+    git(store.store_dir, "add", "notes.txt")
+    with StoreTransaction(store) as transaction:
+        transaction.remove_path("web/gitlab")
+    assert "notes.txt" not in tracked(store)
+    assert "web/gitlab.gpg" not in tracked(store)
+    assert git(store.store_dir, "status", "--short") == "A  notes.txt"
+
+
+def test_vanished_paths_are_not_committed(store):
+    """Paths that only existed during the transaction are left out."""
+    transaction = StoreTransaction(store)
+    assert transaction.git_pathspecs(["web/new.gpg", "web.gpg", "web"]) == [
+        ":(literal)web.gpg",
+        ":(literal)web",
+    ]
+    os.remove(os.path.join(store.store_dir, "web.gpg"))
+    assert transaction.git_pathspecs(["web.gpg"]) == [":(literal)web.gpg"]
@@ -0,0 +1,272 @@
+"""
+This module records how long gpg, git, passpy and model operations take for
+the --trace option, in the trace event format of Chrome, which both
+chrome://tracing and https://ui.perfetto.dev open.
+
+Every traced call becomes a complete event with its duration, the thread it
+ran on and its arguments. Decrypted contents and other secrets are never
+recorded, only their length. Paths, entry names and git arguments can be
+replaced by a salted hash, so a trace can be shared without revealing the
+layout of the store while calls on the same path can still be matched.
+Tracing costs nothing but a check of a global while it is off.
+"""
+
+import atexit
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+
+SECRET_ARGUMENTS = {"data", "key_data"}
+PATH_ARGUMENTS = {
+    "args",
+    "folder",
+    "key_path",
+    "names",
+    "new_path",
+    "old_path",
+    "path",
+    "store_dir",
+    "term",
+}
+STORE_METHODS = [
+    "copy_path",
+    "find",
+    "gen_key",
+    "get_key",
+    "git",
+    "init_git",
+    "init_store",
+    "iter_dir",
+    "list_dir",
+    "move_path",
+    "remove_path",
+    "search",
+    "set_key",
+]
+
+TRACER = None
+
+
+class Tracer:
+    """
+    Collects trace events from all threads and writes them to a file.
+    """
+
+    def __init__(self, path, redact_paths=False):
+        self.path = path
+        self.redact_paths = redact_paths
+        self.salt = os.urandom(16)
+        self.pid = os.getpid()
+        self.events = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self.pid,
+                "args": {"name": "PyQtPass"},
+            }
+        ]
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def redact(self, value):
+        """
+        :param value: A path or a list of them, options are kept.
+        :return: value with every path replaced by a salted hash.
+        """
+        if isinstance(value, (list, tuple)):
+            return [self.redact(item) for item in value]
+        if not isinstance(value, str) or value.startswith("-"):
+            return self.clean(value)
+        digest = hashlib.sha256(self.salt + value.encode("utf-8")).hexdigest()
+        return f"<path:{digest[:8]}>"
+
+    def clean(self, value):
+        """
+        :param value: Any argument of a traced call.
+        :return: A JSON serializable description of value.
+        """
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, (list, tuple)):
+            return [self.clean(item) for item in value]
+        if isinstance(value, dict):
+            return {str(key): self.clean(item) for key, item in value.items()}
+        if isinstance(value, bytes):
+            return f"<{len(value)} bytes>"
+        return f"<{type(value).__name__}>"
+
+    def arguments(self, arguments):
+        """
+        :param arguments: Dict of the arguments of a traced call.
+        :return: Dict of the arguments as they are recorded.
+        """
+        recorded = {}
+        for name, value in arguments.items():
+            if name in SECRET_ARGUMENTS:
+                size = len(value) if isinstance(value, (bytes, str)) else 0
+                recorded[name] = f"<{size} characters>"
+            elif self.redact_paths and name in PATH_ARGUMENTS:
+                recorded[name] = self.redact(value)
+            else:
+                recorded[name] = self.clean(value)
+        return recorded
+
+    def add(self, name, category, start, end, arguments):
+        """
+        Record a call that ran on the current thread.
+
+        :param name: Name of the operation.
+        :param category: Category of the operation, like 'gpg' or 'git'.
+        :param start: time.perf_counter() when the call started.
+        :param end: time.perf_counter() when the call ended.
+        :param arguments: Dict of the arguments of the call.
+        """
+        tid = threading.get_native_id()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": self.pid,
+            "tid": tid,
+            "args": self.arguments(arguments),
+        }
+        with self.lock:
+            if tid not in self.threads:
+                self.threads.add(tid)
+                self.events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": self.pid,
+                        "tid": tid,
+                        "args": {"name": threading.current_thread().name},
+                    }
+                )
+            self.events.append(event)
+
+    def write(self):
+        """
+        Write the events recorded so far to the trace file.
+        """
+        with self.lock:
+            events = list(self.events)
+        with open(self.path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+
+def enable(path, redact_paths=False):
+    """
+    Start tracing, the trace is written to path when PyQtPass exits.
+
+    :param path: File to write the trace to.
+    :param redact_paths: True to record hashes instead of paths.
+    """
+    global TRACER  # pylint: disable=global-statement
+    TRACER = Tracer(path, redact_paths)
+    atexit.register(finish)
+
+
+def finish():
+    """
+    Stop tracing and write the trace file.
+    """
+    global TRACER  # pylint: disable=global-statement
+    tracer, TRACER = TRACER, None
+    if tracer is not None:
+        tracer.write()
+
+
+def now():
+    """
+    :return: The current time for complete(), None while tracing is off.
+    """
+    return time.perf_counter() if TRACER is not None else None
+
+
+def complete(name, category, start, **arguments):
+    """
+    Record an operation that started earlier and ended now, e.g. one that
+    ran in a QProcess.
+
+    :param name: Name of the operation.
+    :param category: Category of the operation.
+    :param start: The value now() returned when it started.
+    :param arguments: The arguments to record.
+    """
+    tracer = TRACER
+    if tracer is not None and start is not None:
+        tracer.add(name, category, start, time.perf_counter(), arguments)
+
+
+@contextlib.contextmanager
+def span(name, category, **arguments):
+    """
+    Trace the code inside a with block.
+
+    :param name: Name of the operation.
+    :param category: Category of the operation.
+    :param arguments: The arguments to record.
+    """
+    start = now()
+    try:
+        yield
+    except BaseException as error:
+        arguments["error"] = type(error).__name__
+        raise
+    finally:
+        complete(name, category, start, **arguments)
+
+
+def traced(category, name=None):
+    """
+    Decorator that traces every call of a function with its arguments.
+
+    :param category: Category of the operation, like 'gpg' or 'git'.
+    :param name: Name of the operation, the name of the function by default.
+    :return: The decorator.
+    """
+
+    def decorator(func):
+        label = name or func.__qualname__
+        signature = None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal signature
+            if TRACER is None:
+                return func(*args, **kwargs)
+            if signature is None:
+                # Only looked up once tracing is on, inspect is slow to import.
+                import inspect  # pylint: disable=import-outside-toplevel
+
+                signature = inspect.signature(func)
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            arguments.pop("self", None)
+            with span(label, category, **arguments):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_store(store):
+    """
+    Trace the calls of a passpy Store while tracing is on.
+
+    :param store: The passpy Store.
+    :return: The same store.
+    """
+    if TRACER is None:
+        return store
+    for method in STORE_METHODS:
+        if hasattr(store, method):
+            wrapped = traced("passpy", f"Store.{method}")(getattr(store, method))
+            setattr(store, method, wrapped)
+    return store
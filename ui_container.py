@@ -7,8 +7,7 @@ the complexity of UI setup and interactions, thereby promoting a cleaner and mor
 modular design in the PyQtPass application.
 """
 
-import sys
-from PyQt6.QtCore import Qt, QSortFilterProxyModel
+from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import (
     QTreeView,
     QVBoxLayout,
@@ -16,7 +15,11 @@ from PyQt6.QtWidgets import (
     QWidget,
     QTextBrowser,
 )
-from PyQt6.QtGui import QDesktopServices
+from PyQt6.QtGui import QDesktopServices, QStandardItem, QStandardItemModel
+
+from fuzzy_filter import FuzzyFilter
+
+EXPAND_LIMIT = 1000
 
 
 class UiContainer(QWidget):
@@ -34,28 +37,34 @@ class UiContainer(QWidget):
 
         self.central_widget = QWidget()
         self.filter_text_box = QLineEdit()
-        self.proxy_model = QSortFilterProxyModel()
+        self.fuzzy_filter = FuzzyFilter(self)
 
         self.filter_text_box.setPlaceholderText(
             self.tr("Type here to filter passwords...")
         )
         self.filter_text_box.textChanged.connect(self.filter_tree_view)
+        self.filter_text_box.returnPressed.connect(self.select_best_match)
+        self.fuzzy_filter.filtered.connect(self.on_filtered)
+
+    @property
+    def proxy_model(self):
+        """
+        :return: The FuzzyFilterProxyModel shown in the tree view.
+        """
+        return self.fuzzy_filter.proxy
 
     def setup_ui(self, splitter):
         """
         Set up the User Interface items
         :param splitter:
         """
-        if not self.tree_model:
-            print("No tree nodel")
-            sys.exit(1)
-        self.proxy_model.setSourceModel(self.tree_model)
-        self.proxy_model.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.proxy_model.setRecursiveFilteringEnabled(True)  # Requires PyQt6
-
         self.tree_view = QTreeView()
         self.tree_view.setHeaderHidden(True)
         self.tree_view.setModel(self.proxy_model)
+        if self.tree_model:
+            self.set_tree_model(self.tree_model)
+        else:
+            self.show_placeholder(self.tr("Loading password store..."))
         self.tree_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
 
         top_layout = QVBoxLayout()
@@ -82,12 +91,58 @@ class UiContainer(QWidget):
         vbox.addWidget(splitter)
         self.central_widget.setLayout(vbox)
 
+    def set_tree_model(self, tree_model):
+        """
+        Show another store model in the tree view.
+
+        :param tree_model: The StoreModel to show.
+        """
+        self.tree_model = tree_model
+        self.fuzzy_filter.set_model(tree_model)
+        self.tree_view.setModel(self.proxy_model)
+
+    def show_placeholder(self, text):
+        """
+        Show a single disabled line of text in the tree view, while there
+        is no store model yet.
+
+        :param text: The text to show.
+        """
+        placeholder = QStandardItemModel(self)
+        item = QStandardItem(text)
+        item.setFlags(Qt.ItemFlag.NoItemFlags)
+        placeholder.appendRow(item)
+        self.proxy_model.setSourceModel(placeholder)
+
     def filter_tree_view(self, text):
         """
         Filter the tree view based on the text input in the filter text box.
-        Uses a regular expression to filter the tree view.
+        Entries match when the characters of text appear in their full path
+        in the same order, the filter is applied once typing pauses.
 
         :param text: Text to filter the tree view.
         """
-        #
-        self.proxy_model.setFilterRegularExpression(text)
+        self.fuzzy_filter.set_text(text)
+
+    def on_filtered(self, count):
+        """
+        Expand the folders of the matches, unless there are too many.
+
+        :param count: The number of matching entries, -1 without a filter.
+        """
+        if 0 < count <= EXPAND_LIMIT:
+            self.tree_view.expandAll()
+
+    def select_best_match(self):
+        """
+        Select the entry that matches the filter text best.
+        """
+        self.fuzzy_filter.apply()
+        source_index = self.fuzzy_filter.best_match()
+        if source_index is None:
+            return
+        index = self.proxy_model.mapFromSource(source_index)
+        if index.isValid():
+            self.tree_view.setCurrentIndex(index)
+            self.tree_view.scrollTo(index)
+            self.tree_view.setFocus()
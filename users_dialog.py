@@ -4,7 +4,8 @@ This module defines the UsersDialog class, a PyQt6 QDialog subclass.
 The UsersDialog shows the GPG keys in the user's keyring and lets them
 select which keys the password store (or a folder inside it) should be
 encrypted for, like the users dialog in QtPass. Applying the selection
-rewrites the .gpg-id file and re-encrypts the affected passwords.
+rewrites the .gpg-id file and re-encrypts the affected passwords in the
+background, showing the progress.
 """
 
 from PyQt6.QtCore import Qt
@@ -15,11 +16,13 @@ from PyQt6.QtWidgets import (
     QListWidget,
     QListWidgetItem,
     QMessageBox,
+    QProgressDialog,
     QPushButton,
     QVBoxLayout,
 )
 
-from gpg_utils import key_matches_id, list_gpg_keys, read_gpg_ids, reencrypt_store
+from gpg_utils import key_listings, read_gpg_ids
+from reencrypt_engine import ReencryptEngine, ReencryptJournal
 
 
 class UsersDialog(QDialog):
@@ -27,11 +30,15 @@ class UsersDialog(QDialog):
     A dialog to select the GPG keys a (sub)store is encrypted for.
     """
 
-    def __init__(self, store, folder="", parent=None):
+    def __init__(self, store, folder="", parent=None, backend=None):
         super().__init__(parent)
         self.store = store
         self.folder = folder
+        self.backend = backend
+        self.engine = None
+        self.progress_dialog = None
         self.key_list = QListWidget(self)
+        self.ok_button = QPushButton(self.tr("OK"), self)
         self.setWindowTitle(self.tr("Users for {}").format(folder or "/"))
         self.init_ui()
 
@@ -48,15 +55,22 @@ class UsersDialog(QDialog):
             )
         )
         layout.addWidget(self.key_list)
-        self.populate_keys()
+        if self.populate_keys():
+            layout.addWidget(
+                QLabel(
+                    self.tr(
+                        "A previous re-encryption was interrupted, it is resumed "
+                        "when these keys are applied again."
+                    )
+                )
+            )
 
         buttons_layout = QHBoxLayout()
         buttons_layout.addStretch(1)
-        ok_button = QPushButton(self.tr("OK"), self)
-        ok_button.clicked.connect(self.save)
+        self.ok_button.clicked.connect(self.save)
         cancel_button = QPushButton(self.tr("Cancel"), self)
         cancel_button.clicked.connect(self.reject)
-        buttons_layout.addWidget(ok_button)
+        buttons_layout.addWidget(self.ok_button)
         buttons_layout.addWidget(cancel_button)
         layout.addLayout(buttons_layout)
         self.setLayout(layout)
@@ -65,23 +79,36 @@ class UsersDialog(QDialog):
     def populate_keys(self):
         """
         Fill the list widget with the available GPG keys, checking the
-        ones currently in use for this folder.
+        ones currently in use for this folder, or the ones of an
+        interrupted re-encryption.
+
+        :return: True when an interrupted re-encryption can be resumed.
         """
-        current_ids, _ = read_gpg_ids(self.store.store_dir, self.folder)
-        secret_ids = {key["id"] for key in list_gpg_keys(secret=True)}
-        for key in list_gpg_keys():
+        pending = ReencryptJournal(self.store.store_dir).read()
+        resuming = pending is not None and pending[0] == self.folder
+        if resuming:
+            current_ids = pending[1]
+        else:
+            current_ids, _ = read_gpg_ids(self.store.store_dir, self.folder)
+        key_index = key_listings().key_index()
+        public_keys = key_index.keys
+        _, secret_keys = key_listings().keys()
+        secret_ids = {key["id"] for key in secret_keys}
+        current_keys = key_index.resolve(current_ids)
+        for key in public_keys:
             uid = key["uids"][0] if key["uids"] else key["fingerprint"]
             label = f"{uid} ({key['id']})"
             if key["id"] not in secret_ids:
                 label += self.tr(" [no private key]")
             item = QListWidgetItem(label)
             item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
-            checked = any(key_matches_id(key, gpg_id) for gpg_id in current_ids)
+            checked = key["fingerprint"] in current_keys
             item.setCheckState(
                 Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked
             )
             item.setData(Qt.ItemDataRole.UserRole, key["id"])
             self.key_list.addItem(item)
+        return resuming
 
     def selected_key_ids(self):
         """
@@ -95,7 +122,8 @@ class UsersDialog(QDialog):
 
     def save(self):
         """
-        Write the selected keys to .gpg-id and re-encrypt the passwords.
+        Write the selected keys to .gpg-id and start re-encrypting the
+        passwords.
         """
         key_ids = self.selected_key_ids()
         if not key_ids:
@@ -105,13 +133,92 @@ class UsersDialog(QDialog):
                 self.tr("Select at least one key to encrypt the passwords with."),
             )
             return
+        self.engine = ReencryptEngine(
+            self.store, self.folder, key_ids, self.backend, self
+        )
+        self.progress_dialog = QProgressDialog(
+            self.tr("Re-encrypting passwords..."), self.tr("Cancel"), 0, 0, self
+        )
+        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progress_dialog.setMinimumDuration(500)
+        self.progress_dialog.setAutoClose(False)
+        self.progress_dialog.setAutoReset(False)
+        self.progress_dialog.canceled.connect(self.engine.cancel)
+        self.engine.planned.connect(self.on_planned)
+        self.engine.progress.connect(self.on_progress)
+        self.engine.finished.connect(self.on_finished)
+        self.ok_button.setEnabled(False)
         try:
-            reencrypt_store(self.store, self.folder, key_ids)
-        except (OSError, ValueError) as error:
+            self.engine.start()
+        except OSError as error:
+            self.on_finished(False, str(error))
+
+    def on_planned(self, todo, skipped):
+        """
+        Show how many passwords actually need to be re-encrypted.
+
+        :param todo: Number of files to re-encrypt.
+        :param skipped: Number of files already encrypted for these keys.
+        """
+        self.progress_dialog.setLabelText(
+            self.tr("{} passwords to re-encrypt, {} already up to date.").format(
+                todo, skipped
+            )
+        )
+
+    def on_progress(self, done, total):
+        """
+        Show the progress of the re-encryption.
+
+        :param done: Number of files re-encrypted so far.
+        :param total: Number of files to re-encrypt.
+        """
+        self.progress_dialog.setMaximum(total)
+        self.progress_dialog.setValue(done)
+        if total:
+            self.progress_dialog.setLabelText(
+                self.tr(
+                    "Re-encrypting passwords... ({} of {}, {} already up to date)"
+                ).format(done, total, self.engine.skipped)
+            )
+
+    def on_finished(self, completed, error):
+        """
+        Close the dialog once every password was re-encrypted, or report
+        why the re-encryption stopped.
+
+        :param completed: True when every file was re-encrypted.
+        :param error: Error message, '' when there was none.
+        """
+        self.progress_dialog.close()
+        self.engine = None
+        self.ok_button.setEnabled(True)
+        if error:
             QMessageBox.critical(
                 self,
                 self.tr("Re-encryption failed"),
-                self.tr("Could not update the store keys: {}").format(error),
+                self.tr(
+                    "Could not update the store keys: {}\n\n"
+                    "Apply the keys again to resume."
+                ).format(error),
+            )
+        elif completed:
+            self.accept()
+        else:
+            QMessageBox.information(
+                self,
+                self.tr("Re-encryption cancelled"),
+                self.tr(
+                    "Not every password was re-encrypted yet. "
+                    "Apply the keys again to resume."
+                ),
             )
+
+    def reject(self):
+        """
+        Cancel a running re-encryption instead of closing the dialog.
+        """
+        if self.engine is not None:
+            self.engine.cancel()
             return
-        self.accept()
+        super().reject()